@@ -0,0 +1,164 @@
+import os
+import uuid
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from model_record import ModelRecord
+
+DEFAULT_FOLDS = 3
+DEFAULT_HORIZON = 14
+
+# Folds whose training window would be shorter than this are dropped
+MIN_TRAIN_POINTS = 14
+
+
+def rolling_origin_cutoffs(n_points: int, folds: int, horizon: int, step: Optional[int] = None,
+                           min_train: int = MIN_TRAIN_POINTS) -> List[int]:
+    """
+    Training-window lengths (row counts) for each fold, oldest first.
+    The newest fold's test window ends at the last observation; earlier origins move
+    back by step rows (defaults to the horizon, so test windows do not overlap).
+    """
+    step = step or horizon
+    cutoffs = [n_points - horizon - k * step for k in range(folds)]
+    return sorted(c for c in cutoffs if c >= min_train)
+
+
+class BacktestEngine:
+    """Rolling-origin backtests for any model type, with folds evaluated in parallel"""
+
+    def __init__(self, train_fn: Callable, forecast_fn: Callable, metrics_fn: Callable, registry: Dict):
+        # train_fn(df, model_id, model_type, hyperparameter_tuning) stores a ModelRecord in registry
+        # forecast_fn(model_info, df, forecast_days) returns {"predictions": [...]}
+        self.train_fn = train_fn
+        self.forecast_fn = forecast_fn
+        self.metrics_fn = metrics_fn
+        self.registry = registry
+
+    def _score(self, predictions: List[Dict], test_df: pd.DataFrame) -> Dict:
+        """Compare predictions with the actual test window, matched by date"""
+        predicted = {p['date']: p['value'] for p in predictions}
+        actual_dates = test_df['date'].dt.strftime('%Y-%m-%d').values
+        mask = np.array([d in predicted for d in actual_dates], dtype=bool)
+        if not mask.any():
+            raise ValueError("Forecast did not cover any test dates")
+
+        y_true = test_df['value'].values[mask].astype(float)
+        y_pred = np.array([predicted[d] for d in actual_dates[mask]], dtype=float)
+        mape, rmse = self.metrics_fn(y_true, y_pred)
+        return {
+            "mape": mape,
+            "rmse": rmse,
+            "mae": float(np.mean(np.abs(y_true - y_pred))),
+            "bias": float(np.mean(y_pred - y_true)),
+            "accuracy": max(0, 100 - mape),
+            "testPoints": int(mask.sum())
+        }
+
+    def _forecast_and_score(self, model_info: ModelRecord, train_df: pd.DataFrame,
+                            test_df: pd.DataFrame, cutoff: int) -> Dict:
+        forecast_days = int((test_df['date'].max() - train_df['date'].max()).days)
+        forecast_data = self.forecast_fn(model_info, train_df, forecast_days)
+        fold = self._score(forecast_data['predictions'], test_df)
+        fold["cutoffDate"] = train_df['date'].max().strftime('%Y-%m-%d')
+        fold["trainPoints"] = cutoff
+        return fold
+
+    def _run_fold(self, item: str, df: pd.DataFrame, model_type: str, cutoffs: List[int],
+                  horizon: int, hyperparameter_tuning: bool) -> List[Dict]:
+        """Fit from scratch at each cutoff"""
+        folds = []
+        for cutoff in cutoffs:
+            model_id = f"__backtest_{uuid.uuid4().hex}"
+            train_df, test_df = df.iloc[:cutoff], df.iloc[cutoff:cutoff + horizon]
+            try:
+                self.train_fn(train_df.copy(), model_id, model_type, hyperparameter_tuning)
+                folds.append(self._forecast_and_score(self.registry[model_id], train_df, test_df, cutoff))
+            except Exception as e:
+                folds.append({"cutoffDate": train_df['date'].max().strftime('%Y-%m-%d'),
+                              "trainPoints": cutoff, "error": str(e)})
+            finally:
+                self.registry.pop(model_id, None)
+        return folds
+
+    def _run_arima_chain(self, item: str, df: pd.DataFrame, model_type: str, cutoffs: List[int],
+                         horizon: int, hyperparameter_tuning: bool) -> List[Dict]:
+        """Fit ARIMA once at the oldest cutoff, then extend it with append() for later folds"""
+        model_id = f"__backtest_{uuid.uuid4().hex}"
+        first = cutoffs[0]
+        try:
+            self.train_fn(df.iloc[:first].copy(), model_id, model_type, hyperparameter_tuning)
+            record = self.registry[model_id]
+        finally:
+            self.registry.pop(model_id, None)
+
+        if record.is_simple:
+            # Flat stand-in for a zero/constant window; later windows may carry signal, so fit each fold
+            return self._run_fold(item, df, model_type, cutoffs, horizon, hyperparameter_tuning)
+
+        folds = []
+        results = record.model
+        previous = first
+        for cutoff in cutoffs:
+            train_df, test_df = df.iloc[:cutoff], df.iloc[cutoff:cutoff + horizon]
+            try:
+                if cutoff > previous:
+                    # Same parameters, state filtered through the new observations - no refit
+                    results = results.append(df['value'].values[previous:cutoff])
+                    previous = cutoff
+                fold_record = ModelRecord(model_type, results, history=train_df,
+                                          order=record.order, seasonal_order=record.seasonal_order)
+                folds.append(self._forecast_and_score(fold_record, train_df, test_df, cutoff))
+            except Exception as e:
+                folds.append({"cutoffDate": train_df['date'].max().strftime('%Y-%m-%d'),
+                              "trainPoints": cutoff, "error": str(e)})
+        return folds
+
+    def run(self, frames: Dict[str, pd.DataFrame], model_types: Dict[str, str],
+            folds: int = DEFAULT_FOLDS, horizon: int = DEFAULT_HORIZON, step: Optional[int] = None,
+            hyperparameter_tuning: bool = False, max_workers: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Backtest every item frame with its model type.
+        Returns item -> {modelType, folds, metrics} where metrics average the successful folds.
+        """
+        results = {item: {"modelType": model_types[item], "folds": []} for item in frames}
+        jobs = []
+        for item, df in frames.items():
+            df = df.reset_index(drop=True)
+            cutoffs = rolling_origin_cutoffs(len(df), folds, horizon, step)
+            if not cutoffs:
+                results[item]["error"] = (f"Not enough history for {folds} fold(s) of {horizon} points "
+                                          f"(need at least {MIN_TRAIN_POINTS + horizon}, found {len(df)})")
+                continue
+            if model_types[item] == 'ARIMA' and len(cutoffs) > 1:
+                jobs.append((self._run_arima_chain, item, df, cutoffs))
+            else:
+                # One job per fold so folds of the same item run in parallel
+                jobs.extend((self._run_fold, item, df, [cutoff]) for cutoff in cutoffs)
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+            futures = [
+                (item, executor.submit(fn, item, df, model_types[item], cutoffs, horizon, hyperparameter_tuning))
+                for fn, item, df, cutoffs in jobs
+            ]
+            for item, future in futures:
+                try:
+                    results[item]["folds"].extend(future.result())
+                except Exception as e:
+                    results[item]["error"] = str(e)
+
+        for item, result in results.items():
+            result["folds"].sort(key=lambda f: f["trainPoints"])
+            scored = [f for f in result["folds"] if "error" not in f]
+            if scored:
+                result["metrics"] = {
+                    key: float(np.mean([f[key] for f in scored]))
+                    for key in ("mape", "rmse", "mae", "bias", "accuracy")
+                }
+                result["metrics"]["folds"] = len(scored)
+            elif "error" not in result and result["folds"]:
+                result["error"] = result["folds"][0]["error"]
+        return results
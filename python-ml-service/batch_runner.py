@@ -0,0 +1,346 @@
+"""
+Offline batch runner: train and forecast a whole catalog in-process, without the HTTP API.
+
+    python batch_runner.py --input sales.csv --date-col date --item-col item --qty-col quantity \
+        --model-type "Random Forest" --forecast-days 30 --output forecasts.parquet --workers 4
+
+    python batch_runner.py --sql-table dbo.Sales --date-col OrderDate --item-col ItemCode \
+        --qty-col Quantity --output forecasts.csv
+
+Items are split into chunks that run on a process pool. Each finished chunk is written to the
+checkpoint directory, so rerunning the same command after an interruption resumes with the
+unfinished chunks. Trained models go through the same model cache as /train.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow  # Parquet engine for pandas
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+import forecasting_service as service
+from resource_governor import limit_worker_threads
+
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_MODEL_ID = 'batch'
+OUTPUT_FORMATS = ('.csv', '.parquet')
+MANIFEST_NAME = 'manifest.json'
+FORECAST_COLUMNS = ['item', 'date', 'forecast', 'lower', 'upper', 'modelType']
+
+
+def read_series(args: argparse.Namespace) -> pd.DataFrame:
+    """Daily item/date/value rows from the input file or SQL table (see daily_series)"""
+    if args.input:
+        path = Path(args.input)
+        if path.suffix.lower() == '.parquet':
+            raw = pd.read_parquet(path)
+        else:
+            raw = pd.read_csv(path)
+    else:
+        schema, table = split_table_name(args.sql_table)
+        query = f"SELECT [{args.date_col}], [{args.item_col}], [{args.qty_col}] FROM [{schema}].[{table}]"
+        conn = service.connect_sql_server()
+        try:
+            raw = pd.read_sql(query, conn)
+        finally:
+            conn.close()
+        print(f"Fetched {len(raw)} rows from {schema}.{table}", flush=True)
+
+    missing = [col for col in (args.date_col, args.item_col, args.qty_col) if col not in raw.columns]
+    if missing:
+        raise ValueError(f"Input has no column(s): {', '.join(missing)}")
+    return daily_series(pd.DataFrame({
+        'item': raw[args.item_col].astype(str),
+        'date': pd.to_datetime(raw[args.date_col], errors='coerce'),
+        'value': pd.to_numeric(raw[args.qty_col], errors='coerce')
+    }))
+
+
+def daily_series(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per item and day: rows on the same day are summed and every day between an item's
+    first and last date is present, with 0 for days without rows (as the Node proxy fills /train data).
+    """
+    df = df.assign(date=df['date'].dt.normalize()).dropna(subset=['item', 'date'])
+    daily = df.groupby(['item', 'date'], sort=True)['value'].sum()
+    filled = [
+        values.droplevel('item').asfreq('D', fill_value=0.0).rename_axis('date').reset_index().assign(item=item_name)
+        for item_name, values in daily.groupby(level='item', sort=True)
+    ]
+    if not filled:
+        return pd.DataFrame(columns=['item', 'date', 'value'])
+    return pd.concat(filled, ignore_index=True)[['item', 'date', 'value']]
+
+
+def split_table_name(name: str) -> Tuple[str, str]:
+    """'schema.table' or 'table' (schema dbo)"""
+    schema, _, table = name.rpartition('.')
+    return (schema or 'dbo').strip('[]'), table.strip('[]')
+
+
+def write_table(df: pd.DataFrame, path: Path):
+    """Write CSV or Parquet (by extension) atomically: readers never see a partial file"""
+    tmp = path.with_name(f".{path.name}.tmp")
+    if path.suffix.lower() == '.parquet':
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def read_table(path: Path) -> pd.DataFrame:
+    if path.suffix.lower() == '.parquet':
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def write_json(value: Dict, path: Path):
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(value, indent=2, default=str))
+    os.replace(tmp, path)
+
+
+def run_fingerprint(series: pd.DataFrame, options: Dict) -> str:
+    """Identifies a run: same input rows and options means a checkpoint can be resumed"""
+    digest = hashlib.sha256(json.dumps(options, sort_keys=True, default=str).encode())
+    digest.update(pd.util.hash_pandas_object(series, index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def plan_chunks(series: pd.DataFrame, chunk_size: int) -> List[List[str]]:
+    """Items in sorted order, cut into fixed-size chunks (stable across reruns)"""
+    items = sorted(series['item'].unique())
+    return [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+
+
+def run_chunk(chunk: pd.DataFrame, options: Dict) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Train and forecast one chunk of items in this process through the service's own
+    training and forecasting functions. Returns the forecast rows and a chunk summary.
+    """
+    started_at = time.time()
+    lease = service.governor.acquire('batch', max_threads=options['threads'])
+    try:
+        items_data = {
+            item: [{'date': date, 'value': value}
+                   for date, value in zip(group['date'].dt.strftime('%Y-%m-%d'), group['value'].astype(float))]
+            for item, group in chunk.groupby('item', sort=False)
+        }
+        shared_data = service.SharedTrainingData(items_data)
+        request = {
+            'itemsData': items_data,
+            'modelType': options['model_type'],
+            'modelId': options['model_id'],
+            'schema': options['schema'],
+            'table': options['table'],
+            'dateCol': options['date_col'],
+            'itemCol': options['item_col'],
+            'qtyCol': options['qty_col'],
+            'hyperparameterTuning': options['hyperparameter_tuning'],
+            'forceRetrain': options['force_retrain'],
+            # Items are forecast independently; a per-chunk aggregate would mean nothing
+            'trainOverall': False
+        }
+        with service.app.app_context():
+            payload, status = service.response_payload(service.run_training(request, shared_data))
+        if status != 200:
+            raise RuntimeError(payload.get('error', f"Training failed with status {status}"))
+
+        results = payload.get('itemsResults', {})
+        item_models = {}
+        for item_name, result in results.items():
+            model_info = service.trained_models.get(result['modelId']) if result.get('success') else None
+            if model_info is not None:
+                item_models[item_name] = model_info
+        item_frames = {item_name: shared_data.frame(item_name) for item_name in item_models}
+        item_forecasts = service.forecast_item_frames(item_frames, item_models, options['forecast_days'],
+                                                      options['uncertainty_samples'],
+                                                      service.governor.current_threads())
+
+        rows = [
+            (item_name, point['date'], point['value'], point.get('lower'), point.get('upper'),
+             item_models[item_name].type)
+            for item_name, forecast_data in item_forecasts.items()
+            for point in forecast_data['predictions']
+        ]
+        failed = {item_name: result.get('error', 'training failed')
+                  for item_name, result in results.items() if not result.get('success')}
+        failed.update({item_name: 'forecast failed' for item_name in item_models if item_name not in item_forecasts})
+        failed.update({item_name: 'no data' for item_name in items_data if item_name not in results})
+        summary = {
+            'items': len(items_data),
+            'trained': sum(1 for r in results.values() if r.get('success') and not r.get('fromCache')),
+            'fromCache': sum(1 for r in results.values() if r.get('fromCache')),
+            'forecasted': len(item_forecasts),
+            'failed': failed,
+            'seconds': round(time.time() - started_at, 3)
+        }
+        return pd.DataFrame(rows, columns=FORECAST_COLUMNS), summary
+    finally:
+        # The chunk's models are cached; this process does not need them for later chunks
+        for item_name in chunk['item'].unique():
+            service.trained_models.pop(f"{options['model_id']}_{item_name}", None)
+        service.governor.release(lease)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train and forecast a whole catalog without the HTTP API")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help="CSV or Parquet file with one row per item and date")
+    source.add_argument('--sql-table', help="SQL Server table as schema.table (SQL_* environment variables)")
+    parser.add_argument('--date-col', default='date')
+    parser.add_argument('--item-col', default='item')
+    parser.add_argument('--qty-col', default='quantity')
+    parser.add_argument('--output', required=True, help="Forecast file, .csv or .parquet")
+    parser.add_argument('--model-type', default='Random Forest',
+                        choices=list(service.SUPPORTED_MODEL_TYPES) + [service.AUTO_MODEL_TYPE])
+    parser.add_argument('--forecast-days', type=int, default=30)
+    parser.add_argument('--hyperparameter-tuning', action='store_true')
+    parser.add_argument('--force-retrain', action='store_true', help="Ignore cached models")
+    parser.add_argument('--uncertainty-samples', type=int, default=None, help="Prophet interval samples")
+    parser.add_argument('--model-id', default=DEFAULT_MODEL_ID, help="Base model id of the trained models")
+    parser.add_argument('--schema', help="Cache key schema (default: from --sql-table, or 'file')")
+    parser.add_argument('--table', help="Cache key table (default: from --sql-table, or the input file name)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Items per checkpointed chunk")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--checkpoint-dir', help="Default: <output>.checkpoint")
+    parser.add_argument('--restart', action='store_true', help="Discard an existing checkpoint")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    output = Path(args.output)
+    if output.suffix.lower() not in OUTPUT_FORMATS:
+        print(f"Output must end in one of {', '.join(OUTPUT_FORMATS)}: {output}", flush=True)
+        return 2
+    if output.suffix.lower() == '.parquet' and not PARQUET_AVAILABLE:
+        print("Parquet output needs pyarrow; install it or write .csv", flush=True)
+        return 2
+    if args.chunk_size < 1 or args.workers < 1 or args.forecast_days < 1:
+        print("--chunk-size, --workers and --forecast-days must be positive", flush=True)
+        return 2
+
+    if args.sql_table:
+        default_schema, default_table = split_table_name(args.sql_table)
+    else:
+        default_schema, default_table = 'file', Path(args.input).stem
+    workers = args.workers
+    options = {
+        'model_type': args.model_type,
+        'model_id': args.model_id,
+        'schema': args.schema or default_schema,
+        'table': args.table or default_table,
+        'date_col': args.date_col,
+        'item_col': args.item_col,
+        'qty_col': args.qty_col,
+        'forecast_days': args.forecast_days,
+        'hyperparameter_tuning': args.hyperparameter_tuning,
+        'force_retrain': args.force_retrain,
+        'uncertainty_samples': args.uncertainty_samples,
+        'chunk_size': args.chunk_size,
+        # Worker processes split the cores; each chunk's fits use its share
+        'threads': max(1, (os.cpu_count() or 1) // workers)
+    }
+
+    started_at = time.time()
+    series = read_series(args)
+    chunks = plan_chunks(series, args.chunk_size)
+    print(f"Read {len(series)} rows for {sum(map(len, chunks))} items; {len(chunks)} chunks of up to "
+          f"{args.chunk_size} items", flush=True)
+
+    # Options that do not change the results may differ between a run and its resume
+    fingerprint = run_fingerprint(series, {k: v for k, v in options.items() if k != 'threads'})
+    checkpoint_dir = Path(args.checkpoint_dir or f"{output}.checkpoint")
+    manifest_path = checkpoint_dir / MANIFEST_NAME
+    if args.restart and checkpoint_dir.exists():
+        shutil.rmtree(checkpoint_dir)
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get('fingerprint') != fingerprint:
+            print(f"Checkpoint {checkpoint_dir} belongs to a different input or options; "
+                  f"use --restart or another --checkpoint-dir", flush=True)
+            return 2
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    write_json({'fingerprint': fingerprint, 'chunks': len(chunks), 'options': options}, manifest_path)
+
+    def chunk_paths(index: int) -> Tuple[Path, Path]:
+        return (checkpoint_dir / f"chunk-{index:05d}{output.suffix.lower()}",
+                checkpoint_dir / f"chunk-{index:05d}.json")
+
+    # A chunk is done once its summary exists (written after its forecast rows)
+    todo = [index for index in range(len(chunks)) if not chunk_paths(index)[1].exists()]
+    if len(todo) < len(chunks):
+        print(f"Resuming: {len(chunks) - len(todo)} of {len(chunks)} chunks already done", flush=True)
+
+    def finish_chunk(index: int, forecasts: pd.DataFrame, summary: Dict):
+        data_path, summary_path = chunk_paths(index)
+        write_table(forecasts, data_path)
+        write_json(summary, summary_path)
+        print(f"Chunk {index + 1}/{len(chunks)}: {summary['trained']} trained, {summary['fromCache']} from cache, "
+              f"{len(summary['failed'])} failed, {summary['seconds']:.1f}s", flush=True)
+
+    item_index = series.set_index('item')
+    chunk_rows = {index: item_index.loc[chunks[index]].reset_index() for index in todo}
+    failed_chunks = 0
+    if workers == 1 or len(todo) <= 1:
+        for index in todo:
+            try:
+                finish_chunk(index, *run_chunk(chunk_rows[index], options))
+            except Exception as e:
+                failed_chunks += 1
+                print(f"Chunk {index + 1}/{len(chunks)} failed: {e}", flush=True)
+    else:
+        # Spawned workers import the service themselves; BLAS is pinned to each worker's share
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo)),
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=limit_worker_threads, initargs=(options['threads'],)) as executor:
+            futures = {executor.submit(run_chunk, chunk_rows.pop(index), options): index for index in todo}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    finish_chunk(index, *future.result())
+                except Exception as e:
+                    failed_chunks += 1
+                    print(f"Chunk {index + 1}/{len(chunks)} failed: {e}", flush=True)
+
+    if failed_chunks:
+        print(f"{failed_chunks} chunk(s) failed; rerun the same command to retry them", flush=True)
+        return 1
+
+    # All chunks done: combine them in item order
+    forecasts = pd.concat([read_table(chunk_paths(index)[0]) for index in range(len(chunks))],
+                          ignore_index=True) if chunks else pd.DataFrame(columns=FORECAST_COLUMNS)
+    write_table(forecasts, output)
+    summaries = [json.loads(chunk_paths(index)[1].read_text()) for index in range(len(chunks))]
+    failed = {item: error for summary in summaries for item, error in summary['failed'].items()}
+    summary = {
+        'items': sum(s['items'] for s in summaries),
+        'trained': sum(s['trained'] for s in summaries),
+        'fromCache': sum(s['fromCache'] for s in summaries),
+        'forecasted': sum(s['forecasted'] for s in summaries),
+        'failed': failed,
+        'rows': len(forecasts),
+        'elapsedSeconds': round(time.time() - started_at, 3)
+    }
+    write_json(summary, checkpoint_dir / 'summary.json')
+    print(f"Wrote {len(forecasts)} forecast rows for {summary['forecasted']} of {summary['items']} items to "
+          f"{output} ({len(failed)} failed) in {summary['elapsedSeconds']:.1f}s", flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
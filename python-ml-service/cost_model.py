@@ -0,0 +1,105 @@
+import heapq
+import math
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# Prior fit cost per model type: (fixed seconds, seconds per 1,000 history points)
+PRIOR_COSTS = {
+    'Linear Regression': (0.01, 0.005),
+    'Random Forest': (0.1, 0.5),
+    'ARIMA': (0.05, 0.15),
+    'Prophet': (0.2, 0.3),
+}
+
+# Batch model types are fitted for all items up front; the per-item step only stores the result
+BATCH_FIT_COST = (0.001, 0.0)
+
+# Prior slowdown from hyperparameter tuning (grid size x typical candidate cost)
+TUNING_MULTIPLIERS = {
+    'ARIMA': 500.0,
+    'Prophet': 100.0,
+    'Random Forest': 1.5,
+}
+
+# Weight of each new observation in the learned correction (exponential moving average in log space)
+OBSERVATION_WEIGHT = 0.3
+
+
+class FitCostModel:
+    """
+    Estimates per-item fit seconds from history length, model type and tuning flag.
+    Estimates start from PRIOR_COSTS and are corrected online: each observed fit
+    moves the (model type, tuning) correction factor towards observed / predicted.
+    """
+
+    def __init__(self, observation_weight: float = OBSERVATION_WEIGHT):
+        self.observation_weight = observation_weight
+        self._lock = threading.Lock()
+        self._log_corrections: Dict[Tuple[str, bool], float] = {}
+        self._observations: Dict[Tuple[str, bool], int] = {}
+
+    @staticmethod
+    def prior(model_type: str, points: int, tuning: bool = False) -> float:
+        """Prior estimate before any observed fits"""
+        fixed, per_thousand = PRIOR_COSTS.get(model_type, BATCH_FIT_COST)
+        seconds = fixed + per_thousand * max(points, 0) / 1000
+        if tuning:
+            seconds *= TUNING_MULTIPLIERS.get(model_type, 1.0)
+        return seconds
+
+    def estimate(self, model_type: str, points: int, tuning: bool = False) -> float:
+        """Expected fit seconds"""
+        key = (model_type, bool(tuning))
+        with self._lock:
+            log_correction = self._log_corrections.get(key, 0.0)
+        return self.prior(model_type, points, tuning) * math.exp(log_correction)
+
+    def observe(self, model_type: str, points: int, tuning: bool, seconds: float):
+        """Refine the estimates for this model type and tuning flag from one measured fit"""
+        predicted = self.prior(model_type, points, tuning)
+        if predicted <= 0 or seconds <= 0:
+            return
+        key = (model_type, bool(tuning))
+        error = math.log(seconds / predicted)
+        with self._lock:
+            current = self._log_corrections.get(key)
+            self._log_corrections[key] = error if current is None else (
+                current + self.observation_weight * (error - current))
+            self._observations[key] = self._observations.get(key, 0) + 1
+
+    def snapshot(self) -> List[Dict]:
+        """Learned correction factors for monitoring"""
+        with self._lock:
+            return [
+                {"modelType": model_type, "tuning": tuning,
+                 "correction": round(math.exp(log_correction), 3),
+                 "observations": self._observations.get((model_type, tuning), 0)}
+                for (model_type, tuning), log_correction in sorted(self._log_corrections.items())
+            ]
+
+
+def longest_first(costs: Dict[str, float]) -> List[str]:
+    """Items ordered by decreasing estimated cost (ties keep their original order)"""
+    return sorted(costs, key=lambda item: -costs[item])
+
+
+def estimated_makespan(costs: Iterable[float], workers: int) -> float:
+    """Finish time of greedy longest-first dispatch of costs onto workers"""
+    finish_times = [0.0] * max(1, int(workers))
+    for cost in sorted(costs, reverse=True):
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + cost)
+    return max(finish_times)
+
+
+# Global cost model instance; observations from every request refine it
+_cost_model = None
+_cost_model_lock = threading.Lock()
+
+def get_cost_model() -> FitCostModel:
+    """Get global fit cost model instance"""
+    global _cost_model
+    if _cost_model is None:
+        with _cost_model_lock:
+            if _cost_model is None:
+                _cost_model = FitCostModel()
+    return _cost_model
@@ -0,0 +1,207 @@
+import numpy as np
+from typing import Dict, List, Tuple
+
+# Model type served by this module (value of modelType in /train)
+SMOOTHING_MODEL_TYPE = 'Holt-Winters'
+
+# Weekly seasonality on daily data; shorter series are fitted without a seasonal component
+SEASON_LENGTH = 7
+MIN_SEASONAL_POINTS = 2 * SEASON_LENGTH
+
+# Smoothing parameters searched per item (error-correction form of additive damped Holt-Winters)
+ALPHA_GRID = (0.05, 0.1, 0.2, 0.4, 0.7)
+BETA_GRID = (0.0, 0.02, 0.1)
+GAMMA_GRID = (0.0, 0.05, 0.2)
+PHI_GRID = (0.9, 0.98)
+
+# Items x candidates rows evaluated per recursion pass; bounds peak memory for large catalogs
+MAX_ROWS_PER_PASS = 200_000
+
+
+class HoltWintersModel:
+    """Fitted additive damped-trend Holt-Winters state for one series"""
+
+    __slots__ = ('alpha', 'beta', 'gamma', 'phi', 'level', 'trend', 'seasonal', 'residual_std')
+
+    def __init__(self, alpha: float, beta: float, gamma: float, phi: float, level: float,
+                 trend: float, seasonal: np.ndarray, residual_std: float):
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.phi = phi
+        self.level = level
+        self.trend = trend
+        # seasonal[k] is the offset for the k-th day after the last training day (mod SEASON_LENGTH)
+        self.seasonal = seasonal
+        self.residual_std = residual_std
+
+    def __getstate__(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state: Dict):
+        for slot in self.__slots__:
+            setattr(self, slot, state.get(slot))
+
+    def forecast(self, steps: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Point forecast with 95% bounds widening with the horizon"""
+        values, lower, upper = forecast_models([self], steps)
+        return values[0], lower[0], upper[0]
+
+
+def forecast_models(models: List[HoltWintersModel], steps: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Forecast many fitted models in one array operation; returns items x steps values and bounds"""
+    if not models:
+        empty = np.empty((0, steps))
+        return empty, empty, empty
+    level = np.array([m.level for m in models])[:, None]
+    trend = np.array([m.trend for m in models])[:, None]
+    phi = np.array([m.phi for m in models])[:, None]
+    alpha = np.array([m.alpha for m in models])[:, None]
+    residual_std = np.array([m.residual_std for m in models])[:, None]
+    seasonal = np.stack([np.asarray(m.seasonal, dtype=float) for m in models])
+
+    h = np.arange(1, steps + 1)
+    damping = np.cumsum(phi ** h, axis=1)
+    values = level + damping * trend + seasonal[:, (h - 1) % SEASON_LENGTH]
+    values = np.maximum(values, 0)
+
+    # Random-walk style growth of the forecast error with the horizon
+    margin = 1.96 * residual_std * np.sqrt(1 + (h - 1) * alpha ** 2)
+    return values, np.maximum(values - margin, 0), values + margin
+
+
+def _parameter_grid() -> np.ndarray:
+    """All (alpha, beta, gamma, phi) candidates as a candidates x 4 array"""
+    grids = np.meshgrid(ALPHA_GRID, BETA_GRID, GAMMA_GRID, PHI_GRID, indexing='ij')
+    return np.stack([g.ravel() for g in grids], axis=1)
+
+
+def _initial_state(Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Initial level, trend and seasonal offsets per row from the first two seasons of
+    valid data. Seasonal slots are indexed by absolute calendar day (t mod SEASON_LENGTH).
+    Returns level, trend, seasonal (rows x SEASON_LENGTH) and the seasonal mask.
+    """
+    n_items, n_days = Y.shape
+    valid = ~np.isnan(Y)
+    first = np.argmax(valid, axis=1)
+    n_valid = valid.sum(axis=1)
+    seasonal_ok = n_valid >= MIN_SEASONAL_POINTS
+
+    # First two seasons after each row's start (align_series leaves no gaps inside a series)
+    offsets = first[:, None] + np.arange(2 * SEASON_LENGTH)
+    window = np.take_along_axis(Y, np.minimum(offsets, max(n_days - 1, 0)), axis=1)
+    window = np.where(offsets < n_days, window, np.nan)
+
+    with np.errstate(invalid='ignore'):
+        first_mean = np.nanmean(window[:, :SEASON_LENGTH], axis=1)
+        second_mean = np.nanmean(window[:, SEASON_LENGTH:], axis=1)
+    first_mean = np.nan_to_num(first_mean)
+    level = np.where(seasonal_ok, first_mean, np.nan_to_num(window[:, 0]))
+    trend = np.where(seasonal_ok, np.nan_to_num(second_mean - first_mean) / SEASON_LENGTH, 0.0)
+
+    seasonal = np.zeros((n_items, SEASON_LENGTH))
+    slots = offsets[:, :SEASON_LENGTH] % SEASON_LENGTH
+    deviations = np.nan_to_num(window[:, :SEASON_LENGTH] - first_mean[:, None])
+    np.put_along_axis(seasonal, slots, np.where(seasonal_ok[:, None], deviations, 0.0), axis=1)
+    return level, trend, seasonal, seasonal_ok
+
+
+def _run_recursion(Y: np.ndarray, params: np.ndarray, level: np.ndarray, trend: np.ndarray,
+                   seasonal: np.ndarray, repeats: int = 1, keep_fitted: bool = False):
+    """
+    Run the smoothing recursion for every row at once; params is rows x (alpha, beta, gamma, phi).
+    Each series of Y drives `repeats` consecutive rows (one per candidate) without copying Y.
+    NaN cells (before a series starts or after it ends) leave the state untouched.
+    Returns the in-sample squared error, final level, trend and seasonal state, and the
+    one-step-ahead fitted values when keep_fitted is set.
+    """
+    n_days = Y.shape[1]
+    n_rows = len(params)
+    alpha, beta, gamma, phi = (np.ascontiguousarray(p) for p in params.T)
+    level, trend = level.copy(), trend.copy()
+    # Day-major and slot-major layouts so each step reads and updates contiguous rows
+    seasonal = np.ascontiguousarray(seasonal.T)
+    observed = np.ascontiguousarray(~np.isnan(Y.T))
+    values = np.ascontiguousarray(np.where(observed, Y.T, 0.0))
+    sse = np.zeros(n_rows)
+    fitted = np.empty((n_rows, n_days)) if keep_fitted else None
+    damped = np.empty(n_rows)
+    error = np.empty(n_rows)
+
+    for t in range(n_days):
+        valid = np.repeat(observed[t], repeats) if repeats > 1 else observed[t]
+        season = seasonal[t % SEASON_LENGTH]
+        np.multiply(phi, trend, out=damped)
+        # error = y - (level + damped + season), zero where there is no observation
+        y = np.repeat(values[t], repeats) if repeats > 1 else values[t]
+        np.subtract(y, level, out=error)
+        error -= damped
+        error -= season
+        if keep_fitted:
+            fitted[:, t] = y - error
+        error *= valid
+        sse += error * error
+
+        level += np.where(valid, damped, 0.0) + alpha * error
+        trend = np.where(valid, damped, trend) + beta * error
+        season += gamma * error
+
+    return sse, level, trend, seasonal.T, fitted
+
+
+def fit_smoothing_models(Y: np.ndarray) -> Tuple[List[HoltWintersModel], np.ndarray]:
+    """
+    Fit one Holt-Winters model per row of an items x days matrix (see align_series).
+    Every item is paired with every grid candidate and all pairs run through one
+    recursion pass; each item keeps the candidate with the lowest in-sample one-step
+    squared error. Returns the models and the fitted values of the winners.
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    n_items, n_days = Y.shape
+    grid = _parameter_grid()
+    level0, trend0, seasonal0, seasonal_ok = _initial_state(Y)
+
+    best_params = np.zeros((n_items, grid.shape[1]))
+    chunk = max(1, MAX_ROWS_PER_PASS // len(grid))
+    for start in range(0, n_items, chunk):
+        rows = slice(start, min(start + chunk, n_items))
+        n_chunk = rows.stop - rows.start
+        params = np.tile(grid, (n_chunk, 1))
+        # Items too short for a seasonal component keep their (zero) seasonal offsets
+        params[:, 2] *= np.repeat(seasonal_ok[rows], len(grid))
+        sse, _, _, _, _ = _run_recursion(
+            Y[rows], params,
+            np.repeat(level0[rows], len(grid)), np.repeat(trend0[rows], len(grid)),
+            np.repeat(seasonal0[rows], len(grid), axis=0), repeats=len(grid)
+        )
+        best = np.argmin(sse.reshape(n_chunk, len(grid)), axis=1)
+        best_params[rows] = params.reshape(n_chunk, len(grid), -1)[np.arange(n_chunk), best]
+
+    _, level, trend, seasonal, fitted = _run_recursion(Y, best_params, level0, trend0, seasonal0,
+                                                       keep_fitted=True)
+
+    valid = ~np.isnan(Y)
+    residuals = np.where(valid, Y - fitted, np.nan)
+    with np.errstate(invalid='ignore'):
+        residual_std = np.nan_to_num(np.nanstd(residuals, axis=1)) if n_days > 0 else np.zeros(n_items)
+
+    # Each item forecasts from its own last observed day, which may precede the matrix end
+    last = n_days - 1 - np.argmax(valid[:, ::-1], axis=1)
+    steps_ahead = (last[:, None] + 1 + np.arange(SEASON_LENGTH)) % SEASON_LENGTH
+    seasonal = np.take_along_axis(seasonal, steps_ahead, axis=1)
+
+    models = [
+        HoltWintersModel(
+            alpha=float(best_params[i, 0]),
+            beta=float(best_params[i, 1]),
+            gamma=float(best_params[i, 2]),
+            phi=float(best_params[i, 3]),
+            level=float(level[i]),
+            trend=float(trend[i]),
+            seasonal=seasonal[i].astype(np.float32),
+            residual_std=float(residual_std[i])
+        )
+        for i in range(n_items)
+    ]
+    return models, fitted
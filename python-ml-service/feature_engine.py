@@ -0,0 +1,114 @@
+import numpy as np
+from typing import List
+
+DEFAULT_N_LAGS = 3
+ROLLING_MEAN_WINDOWS = (3, 7)
+ROLLING_STD_WINDOW = 3
+CALENDAR_FEATURES = ('day_of_week', 'day_of_month', 'month', 'quarter')
+
+# Calendar lookup table range in epoch days (1970-01-01 = 0); dates outside are computed directly
+CALENDAR_START = -25567  # 1900-01-01
+CALENDAR_END = 47848     # 2101-01-01
+
+# Rows needed to compute the features of a series' last row exactly
+TAIL_ROWS = max(max(ROLLING_MEAN_WINDOWS), ROLLING_STD_WINDOW, DEFAULT_N_LAGS + 1)
+
+
+def feature_names(n_lags: int = DEFAULT_N_LAGS) -> List[str]:
+    """Feature column names, in matrix column order"""
+    return ([f'lag_{i}' for i in range(1, n_lags + 1)]
+            + [f'rolling_mean_{ROLLING_MEAN_WINDOWS[0]}', f'rolling_std_{ROLLING_STD_WINDOW}',
+               f'rolling_mean_{ROLLING_MEAN_WINDOWS[1]}']
+            + list(CALENDAR_FEATURES))
+
+
+def _compute_calendar(days: np.ndarray) -> np.ndarray:
+    """Day of week (Monday=0), day of month, month and quarter for epoch days"""
+    dates = days.astype('datetime64[D]')
+    months = dates.astype('datetime64[M]')
+    month = months.astype(np.int64) % 12 + 1
+    day_of_month = (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+    # 1970-01-01 was a Thursday
+    day_of_week = (days + 3) % 7
+    quarter = (month - 1) // 3 + 1
+    return np.stack([day_of_week, day_of_month, month, quarter], axis=-1).astype(np.int8)
+
+
+_CALENDAR_TABLE = _compute_calendar(np.arange(CALENDAR_START, CALENDAR_END, dtype=np.int64))
+
+
+def calendar_features(days: np.ndarray) -> np.ndarray:
+    """Calendar features for an array of epoch days, shape days.shape + (4,)"""
+    days = np.asarray(days, dtype=np.int64)
+    index = days - CALENDAR_START
+    if days.size and (index.min() < 0 or index.max() >= len(_CALENDAR_TABLE)):
+        return _compute_calendar(days)
+    return _CALENDAR_TABLE[index]
+
+
+def _shifted(values: np.ndarray, k: int) -> np.ndarray:
+    """values shifted k steps later along the last axis, NaN where no earlier row exists"""
+    if k == 0:
+        return values
+    out = np.full(values.shape, np.nan)
+    if k < values.shape[-1]:
+        out[..., k:] = values[..., :-k]
+    return out
+
+
+def _rolling_stats(values: np.ndarray, window: int):
+    """Count, sum and stacked window of the trailing window (min_periods=1, NaN skipped)"""
+    stacked = np.stack([_shifted(values, k) for k in range(window)])
+    count = np.sum(~np.isnan(stacked), axis=0)
+    total = np.nansum(stacked, axis=0)
+    return count, total, stacked
+
+
+def build_feature_matrix(values: np.ndarray, days: np.ndarray, n_lags: int = DEFAULT_N_LAGS) -> np.ndarray:
+    """
+    Lag, rolling and calendar features for every row of one or many series.
+    values is (days,) or (items, days) with rows in date order; days holds the matching
+    epoch days (same shape, or 1-D shared by all items). Returns values.shape + (n_features,)
+    in feature_names() order. Lags are row shifts: the first rows reuse the first
+    observation, and series shorter than a lag use the series mean.
+    """
+    values = np.asarray(values, dtype=float)
+    days = np.broadcast_to(np.asarray(days, dtype=np.int64), values.shape)
+    n = values.shape[-1]
+    columns = []
+
+    series_mean = np.nanmean(values, axis=-1, keepdims=True) if n else np.zeros(values.shape[:-1] + (1,))
+    positions = np.arange(n)
+    for lag in range(1, n_lags + 1):
+        if n > lag:
+            columns.append(values[..., np.maximum(positions - lag, 0)])
+        else:
+            columns.append(np.broadcast_to(series_mean, values.shape))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        count, total, _ = _rolling_stats(values, ROLLING_MEAN_WINDOWS[0])
+        mean_3 = total / count
+        columns.append(mean_3)
+
+        count, total, stacked = _rolling_stats(values, ROLLING_STD_WINDOW)
+        mean = total / count
+        squares = np.nansum((stacked - mean) ** 2, axis=0)
+        std = np.sqrt(squares / (count - 1))
+        columns.append(np.where(count > 1, std, 0.0))
+
+        count, total, _ = _rolling_stats(values, ROLLING_MEAN_WINDOWS[1])
+        columns.append(total / count)
+
+    calendar = calendar_features(days)
+    columns.extend(calendar[..., i].astype(float) for i in range(calendar.shape[-1]))
+    return np.stack(columns, axis=-1)
+
+
+def last_row_features(values: np.ndarray, days: np.ndarray, n_lags: int = DEFAULT_N_LAGS) -> np.ndarray:
+    """Features of the last row only, computed from the shortest tail that gives the same result"""
+    values = np.asarray(values, dtype=float)
+    tail = max(TAIL_ROWS, n_lags + 1)
+    if values.shape[-1] <= tail:
+        return build_feature_matrix(values, days, n_lags)[..., -1, :]
+    days = np.asarray(days)
+    return build_feature_matrix(values[..., -tail:], days[..., -tail:], n_lags)[..., -1, :]
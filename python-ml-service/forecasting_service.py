@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 print("Starting ML Forecasting Service...", flush=True)
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_percentage_error
@@ -13,6 +12,24 @@ from statsmodels.tsa.arima.model import ARIMA
 from prophet import Prophet
 from scipy import stats
 import time
+import hashlib
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from model_record import ModelRecord, HISTORY_TAIL_DAYS, dates_to_epoch_days, epoch_days_to_dates
+from intermittent_models import INTERMITTENT_MODEL_TYPES, fit_intermittent_models, align_series
+from exponential_smoothing import SMOOTHING_MODEL_TYPE, fit_smoothing_models, forecast_models
+from prophet_engine import predict_prophet, predict_prophet_batch, fit_prophet, warm_start_params
+from backtesting import BacktestEngine, DEFAULT_FOLDS, DEFAULT_HORIZON
+from hierarchy import RECONCILIATION_METHODS, TOTAL_NODE, reconcile_hierarchy
+from rf_inference import FlatForest
+from forest_sizing import fit_adaptive_forest
+from resource_governor import get_resource_governor
+from cost_model import get_cost_model, longest_first, estimated_makespan
+from single_flight import SingleFlight, flight_key
+from model_registry import ModelRegistry
+from feature_engine import build_feature_matrix, feature_names, last_row_features
+from trivial_models import TRIVIAL_MODEL_TYPE, TRIVIAL_METRICS, ConstantModel, triage_series
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -32,8 +49,82 @@ CORS(app)
 
 print("Flask app created", flush=True)
 
-# Store trained models in memory (in production, use Redis or similar)
-trained_models = {}
+# Per-request CPU budgets so concurrent requests do not oversubscribe cores
+governor = get_resource_governor()
+GOVERNED_ENDPOINTS = ('train_model', 'forecast', 'backtest')
+
+# Per-item fit time estimates, refined by every observed fit
+cost_model = get_cost_model()
+
+@app.before_request
+def acquire_thread_budget():
+    if request.endpoint in GOVERNED_ENDPOINTS:
+        g.thread_lease = governor.acquire(request.endpoint)
+
+@app.teardown_request
+def release_thread_budget(exc=None):
+    lease = g.pop('thread_lease', None)
+    if lease is not None:
+        governor.release(lease)
+
+# Concurrent duplicate /train and /forecast requests share one computation
+train_flight = SingleFlight()
+forecast_flight = SingleFlight()
+
+def run_single_flight(flight, key, fn):
+    """
+    Run fn once for all concurrent requests with the same key.
+    Returns (payload, status, shared); duplicates give their thread lease back while waiting.
+    """
+    result, shared = flight.do(key, fn, on_wait=release_thread_budget)
+    payload, status = response_payload(result)
+    return payload, status, shared
+
+def response_payload(result):
+    """(payload, status) of a view result: a response, or a (response, status) tuple"""
+    response, status = result if isinstance(result, tuple) else (result, result.status_code)
+    return response.get_json(), status
+
+# Trained models in memory as compact ModelRecords; thread-safe, with per-model-id locks
+trained_models = ModelRegistry()
+
+SUPPORTED_MODEL_TYPES = ('Linear Regression', 'Random Forest', 'ARIMA', 'Prophet', SMOOTHING_MODEL_TYPE) + INTERMITTENT_MODEL_TYPES
+
+# Pseudo model type: /train picks a model type per item from its data characteristics
+AUTO_MODEL_TYPE = 'Auto'
+
+# Items with a larger share of zero-demand days are treated as intermittent
+INTERMITTENCY_THRESHOLD = 0.7
+
+# Model types whose intermittent items are routed to a native intermittent-demand model
+INTERMITTENT_ROUTED_MODEL_TYPES = ('Random Forest', 'Linear Regression')
+DEFAULT_INTERMITTENT_MODEL = 'SBA'
+
+# Model types fitted for all items of a request in one vectorized pass
+BATCH_MODEL_TYPES = INTERMITTENT_MODEL_TYPES + (SMOOTHING_MODEL_TYPE,)
+
+# Time-budgeted /train fits this cheap batch model for every item before upgrading any
+ANYTIME_BASELINE_MODEL_TYPE = SMOOTHING_MODEL_TYPE
+
+# Longest ARIMA/Prophet hyperparameter grid search per model
+TUNING_TIMEOUT_SECONDS = 300
+
+# Model types whose hyperparameter search stops at the /train deadline
+DEADLINE_BOUNDED_TUNING_TYPES = ('ARIMA', 'Prophet')
+
+# Model types fitted on the create_features table (shared across model types by SharedTrainingData)
+FEATURE_MODEL_TYPES = ('Linear Regression', 'Random Forest')
+
+# Items whose requested model failed on unchanged data get this batch model until their backoff ends;
+# series too short for it (fewer than 2 observations) get a constant forecast at their last value
+FAILURE_FALLBACK_MODEL_TYPE = SMOOTHING_MODEL_TYPE
+FAILURE_FALLBACK_MIN_POINTS = 2
+
+# Auto selection thresholds (see select_auto_model_type)
+AUTO_MODERATE_INTERMITTENCY = 0.3
+AUTO_MIN_SEASONAL_POINTS = 28
+AUTO_MIN_ML_POINTS = 30
+AUTO_TREND_THRESHOLD = 0.6
 
 def analyze_data_characteristics(df, item_column=None, items=None):
     """
@@ -66,11 +157,11 @@ def analyze_data_characteristics(df, item_column=None, items=None):
         # Aggregate results
         analysis['item_count'] = len(items)
         analysis['avg_intermittency'] = np.mean([a['intermittency_ratio'] for a in item_analyses.values()])
-        analysis['items_with_high_intermittency'] = sum(1 for a in item_analyses.values() if a['intermittency_ratio'] > 0.7)
+        analysis['items_with_high_intermittency'] = sum(1 for a in item_analyses.values() if a['intermittency_ratio'] > INTERMITTENCY_THRESHOLD)
         
         # Overall recommendation based on majority characteristics
         if analysis['items_with_high_intermittency'] > len(items) * 0.5:
-            analysis['recommended_models'] = ['prophet', 'arima']
+            analysis['recommended_models'] = ['sba', 'prophet', 'arima']
             analysis['reasoning'].append(f"Over 50% of items have intermittent demand (>70% zeros)")
         else:
             analysis['recommended_models'] = ['random_forest', 'linear_regression']
@@ -84,9 +175,9 @@ def analyze_data_characteristics(df, item_column=None, items=None):
         analysis.update(single_analysis)
         
         # Model recommendation logic
-        if analysis['intermittency_ratio'] > 0.7:
-            analysis['recommended_models'] = ['prophet', 'arima']
-            analysis['reasoning'].append(f"High intermittency ({analysis['intermittency_ratio']*100:.1f}% zeros) - Prophet/ARIMA handle sparse data better")
+        if analysis['intermittency_ratio'] > INTERMITTENCY_THRESHOLD:
+            analysis['recommended_models'] = ['sba', 'tsb', 'prophet', 'arima']
+            analysis['reasoning'].append(f"High intermittency ({analysis['intermittency_ratio']*100:.1f}% zeros) - Croston-family (SBA/TSB) models are built for sparse demand")
         elif analysis['intermittency_ratio'] > 0.3:
             analysis['recommended_models'] = ['arima', 'prophet']
             analysis['reasoning'].append(f"Moderate intermittency ({analysis['intermittency_ratio']*100:.1f}% zeros) - ARIMA recommended")
@@ -113,6 +204,11 @@ def analyze_data_characteristics(df, item_column=None, items=None):
     
     return analysis
 
+def intermittency_ratio(values):
+    """Share of zero-demand periods (missing values count as zero)"""
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    return float(np.mean(values == 0)) if len(values) > 0 else 0
+
 def analyze_single_series(series):
     """Analyze a single time series for characteristics"""
     result = {
@@ -129,8 +225,7 @@ def analyze_single_series(series):
     series_clean = pd.Series(series).fillna(0)
     
     # Intermittency analysis
-    zeros = (series_clean == 0).sum()
-    result['intermittency_ratio'] = zeros / len(series_clean) if len(series_clean) > 0 else 0
+    result['intermittency_ratio'] = intermittency_ratio(series_clean.values)
     
     # For non-zero values
     non_zero_values = series_clean[series_clean > 0]
@@ -168,31 +263,159 @@ def analyze_single_series(series):
     
     return result
 
+def analyze_items(frames):
+    """Run analyze_single_series for every item frame (item -> df with a value column)"""
+    return {item: analyze_single_series(df['value']) for item, df in frames.items()}
+
+def select_auto_model_type(series_analysis):
+    """
+    Pick the cheapest model type adequate for a series from its analyze_single_series result.
+    Returns (model_type, reason). Prophet and ARIMA are only chosen when seasonality, trend
+    or moderate intermittency justify their cost.
+    """
+    points = series_analysis['data_points']
+    intermittency = series_analysis['intermittency_ratio']
+    
+    if intermittency > INTERMITTENCY_THRESHOLD:
+        return DEFAULT_INTERMITTENT_MODEL, f"High intermittency ({intermittency*100:.1f}% zeros)"
+    if series_analysis['seasonality_detected'] and points >= AUTO_MIN_SEASONAL_POINTS:
+        return 'Prophet', "Weekly seasonality detected"
+    if intermittency > AUTO_MODERATE_INTERMITTENCY:
+        return 'ARIMA', f"Moderate intermittency ({intermittency*100:.1f}% zeros)"
+    if series_analysis['trend_strength'] > AUTO_TREND_THRESHOLD and points >= AUTO_MIN_ML_POINTS:
+        return 'ARIMA', f"Strong trend (strength {series_analysis['trend_strength']:.2f})"
+    if series_analysis['has_outliers'] and points >= AUTO_MIN_ML_POINTS:
+        return 'Random Forest', "Outliers detected - Random Forest is robust to outliers"
+    return 'Linear Regression', "Regular demand pattern"
+
+def resolve_item_model_types(frames, model_type, route_intermittent=True):
+    """
+    Decide the model type to fit for each item frame.
+    Auto selects per item; RF/LR send intermittent items to DEFAULT_INTERMITTENT_MODEL.
+    Returns (item -> model type, item -> auto selection reason).
+    """
+    item_model_types = {item_name: model_type for item_name in frames}
+    auto_reasons = {}
+    if model_type == AUTO_MODEL_TYPE:
+        for item_name, series_analysis in analyze_items(frames).items():
+            item_model_types[item_name], auto_reasons[item_name] = select_auto_model_type(series_analysis)
+        selection_counts = pd.Series(list(item_model_types.values()), dtype=object).value_counts().to_dict()
+        print(f"Auto model selection: {selection_counts}", flush=True)
+    elif route_intermittent and model_type in INTERMITTENT_ROUTED_MODEL_TYPES:
+        for item_name, df in frames.items():
+            if intermittency_ratio(df['value'].values) > INTERMITTENCY_THRESHOLD:
+                item_model_types[item_name] = DEFAULT_INTERMITTENT_MODEL
+                print(f"Routing intermittent item {item_name} to {DEFAULT_INTERMITTENT_MODEL}", flush=True)
+    return item_model_types, auto_reasons
+
+def history_to_frame(historical_data):
+    """Convert a list of {date, value} points to a date-sorted DataFrame"""
+    df = pd.DataFrame(historical_data)
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.sort_values('date')
+    df['value'] = df['value'].astype(float)
+    return df
+
+def data_fingerprint(df):
+    """Short digest of an item's dates and values; changes whenever the training data does"""
+    digest = hashlib.sha256(dates_to_epoch_days(df['date']).tobytes())
+    digest.update(np.ascontiguousarray(df['value'].values, dtype=float).tobytes())
+    return digest.hexdigest()[:16]
+
+def point_values(historical_data):
+    """Values of a list of {date, value} points as a float array (missing values become NaN)"""
+    return np.array([point['value'] for point in historical_data], dtype=float)
+
+@lru_cache(maxsize=1024)
+def shared_trivial_record(kind, level, last_day):
+    """One ModelRecord shared by every zero/constant item with the same level and last date"""
+    days = np.arange(last_day - HISTORY_TAIL_DAYS + 1, last_day + 1)
+    history = pd.DataFrame({'date': epoch_days_to_dates(days), 'value': level})
+    return ModelRecord(TRIVIAL_MODEL_TYPE, ConstantModel(level), history=history, is_simple=True,
+                       residual_std=0.0, training_metrics=dict(TRIVIAL_METRICS))
+
+def failure_fallback_model_type(df):
+    """Fallback model for an item whose requested model failed: one that can fit this series"""
+    if np.count_nonzero(~np.isnan(df['value'].to_numpy(dtype=float))) < FAILURE_FALLBACK_MIN_POINTS:
+        return TRIVIAL_MODEL_TYPE
+    return FAILURE_FALLBACK_MODEL_TYPE
+
+def train_last_value(df, model_id):
+    """Constant forecast at the last observed value, for series too short for any fitted model"""
+    values = df['value'].to_numpy(dtype=float)
+    observed = values[~np.isnan(values)]
+    if len(observed) == 0:
+        raise ValueError("No observed values to forecast from")
+    level = max(float(observed[-1]), 0.0)
+    kind = 'zero' if level == 0 else 'constant'
+    trained_models[model_id] = shared_trivial_record(kind, level, int(dates_to_epoch_days(df['date'])[-1]))
+    return dict(TRIVIAL_METRICS)
+
+def triage_items(items_data):
+    """
+    Find zero and constant items in one vectorized pass.
+    Returns item -> (kind, shared record); these items need no fitting, features or cache I/O.
+    """
+    trivial = triage_series({item: point_values(points) for item, points in items_data.items() if points})
+    if not trivial:
+        return {}
+    
+    # Last observed day per item, parsed in one call
+    lengths = [len(items_data[item]) for item in trivial]
+    days = dates_to_epoch_days([point['date'] for item in trivial for point in items_data[item]])
+    last_days = np.maximum.reduceat(days, np.concatenate(([0], np.cumsum(lengths)[:-1])))
+    return {
+        item: (kind, shared_trivial_record(kind, level, int(last_day)))
+        for (item, (kind, level)), last_day in zip(trivial.items(), last_days)
+    }
+
 def create_features(df, n_lags=3):
-    """Create features for Random Forest model with minimal data loss"""
-    # Use fewer lags to preserve more data
-    for i in range(1, n_lags + 1):
-        df[f'lag_{i}'] = df['value'].shift(i)
-    
-    # Rolling statistics with min_periods to avoid too much data loss
-    df['rolling_mean_3'] = df['value'].rolling(window=3, min_periods=1).mean()
-    df['rolling_std_3'] = df['value'].rolling(window=3, min_periods=1).std().fillna(0)
-    df['rolling_mean_7'] = df['value'].rolling(window=7, min_periods=1).mean()
+    """Create features for Random Forest model with minimal data loss (built by feature_engine)"""
+    features = build_feature_matrix(df['value'].to_numpy(dtype=float), dates_to_epoch_days(df['date']), n_lags)
+    df = df.assign(**dict(zip(feature_names(n_lags), features.T)))
     
-    # Date features (no NaN values)
-    df['day_of_week'] = df['date'].dt.dayofweek
-    df['day_of_month'] = df['date'].dt.day
-    df['month'] = df['date'].dt.month
-    df['quarter'] = df['date'].dt.quarter
-    
-    # Fill remaining NaN values in lag features with forward/backward fill
-    for i in range(1, n_lags + 1):
-        df[f'lag_{i}'] = df[f'lag_{i}'].fillna(method='bfill').fillna(method='ffill').fillna(df['value'].mean())
-    
-    # Only drop rows if we still have NaN (should be rare now)
-    df = df.dropna()
+    # Only drop rows without a value
+    return df.dropna()
+
+class SharedTrainingData:
+    """
+    Item frames, feature tables and Overall aggregates of one /train request, each built once.
+    Training several model types over the same request reuses them instead of re-parsing the
+    points, re-running create_features and re-aggregating the Overall series per model type.
+    """
     
-    return df
+    def __init__(self, items_data):
+        self.items_data = items_data
+        self._frames = {}
+        self._aggregates = {}
+        # id(frame) -> (frame, features); the frame is kept so its id cannot be reused
+        self._features = {}
+    
+    def frame(self, item_name):
+        """Date-sorted frame of one item's points"""
+        if item_name not in self._frames:
+            self._frames[item_name] = history_to_frame(self.items_data[item_name])
+        return self._frames[item_name]
+    
+    def features(self, df):
+        """create_features of a frame handed out by frame() or aggregate()"""
+        entry = self._features.get(id(df))
+        if entry is None or entry[0] is not df:
+            entry = self._features[id(df)] = (df, create_features(df.copy()))
+        return entry[1]
+    
+    def aggregate(self, item_names):
+        """Overall series: per date, the sum of each item's first point on that date"""
+        key = tuple(item_names)
+        if key not in self._aggregates:
+            points = pd.concat(
+                [pd.DataFrame(self.items_data[item_name], columns=['date', 'value']).drop_duplicates('date')
+                 for item_name in item_names],
+                ignore_index=True
+            )
+            totals = points.groupby('date', sort=True)['value'].sum().reset_index()
+            self._aggregates[key] = history_to_frame(totals)
+        return self._aggregates[key]
 
 def calculate_metrics(y_true, y_pred):
     """Calculate MAPE and RMSE with better handling of zero/near-zero values"""
@@ -227,20 +450,253 @@ def calculate_metrics(y_true, y_pred):
 def health():
     return jsonify({"status": "healthy", "service": "ML Forecasting Service"})
 
+def record_from_cache(cached_model, cached_metadata):
+    """ModelRecord for a cache entry; entries cached without training metrics take them from the metadata"""
+    record = ModelRecord.from_legacy(cached_model)
+    if record.training_metrics is None and cached_metadata:
+        # The record can be the cache's shared in-memory instance: set the metrics on a shallow copy
+        record = copy.copy(record)
+        record.training_metrics = cached_metadata.get('metrics')
+    return record
+
+def prophet_warm_start(cache_key):
+    """Stan parameters of the Prophet model cached under cache_key, to warm-start its retrain"""
+    if not (MODEL_CACHE_AVAILABLE and cache_key):
+        return None
+    try:
+        cached_model, _ = get_model_cache().load_model(cache_key)
+        if cached_model is None:
+            return None
+        record = ModelRecord.from_legacy(cached_model)
+    except Exception as e:
+        print(f"Could not read cached Prophet parameters for {cache_key}: {e}", flush=True)
+        return None
+    if record.type != 'Prophet' or record.is_simple:
+        return None
+    return warm_start_params(record.model)
+
+def publish_model_ref(model_id, cache_key):
+    """Let every node sharing the model store serve this model id"""
+    if not (MODEL_CACHE_AVAILABLE and cache_key):
+        return
+    try:
+        get_model_cache().save_ref(model_id, cache_key)
+    except Exception as e:
+        print(f"Failed to publish model reference for {model_id}: {e}", flush=True)
+
+def publish_model_refs(refs):
+    """publish_model_ref for many model id -> cache key pairs, with concurrent store writes"""
+    if not (MODEL_CACHE_AVAILABLE and refs):
+        return
+    workers = max(1, min(get_model_cache().load_workers, len(refs)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(publish_model_ref, refs.keys(), refs.values()))
+
+def resolve_model(model_id):
+    """ModelRecord for a model id, loaded from the shared model store if another node trained it"""
+    def load_shared():
+        if not MODEL_CACHE_AVAILABLE:
+            return None
+        try:
+            cached_model, cached_metadata = get_model_cache().load_ref(model_id)
+            if cached_model is not None:
+                print(f"Loaded model {model_id} from the shared model store", flush=True)
+                return record_from_cache(cached_model, cached_metadata)
+        except Exception as e:
+            print(f"Failed to load model {model_id} from the shared model store: {e}", flush=True)
+        return None
+    
+    # Concurrent forecasts for the same missing model load it once
+    return trained_models.get_or_load(model_id, load_shared)
+
+def training_flight_key(data):
+    """Coalescing key for /train: the inputs of the model cache key plus the requested items"""
+    items = list(data.get('itemsData') or {}) or [data.get('item', 'default_item')]
+    return flight_key(
+        data.get('schema', 'dbo'), data.get('table', 'default_table'),
+        data.get('dateCol', 'date'), data.get('itemCol', 'item'), data.get('qtyCol', 'quantity'),
+        data.get('modelType', 'Random Forest'), items,
+        data.get('planningAreas'), data.get('scenarioNames'), data.get('hyperparameterTuning', False),
+        data.get('forceRetrain', False), data.get('routeIntermittent', True), data.get('reconciliation'),
+        data.get('timeBudgetSeconds'), data.get('modelTypes'), data.get('trainOverall', True)
+    )
+
+def share_training_result(payload, base_model_id):
+    """Point a coalesced duplicate's model ids at the models trained by the leading request"""
+    leader_base = payload.get("baseModelId")
+    if leader_base is None or leader_base == base_model_id:
+        return payload
+    for suffix in list(payload.get("trainedItemNames", [])) + ["OVERALL"]:
+        model_info = trained_models.get(f"{leader_base}_{suffix}")
+        if model_info is not None:
+            trained_models[f"{base_model_id}_{suffix}"] = model_info
+    results = list(payload.get("itemsResults", {}).values()) + [payload.get("overallTrainingResult")]
+    for result in results:
+        if result and str(result.get("modelId", "")).startswith(f"{leader_base}_"):
+            result["modelId"] = base_model_id + result["modelId"][len(leader_base):]
+            if result.get("success"):
+                publish_model_ref(result["modelId"], result.get("cacheKey"))
+    payload["baseModelId"] = base_model_id
+    return payload
+
 @app.route('/train', methods=['POST'])
 def train_model():
+    data = request.json or {}
+    # modelTypes trains and compares several model types in one pass over the request data
+    run = run_model_comparison if data.get('modelTypes') else run_training
+    payload, status, shared = run_single_flight(train_flight, training_flight_key(data), lambda: run(data))
+    if shared:
+        print(f"Coalesced duplicate training request for model {data.get('modelId', 'default')}", flush=True)
+        if data.get('modelTypes') and status == 200:
+            for model_type, model_payload in payload["models"].items():
+                share_training_result(model_payload, comparison_model_id(data.get('modelId', 'default'), model_type))
+        else:
+            payload = share_training_result(payload, data.get('modelId', 'default'))
+        payload["coalesced"] = True
+    return jsonify(payload), status
+
+def comparison_model_id(base_model_id, model_type):
+    """Base model id of one model type's models in a modelTypes /train request"""
+    return f"{base_model_id}_{model_type.replace(' ', '_')}"
+
+def run_model_comparison(data):
+    """
+    Train every model type in data['modelTypes'] over the same items. Frames, feature tables
+    and Overall aggregates are built once and shared, so each extra model type costs only its fits.
+    Each model type trains under its own base model id (see comparison_model_id).
+    """
+    started_at = time.time()
+    if not isinstance(data.get('modelTypes'), list):
+        return jsonify({"error": "modelTypes must be a list of model types"}), 400
+    model_types = list(dict.fromkeys(data['modelTypes']))
+    unknown = [t for t in model_types if t not in SUPPORTED_MODEL_TYPES and t != AUTO_MODEL_TYPE]
+    if unknown:
+        return jsonify({"error": f"Unknown model type(s): {', '.join(map(str, unknown))}"}), 400
+    
+    # One deadline for the whole request: model types reached after it get baselines, not a fresh budget
+    try:
+        deadline = request_deadline(data, started_at)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    items_data = request_items_data(data)
+    shared_data = SharedTrainingData(items_data)
+    base_model_id = data.get('modelId', 'default')
+    
+    models = {}
+    # Keyed by the model type actually fitted, which routing (intermittent, fallback, budget baseline)
+    # can make differ from the requested one; types routed to the same fit share one entry
+    comparison = {item_name: {} for item_name in items_data}
+    failures = {}
+    triaged_items = {}
+    overall_comparison = {}
+    for model_type in model_types:
+        type_started = time.time()
+        type_data = dict(data, modelType=model_type, modelId=comparison_model_id(base_model_id, model_type))
+        type_data.pop('modelTypes', None)
+        payload, status = response_payload(run_training(type_data, shared_data, deadline))
+        if status != 200:
+            return jsonify({"error": f"{model_type}: {payload.get('error')}", "modelType": model_type}), status
+        payload["elapsedSeconds"] = round(time.time() - type_started, 3)
+        models[model_type] = payload
+        overall_result = payload.get("overallTrainingResult") or {}
+        overall_comparison.setdefault(overall_result.get("modelType", model_type), payload.get("overallMetrics", {}))
+        for item_name, result in payload.get("itemsResults", {}).items():
+            if not result.get("success"):
+                failures.setdefault(item_name, {})[model_type] = result.get("error")
+                continue
+            if result.get("triage"):
+                # Zero/constant items get the same flat model whatever type was requested
+                triaged_items[item_name] = result["modelType"]
+            entry = comparison[item_name].setdefault(result["modelType"], {
+                "metrics": result.get("metrics", {}),
+                "modelId": result["modelId"],
+                "requestedModelTypes": []
+            })
+            entry["requestedModelTypes"].append(model_type)
+        print(f"Trained {model_type} for {payload.get('trainedItems', 0)} items in "
+              f"{payload['elapsedSeconds']:.2f}s", flush=True)
+    
+    # Lowest training MAPE per item among the fitted model types; triaged items have no choice to make
+    best_models = {}
+    for item_name, by_type in comparison.items():
+        if item_name in triaged_items:
+            continue
+        scored = {t: entry["metrics"]["mape"] for t, entry in by_type.items() if "mape" in entry["metrics"]}
+        if scored:
+            best_type = min(scored, key=scored.get)
+            best_models[item_name] = {"modelType": best_type, "modelId": by_type[best_type]["modelId"]}
+    
+    return jsonify({
+        "success": True,
+        "modelTypes": model_types,
+        "models": models,
+        "comparison": comparison,
+        "failures": failures,
+        "overallComparison": overall_comparison,
+        "bestModelTypes": {item_name: best["modelType"] for item_name, best in best_models.items()},
+        "bestModelIds": {item_name: best["modelId"] for item_name, best in best_models.items()},
+        "triagedItems": triaged_items,
+        "baseModelId": base_model_id,
+        "elapsedSeconds": round(time.time() - started_at, 3)
+    })
+
+def within_time_budget(deadline, expected_seconds):
+    """Whether a fit expected to take expected_seconds finishes before the deadline"""
+    remaining = deadline - time.time()
+    return remaining > 0 and expected_seconds <= remaining
+
+def request_items_data(data):
+    """Item name -> points of a /train request (itemsData, or the legacy single-item fields)"""
+    items_data = data.get('itemsData', {})  # New: dict with item names as keys
+    if not items_data:
+        # Legacy single-item support
+        historical_data = data.get('historicalData', [])
+        item = data.get('item', 'default_item')
+        if historical_data and item:
+            items_data = {item: historical_data}
+    return items_data
+
+def request_deadline(data, started_at):
+    """Absolute deadline from timeBudgetSeconds (None without a budget); raises ValueError when invalid"""
+    time_budget = data.get('timeBudgetSeconds', None)
+    if time_budget is None:
+        return None
+    try:
+        budget_seconds = float(time_budget)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid timeBudgetSeconds: {time_budget}")
+    if not budget_seconds > 0:
+        raise ValueError("timeBudgetSeconds must be positive")
+    return started_at + budget_seconds
+
+def request_workers(data):
+    """
+    Workers for a request: parallelWorkers, capped at the request's thread lease (also the default).
+    Raises ValueError when parallelWorkers is not a positive integer.
+    """
+    requested = data.get('parallelWorkers', None)
+    lease = governor.current_threads()
+    if requested is None:
+        return lease
+    if isinstance(requested, bool) or not isinstance(requested, int) or requested < 1:
+        raise ValueError(f"parallelWorkers must be a positive integer: {requested}")
+    return min(requested, lease)
+
+def run_training(data, shared_data=None, deadline=None):
+    """
+    Train (or load from cache) a model per item, plus an Overall model.
+    shared_data (SharedTrainingData) carries frames and features already built for this request.
+    deadline (absolute time) replaces timeBudgetSeconds when several runs share one request's budget.
+    """
+    started_at = time.time()
     try:
-        data = request.json
         model_type = data.get('modelType', 'Random Forest')
         
         # Support both single-item (legacy) and multi-item training
-        items_data = data.get('itemsData', {})  # New: dict with item names as keys
-        if not items_data:
-            # Legacy single-item support
-            historical_data = data.get('historicalData', [])
-            item = data.get('item', 'default_item')
-            if historical_data and item:
-                items_data = {item: historical_data}
+        items_data = request_items_data(data)
+        if shared_data is None:
+            shared_data = SharedTrainingData(items_data)
         
         base_model_id = data.get('modelId', 'default')
         
@@ -254,21 +710,52 @@ def train_model():
         # Extract hierarchical filters for caching
         planning_areas = data.get('planningAreas', None)
         scenario_names = data.get('scenarioNames', None)
-        forecast_days = data.get('forecastDays', 30)
         hyperparameter_tuning = data.get('hyperparameterTuning', False)
         
         # Cache control flag
         force_retrain = data.get('forceRetrain', False)
         
+        # Send sparse items to a native intermittent-demand model instead of RF/LR
+        route_intermittent = data.get('routeIntermittent', True)
+        
+        # Hierarchical forecasts reconcile item forecasts, so no dedicated Overall model is needed
+        reconciliation = data.get('reconciliation', None)
+        
+        # Batch callers that forecast items independently can skip the aggregated Overall model
+        train_overall = data.get('trainOverall', True)
+        
         if not items_data:
             return jsonify({"error": "No items data provided."}), 400
         
+        # Anytime training: every item gets a cheap baseline, the rest of the budget upgrades the worst ones
+        try:
+            if deadline is None:
+                deadline = request_deadline(data, started_at)
+            parallel_workers = request_workers(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if reconciliation and reconciliation not in RECONCILIATION_METHODS:
+            return jsonify({"error": f"Unknown reconciliation method: {reconciliation}"}), 400
+        
+        if model_type not in SUPPORTED_MODEL_TYPES and model_type != AUTO_MODEL_TYPE:
+            return jsonify({"error": f"Unknown model type: {model_type}"}), 400
+        
         # Results for each item
         training_results = {}
         all_metrics = []
         successfully_trained = []
         
-        # Train individual models for each item
+        # Items that still need fitting after cache lookup: item -> (model_id, cache_key, df)
+        pending_items = {}
+        
+        # Items whose model may be cached: item -> (model_id, cache_key)
+        cache_lookups = {}
+        
+        # Zero and constant items get a shared flat model without fitting or cache I/O
+        trivial_records = triage_items(items_data)
+        
+        # Resolve trivial items and cache hits first; everything else is queued for training
         for item_name, historical_data in items_data.items():
             if not historical_data:
                 print(f"No data for item {item_name}, skipping", flush=True)
@@ -277,6 +764,22 @@ def train_model():
             # Create unique model ID for this item
             model_id = f"{base_model_id}_{item_name}"
             
+            if item_name in trivial_records:
+                kind, trained_models[model_id] = trivial_records[item_name]
+                training_results[item_name] = {
+                    "success": True,
+                    "modelType": TRIVIAL_MODEL_TYPE,
+                    "metrics": dict(TRIVIAL_METRICS),
+                    "trainingDataPoints": len(historical_data),
+                    "modelId": model_id,
+                    "cacheKey": None,
+                    "fromCache": False,
+                    "triage": kind
+                }
+                all_metrics.append(training_results[item_name]["metrics"])
+                successfully_trained.append(item_name)
+                continue
+            
             # Generate cache key for this item (will be used for loading or saving)
             cache_key = None
             if MODEL_CACHE_AVAILABLE:
@@ -284,126 +787,263 @@ def train_model():
                     cache = get_model_cache()
                     cache_key = cache.get_cache_key(
                         schema, table, date_col, item_col, qty_col,
-                        model_type, forecast_days, item_name, 
+                        model_type, item_name, 
                         planning_areas, scenario_names, hyperparameter_tuning
                     )
                 except Exception as e:
                     print(f"Failed to generate cache key for item {item_name}: {e}", flush=True)
             
-            # Check cache first if not forcing retrain
+            # Cache hits are resolved together below; everything else goes straight to training
             if MODEL_CACHE_AVAILABLE and not force_retrain and cache_key:
-                try:
-                    # Try to load from cache
-                    if cache.exists(schema, table, date_col, item_col, qty_col, 
-                                  model_type, forecast_days, item_name, 
-                                  planning_areas, scenario_names, hyperparameter_tuning):
-                        cached_model, cached_metadata = cache.load_model(cache_key)
-                        if cached_model is not None and cached_metadata is not None:
-                            # Store in memory for immediate use
-                            trained_models[model_id] = cached_model
-                            
-                            print(f"Loaded model from cache for item {item_name}: {cache_key}", flush=True)
-                            training_results[item_name] = {
-                                "success": True,
-                                "modelType": model_type,
-                                "metrics": cached_metadata.get('metrics', {}),
-                                "trainingDataPoints": len(historical_data),
-                                "modelId": model_id,
-                                "cacheKey": cache_key,
-                                "fromCache": True
-                            }
-                            all_metrics.append(cached_metadata.get('metrics', {}))
-                            successfully_trained.append(item_name)
-                            continue
-                except Exception as e:
-                    print(f"Cache load failed for item {item_name}: {e}", flush=True)
+                cache_lookups[item_name] = (model_id, cache_key)
+                continue
             elif force_retrain:
                 print(f"Force retrain enabled - skipping cache for item {item_name}", flush=True)
             
             # Convert to DataFrame
-            df = pd.DataFrame(historical_data)
-            df['date'] = pd.to_datetime(df['date'])
-            df = df.sort_values('date')
-            df['value'] = df['value'].astype(float)
+            pending_items[item_name] = (model_id, cache_key, shared_data.frame(item_name))
+        
+        # Load every cache hit concurrently; unpickling thousands of models one by one dominates warm requests
+        if cache_lookups:
+            load_started = time.time()
+            try:
+                cached_entries = get_model_cache().load_models([key for _, key in cache_lookups.values()])
+            except Exception as e:
+                print(f"Cache load failed: {e}", flush=True)
+                cached_entries = {}
+            
+            for item_name, (model_id, cache_key) in cache_lookups.items():
+                if cache_key not in cached_entries:
+                    pending_items[item_name] = (model_id, cache_key, shared_data.frame(item_name))
+                    continue
+                cached_model, cached_metadata = cached_entries[cache_key]
+                try:
+                    # Store in memory for immediate use (legacy dict entries are compacted)
+                    trained_models[model_id] = record_from_cache(cached_model, cached_metadata)
+                except Exception as e:
+                    print(f"Cache load failed for item {item_name}: {e}", flush=True)
+                    pending_items[item_name] = (model_id, cache_key, shared_data.frame(item_name))
+                    continue
+                training_results[item_name] = {
+                    "success": True,
+                    "modelType": trained_models[model_id].type,
+                    "metrics": cached_metadata.get('metrics', {}),
+                    "trainingDataPoints": len(items_data[item_name]),
+                    "modelId": model_id,
+                    "cacheKey": cache_key,
+                    "fromCache": True
+                }
+                all_metrics.append(cached_metadata.get('metrics', {}))
+                successfully_trained.append(item_name)
+            
+            hits = {training_results[item_name]["modelId"]: training_results[item_name]["cacheKey"]
+                    for item_name in cache_lookups if item_name in training_results}
+            publish_model_refs(hits)
+            print(f"Loaded {len(hits)} of {len(cache_lookups)} models from cache in "
+                  f"{time.time() - load_started:.2f}s", flush=True)
+        
+        # Pick the model type per item: sparse items skip RF/LR and use an intermittent-demand model
+        item_model_types, auto_reasons = resolve_item_model_types(
+            {item_name: df for item_name, (_, _, df) in pending_items.items()}, model_type, route_intermittent
+        )
+        
+        # Items whose requested model failed on this exact data are not refitted until their backoff
+        # ends; they get the fallback model instead, which is not cached under the requested model's key
+        known_failures = {}
+        if MODEL_CACHE_AVAILABLE and not force_retrain:
+            cache = get_model_cache()
+            for item_name, (model_id, cache_key, df) in pending_items.items():
+                failure = cache.get_failure(cache_key, data_fingerprint(df)) if cache_key else None
+                if failure:
+                    fallback_type = failure_fallback_model_type(df)
+                    known_failures[item_name] = {
+                        "requestedModelType": model_type,
+                        "fallbackModelType": fallback_type,
+                        "error": failure['error'],
+                        "retryAfter": failure['retry_after']
+                    }
+                    pending_items[item_name] = (model_id, None, df)
+                    item_model_types[item_name] = fallback_type
+                    auto_reasons.pop(item_name, None)
+                    print(f"Item {item_name} failed on this data before ({failure['error']}); "
+                          f"using {fallback_type} until {failure['retry_after']}", flush=True)
+        
+        # Fit all intermittent-demand items of each type, and all Holt-Winters items, in one vectorized pass
+        batch_fits = {}
+        for intermittent_type in INTERMITTENT_MODEL_TYPES:
+            frames = {item_name: pending_items[item_name][2] for item_name, t in item_model_types.items()
+                      if t == intermittent_type}
+            batch_fits.update(fit_intermittent_batch(frames, intermittent_type))
+        batch_fits.update(fit_smoothing_batch({item_name: pending_items[item_name][2]
+                                               for item_name, t in item_model_types.items()
+                                               if t == SMOOTHING_MODEL_TYPE}))
+        
+        # Longest fits start first so no worker is left with one long fit at the end
+        fit_costs = {item_name: cost_model.estimate(item_model_types[item_name], len(df), hyperparameter_tuning)
+                     for item_name, (_, _, df) in pending_items.items()}
+        training_order = longest_first(fit_costs)
+        
+        # With a time budget, items needing a per-item fit first get a baseline from one batch fit.
+        # Baselines are not cached: the cache key belongs to the requested model type.
+        baseline_items = set()
+        if deadline is not None:
+            baseline_fits = fit_smoothing_batch({item_name: pending_items[item_name][2]
+                                                 for item_name, t in item_model_types.items()
+                                                 if t not in BATCH_MODEL_TYPES})
+            for item_name, baseline_fit in baseline_fits.items():
+                model_id, _, df = pending_items[item_name]
+                try:
+                    with trained_models.lock(model_id):
+                        metrics = train_smoothing(df, model_id, baseline_fit)
+                except Exception as e:
+                    print(f"Baseline fit failed for item {item_name}: {e}", flush=True)
+                    continue
+                training_results[item_name] = {
+                    "success": True,
+                    "modelType": ANYTIME_BASELINE_MODEL_TYPE,
+                    "metrics": metrics,
+                    "trainingDataPoints": len(items_data[item_name]),
+                    "modelId": model_id,
+                    "cacheKey": None,
+                    "fromCache": False,
+                    "fidelity": "baseline"
+                }
+                baseline_items.add(item_name)
+            
+            # Items without a baseline must be trained; the rest are upgraded worst baseline error first
+            training_order.sort(key=lambda item_name: (
+                item_name in baseline_items,
+                -training_results[item_name]["metrics"].get("mape", 0) if item_name in baseline_items else 0
+            ))
+            print(f"Fitted {len(baseline_items)} baseline models in {time.time() - started_at:.2f}s "
+                  f"of a {deadline - started_at:.0f}s budget", flush=True)
+        
+        def upgrade_estimate(item_name):
+            """Expected seconds to upgrade a baseline item; tuning that stops at the deadline always fits"""
+            item_model_type = item_model_types[item_name]
+            if hyperparameter_tuning and item_model_type in DEADLINE_BOUNDED_TUNING_TYPES:
+                return 0.0
+            return cost_model.estimate(item_model_type, len(pending_items[item_name][2]), hyperparameter_tuning)
+        
+        def train_item(item_name):
+            """Fit one pending item (or keep its baseline when out of budget) and record the result"""
+            model_id, cache_key, df = pending_items[item_name]
+            historical_data = items_data[item_name]
+            item_model_type = item_model_types[item_name]
+            
+            if item_name in baseline_items and not within_time_budget(deadline, upgrade_estimate(item_name)):
+                # Out of budget: the item keeps its baseline (cheaper upgrades may still fit)
+                all_metrics.append(training_results[item_name]["metrics"])
+                successfully_trained.append(item_name)
+                return
             
             # Train based on model type
+            fit_started = time.time()
             try:
-                if model_type == 'Linear Regression':
-                    metrics = train_linear_regression(df, model_id)
-                elif model_type == 'Random Forest':
-                    metrics = train_random_forest(df, model_id, hyperparameter_tuning)
-                elif model_type == 'ARIMA':
-                    metrics = train_arima(df, model_id, hyperparameter_tuning)
-                elif model_type == 'Prophet':
-                    metrics = train_prophet(df, model_id, hyperparameter_tuning)
-                else:
-                    return jsonify({"error": f"Unknown model type: {model_type}"}), 400
+                # Requests training the same model id take turns; keep the record this request trained
+                warm_start = prophet_warm_start(cache_key) if item_model_type == 'Prophet' else None
+                features = shared_data.features(df) if item_model_type in FEATURE_MODEL_TYPES else None
+                with trained_models.lock(model_id):
+                    metrics = train_by_model_type(df, model_id, item_model_type, hyperparameter_tuning,
+                                                  batch_fit=batch_fits.get(item_name), warm_start=warm_start,
+                                                  deadline=deadline, features=features)
+                    model_info = trained_models.get(model_id)
+                # Tuning cut short by the deadline says nothing about the full fit cost
+                if deadline is None or item_model_type not in DEADLINE_BOUNDED_TUNING_TYPES:
+                    cost_model.observe(item_model_type, len(df), hyperparameter_tuning, time.time() - fit_started)
+                
+                # A search cut short is not the tuned model the cache key promises: serve it, don't cache it
+                partial = tuning_cut_short(metrics, deadline)
                 
                 # Save to cache if available
-                if MODEL_CACHE_AVAILABLE and cache_key:
+                if MODEL_CACHE_AVAILABLE and cache_key and not partial:
                     try:
                         cache = get_model_cache()
-                        model_info = trained_models.get(model_id)
                         if model_info:
                             cache.save_model(
                                 schema, table, date_col, item_col, qty_col,
-                                model_type, forecast_days, item_name,
+                                model_type, item_name,
                                 model_info, 
                                 {'metrics': metrics, 'training_points': len(historical_data), 'hyperparameter_tuning': hyperparameter_tuning},
                                 planning_areas, scenario_names, hyperparameter_tuning
                             )
                             print(f"Saved model to cache for item {item_name}: {cache_key}", flush=True)
+                            publish_model_ref(model_id, cache_key)
+                        cache.clear_failure(cache_key)
                     except Exception as e:
                         print(f"Cache save failed for item {item_name}: {e}", flush=True)
                 
                 training_results[item_name] = {
                     "success": True,
-                    "modelType": model_type,
+                    "modelType": item_model_type,
                     "metrics": metrics,
                     "trainingDataPoints": len(historical_data),
                     "modelId": model_id,
-                    "cacheKey": cache_key,
+                    "cacheKey": None if partial else cache_key,
                     "fromCache": False
                 }
+                if partial:
+                    training_results[item_name]["fidelity"] = "partial"
+                if item_name in auto_reasons:
+                    training_results[item_name]["selectionReason"] = auto_reasons[item_name]
+                if item_name in known_failures:
+                    training_results[item_name]["fallback"] = dict(known_failures[item_name])
                 all_metrics.append(metrics)
                 successfully_trained.append(item_name)
                 
             except Exception as item_error:
-                print(f"Failed to train model for item {item_name}: {str(item_error)}", flush=True)
-                training_results[item_name] = {
-                    "success": False,
-                    "error": str(item_error),
-                    "modelId": model_id
-                }
+                # Data problems fail the same way on the same data; remember them so retries are skipped
+                if isinstance(item_error, ValueError) and MODEL_CACHE_AVAILABLE and cache_key:
+                    try:
+                        get_model_cache().record_failure(cache_key, data_fingerprint(df), str(item_error))
+                    except Exception as e:
+                        print(f"Failed to record training failure for item {item_name}: {e}", flush=True)
+                if item_name in baseline_items:
+                    # The baseline record is only replaced by a successful fit, so it still serves forecasts
+                    print(f"Failed to upgrade item {item_name}, keeping its baseline: {str(item_error)}", flush=True)
+                    training_results[item_name]["upgradeError"] = str(item_error)
+                    all_metrics.append(training_results[item_name]["metrics"])
+                    successfully_trained.append(item_name)
+                elif item_name in known_failures:
+                    # Report the requested model's recorded failure, not just the fallback's
+                    print(f"Fallback {item_model_type} failed for item {item_name}: {str(item_error)}", flush=True)
+                    training_results[item_name] = {
+                        "success": False,
+                        "error": known_failures[item_name]["error"],
+                        "modelId": model_id,
+                        "fallback": dict(known_failures[item_name], fallbackError=str(item_error))
+                    }
+                else:
+                    print(f"Failed to train model for item {item_name}: {str(item_error)}", flush=True)
+                    training_results[item_name] = {
+                        "success": False,
+                        "error": str(item_error),
+                        "modelId": model_id
+                    }
+        
+        # Train individual models for each remaining item, dispatched in training order to a worker pool
+        workers = max(1, min(parallel_workers, len(training_order) or 1))
+        if training_order:
+            print(f"Scheduling {len(training_order)} items across {workers} worker(s), estimated makespan "
+                  f"{estimated_makespan(fit_costs.values(), workers):.1f}s", flush=True)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(train_item, training_order))
+        else:
+            for item_name in training_order:
+                train_item(item_name)
+        
+        # Report items in request order regardless of cache hits
+        training_results = {item: training_results[item] for item in items_data if item in training_results}
+        successfully_trained = [item for item in items_data if item in successfully_trained]
         
         # Train a separate aggregated model for Overall if multiple items
         overall_metrics = {}
         overall_training_result = None
         
-        if len(successfully_trained) > 1:
+        if len(successfully_trained) > 1 and not reconciliation and train_overall:
             # Aggregate all historical data across items for Overall model
-            all_dates = set()
-            for item_name, historical_data in items_data.items():
-                if item_name not in successfully_trained:
-                    continue
-                for point in historical_data:
-                    all_dates.add(point['date'])
-            
-            # Sort dates
-            sorted_dates = sorted(all_dates)
-            
-            # Create aggregated dataset
-            aggregated_data = []
-            for date in sorted_dates:
-                total_value = 0
-                for item_name, historical_data in items_data.items():
-                    if item_name not in successfully_trained:
-                        continue
-                    for point in historical_data:
-                        if point['date'] == date:
-                            total_value += point['value']
-                            break
-                aggregated_data.append({'date': date, 'value': total_value})
+            aggregated_df = shared_data.aggregate(successfully_trained)
             
             # Train the Overall model on aggregated data
             overall_model_id = f"{base_model_id}_OVERALL"
@@ -416,67 +1056,75 @@ def train_model():
                     cache = get_model_cache()
                     overall_cache_key = cache.get_cache_key(
                         schema, table, date_col, item_col, qty_col,
-                        model_type, forecast_days, "OVERALL", 
+                        model_type, "OVERALL", 
                         planning_areas, scenario_names, hyperparameter_tuning
                     )
                     
                     if cache.exists(schema, table, date_col, item_col, qty_col,
-                                  model_type, forecast_days, "OVERALL", 
+                                  model_type, "OVERALL", 
                                   planning_areas, scenario_names, hyperparameter_tuning):
                         cached_model, cached_metadata = cache.load_model(overall_cache_key)
                         if cached_model is not None and cached_metadata is not None:
-                            trained_models[overall_model_id] = cached_model
+                            trained_models[overall_model_id] = record_from_cache(cached_model, cached_metadata)
                             overall_metrics = cached_metadata.get('metrics', {})
                             from_cache = True
                             print(f"Loaded Overall model from cache: {overall_cache_key}", flush=True)
+                            publish_model_ref(overall_model_id, overall_cache_key)
                 except Exception as e:
                     print(f"Cache check failed for Overall model: {e}", flush=True)
             
-            if not from_cache and len(aggregated_data) > 0:
-                # Convert to DataFrame
-                df = pd.DataFrame(aggregated_data)
-                df['date'] = pd.to_datetime(df['date'])
-                df = df.sort_values('date')
-                df['value'] = df['value'].astype(float)
+            if not from_cache and len(aggregated_df) > 0:
+                df = aggregated_df
                 
                 # Train Overall model
                 try:
-                    if model_type == 'Linear Regression':
-                        overall_metrics = train_linear_regression(df, overall_model_id)
-                    elif model_type == 'Random Forest':
-                        overall_metrics = train_random_forest(df, overall_model_id, hyperparameter_tuning)
-                    elif model_type == 'ARIMA':
-                        overall_metrics = train_arima(df, overall_model_id, hyperparameter_tuning)
-                    elif model_type == 'Prophet':
-                        overall_metrics = train_prophet(df, overall_model_id, hyperparameter_tuning)
+                    overall_model_type = model_type
+                    if model_type == AUTO_MODEL_TYPE:
+                        overall_model_type, _ = select_auto_model_type(analyze_single_series(df['value']))
+                    overall_fidelity = "requested"
+                    if deadline is not None and time.time() >= deadline and overall_model_type not in BATCH_MODEL_TYPES:
+                        # Budget spent on items: the Overall model gets a baseline too
+                        overall_model_type, overall_fidelity = ANYTIME_BASELINE_MODEL_TYPE, "baseline"
+                    warm_start = prophet_warm_start(overall_cache_key) if overall_model_type == 'Prophet' else None
+                    with trained_models.lock(overall_model_id):
+                        overall_metrics = train_by_model_type(
+                            df, overall_model_id, overall_model_type, hyperparameter_tuning,
+                            warm_start=warm_start, deadline=deadline,
+                            features=shared_data.features(df) if overall_model_type in FEATURE_MODEL_TYPES else None
+                        )
+                        model_info = trained_models.get(overall_model_id)
+                    if tuning_cut_short(overall_metrics, deadline):
+                        overall_fidelity = "partial"
                     
                     # Save Overall model to cache
-                    if MODEL_CACHE_AVAILABLE and overall_cache_key:
+                    if MODEL_CACHE_AVAILABLE and overall_cache_key and overall_fidelity == "requested":
                         try:
                             cache = get_model_cache()
-                            model_info = trained_models.get(overall_model_id)
                             if model_info:
                                 cache.save_model(
                                     schema, table, date_col, item_col, qty_col,
-                                    model_type, forecast_days, "OVERALL",
+                                    model_type, "OVERALL",
                                     model_info,
-                                    {'metrics': overall_metrics, 'training_points': len(aggregated_data), 'hyperparameter_tuning': hyperparameter_tuning},
+                                    {'metrics': overall_metrics, 'training_points': len(aggregated_df), 'hyperparameter_tuning': hyperparameter_tuning},
                                     planning_areas, scenario_names, hyperparameter_tuning
                                 )
                                 print(f"Saved Overall model to cache: {overall_cache_key}", flush=True)
+                                publish_model_ref(overall_model_id, overall_cache_key)
                         except Exception as e:
                             print(f"Cache save failed for Overall model: {e}", flush=True)
                     
                     overall_training_result = {
                         "success": True,
-                        "modelType": model_type,
+                        "modelType": overall_model_type,
                         "metrics": overall_metrics,
-                        "trainingDataPoints": len(aggregated_data),
+                        "trainingDataPoints": len(aggregated_df),
                         "modelId": overall_model_id,
-                        "cacheKey": overall_cache_key,
+                        "cacheKey": overall_cache_key if overall_fidelity == "requested" else None,
                         "fromCache": from_cache
                     }
-                    print(f"Successfully trained Overall model on {len(aggregated_data)} aggregated data points", flush=True)
+                    if deadline is not None:
+                        overall_training_result["fidelity"] = overall_fidelity
+                    print(f"Successfully trained Overall model on {len(aggregated_df)} aggregated data points", flush=True)
                     
                 except Exception as overall_error:
                     print(f"Failed to train Overall model: {str(overall_error)}", flush=True)
@@ -485,12 +1133,12 @@ def train_model():
                         "error": str(overall_error),
                         "modelId": overall_model_id
                     }
-        else:
+        elif len(successfully_trained) == 1:
             # If only one item, use its metrics as overall
             if all_metrics:
                 overall_metrics = all_metrics[0]
         
-        return jsonify({
+        response = {
             "success": True,
             "modelType": model_type,
             "overallMetrics": overall_metrics,
@@ -500,15 +1148,160 @@ def train_model():
             "trainedItems": len(successfully_trained),
             "baseModelId": base_model_id,
             "trainedItemNames": successfully_trained
-        })
+        }
+        
+        if deadline is not None:
+            # Cached and trained items have the requested model; zero/constant items their exact flat model
+            for result in training_results.values():
+                if result.get("success") and "fidelity" not in result:
+                    result["fidelity"] = "trivial" if result.get("triage") else "requested"
+            fidelity_counts = pd.Series([result["fidelity"] for result in training_results.values() if "fidelity" in result],
+                                        dtype=object).value_counts().to_dict()
+            response["timeBudget"] = {
+                # Time this run had left: a shared request deadline may have been partly spent before it
+                "budgetSeconds": round(deadline - started_at, 3),
+                "elapsedSeconds": round(time.time() - started_at, 3),
+                "fidelityCounts": fidelity_counts
+            }
+        
+        return jsonify(response)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def train_random_forest(df, model_id, hyperparameter_tuning=False):
+def tuning_cut_short(metrics, deadline=None):
+    """Whether a hyperparameter search stopped at the request deadline before covering its grid"""
+    return deadline is not None and metrics.get('search_complete') is False
+
+def tuning_timeout(start_time, deadline=None):
+    """Seconds a hyperparameter grid search may run: 5 minutes, or less when a request deadline is closer"""
+    if deadline is None:
+        return TUNING_TIMEOUT_SECONDS
+    return max(0.0, min(TUNING_TIMEOUT_SECONDS, deadline - start_time))
+
+def train_by_model_type(df, model_id, model_type, hyperparameter_tuning=False, batch_fit=None, warm_start=None,
+                        deadline=None, features=None):
+    """Dispatch training to the trainer for model_type and return its metrics (features: create_features(df) if built)"""
+    trivial = triage_series({model_id: df['value'].to_numpy(dtype=float)})
+    if trivial:
+        kind, level = trivial[model_id]
+        trained_models[model_id] = shared_trivial_record(kind, level, int(dates_to_epoch_days(df['date'])[-1]))
+        return dict(TRIVIAL_METRICS)
+    if model_type == 'Linear Regression':
+        return train_linear_regression(df, model_id, features)
+    elif model_type == 'Random Forest':
+        return train_random_forest(df, model_id, hyperparameter_tuning, features)
+    elif model_type == 'ARIMA':
+        return train_arima(df, model_id, hyperparameter_tuning, deadline)
+    elif model_type == 'Prophet':
+        return train_prophet(df, model_id, hyperparameter_tuning, warm_start, deadline)
+    elif model_type in INTERMITTENT_MODEL_TYPES:
+        return train_intermittent(df, model_id, model_type, batch_fit)
+    elif model_type == SMOOTHING_MODEL_TYPE:
+        return train_smoothing(df, model_id, batch_fit)
+    elif model_type == TRIVIAL_MODEL_TYPE:
+        return train_last_value(df, model_id)
+    raise ValueError(f"Unknown model type: {model_type}")
+
+def fit_intermittent_batch(frames, model_type):
+    """
+    Fit Croston/SBA/TSB for many items at once on a shared daily calendar.
+    Returns item -> (model, actual values, fitted values) for train_intermittent.
+    """
+    frames = {item: df for item, df in frames.items() if len(df) >= 2}
+    if not frames:
+        return {}
+    
+    series = {item: (dates_to_epoch_days(df['date']), df['value'].values) for item, df in frames.items()}
+    items, Y = align_series(series)
+    models, fitted = fit_intermittent_models(Y, model_type)
+    print(f"Fitted {model_type} for {len(items)} items in one pass", flush=True)
+    
+    fits = {}
+    for row, item in enumerate(items):
+        valid = ~np.isnan(Y[row])
+        fits[item] = (models[row], Y[row][valid], fitted[row][valid])
+    return fits
+
+def train_intermittent(df, model_id, model_type, intermittent_fit=None):
+    """Train a Croston, SBA or TSB intermittent-demand model"""
+    if len(df) < 2:
+        raise ValueError(f"{model_type} requires at least 2 data points. Found only {len(df)} row(s). Please select a different item or date range with more historical data.")
+    
+    if intermittent_fit is None:
+        intermittent_fit = fit_intermittent_batch({model_id: df}, model_type)[model_id]
+    model, y_true, y_fit = intermittent_fit
+    
+    mape, rmse = calculate_metrics(y_true, y_fit)
+    metrics = {
+        "mape": mape,
+        "rmse": rmse,
+        "accuracy": max(0, 100 - mape),
+        "alpha": model.alpha
+    }
+    if model.beta is not None:
+        metrics["beta"] = model.beta
+    
+    trained_models[model_id] = ModelRecord(
+        model_type, model, history=df,
+        residual_std=model.residual_std,
+        training_metrics=metrics
+    )
+    
+    return metrics
+
+def fit_smoothing_batch(frames):
+    """
+    Fit Holt-Winters for many items at once on a shared daily calendar.
+    Returns item -> (model, actual values, fitted values) for train_smoothing.
+    """
+    frames = {item: df for item, df in frames.items() if len(df) >= 2}
+    if not frames:
+        return {}
+    
+    series = {item: (dates_to_epoch_days(df['date']), df['value'].values) for item, df in frames.items()}
+    items, Y = align_series(series)
+    models, fitted = fit_smoothing_models(Y)
+    print(f"Fitted {SMOOTHING_MODEL_TYPE} for {len(items)} items in one pass", flush=True)
+    
+    fits = {}
+    for row, item in enumerate(items):
+        valid = ~np.isnan(Y[row])
+        fits[item] = (models[row], Y[row][valid], fitted[row][valid])
+    return fits
+
+def train_smoothing(df, model_id, smoothing_fit=None):
+    """Train an additive damped-trend Holt-Winters model"""
+    if len(df) < 2:
+        raise ValueError(f"{SMOOTHING_MODEL_TYPE} requires at least 2 data points. Found only {len(df)} row(s). Please select a different item or date range with more historical data.")
+    
+    if smoothing_fit is None:
+        smoothing_fit = fit_smoothing_batch({model_id: df})[model_id]
+    model, y_true, y_fit = smoothing_fit
+    
+    mape, rmse = calculate_metrics(y_true, y_fit)
+    metrics = {
+        "mape": mape,
+        "rmse": rmse,
+        "accuracy": max(0, 100 - mape),
+        "alpha": model.alpha,
+        "beta": model.beta,
+        "gamma": model.gamma,
+        "phi": model.phi
+    }
+    
+    trained_models[model_id] = ModelRecord(
+        SMOOTHING_MODEL_TYPE, model, history=df,
+        residual_std=model.residual_std,
+        training_metrics=metrics
+    )
+    
+    return metrics
+
+def train_random_forest(df, model_id, hyperparameter_tuning=False, features=None):
     """Train Random Forest model with optional hyperparameter tuning"""
-    # Create features
-    df_features = create_features(df.copy())
+    # Create features (unless the caller already built them for this frame)
+    df_features = features if features is not None else create_features(df.copy())
     
     # Check if we have enough data after feature engineering
     if len(df_features) < 2:
@@ -519,47 +1312,46 @@ def train_random_forest(df, model_id, hyperparameter_tuning=False):
     X = df_features[feature_cols]
     y = df_features['value']
     
-    # Train model
-    model = RandomForestRegressor(
-        n_estimators=100,
-        max_depth=10,
-        min_samples_split=5,
-        random_state=42,
-        n_jobs=-1
-    )
-    model.fit(X, y)
+    # Train model sized to the data: recent rows, subsampled trees, tree count from OOB convergence
+    model, start, complexity = fit_adaptive_forest(X.values, y.values, random_state=42,
+                                                   n_jobs=governor.current_threads())
     
-    # Calculate training metrics
-    y_pred = model.predict(X)
-    mape, rmse = calculate_metrics(y.values, y_pred)
+    # Flatten the trees once so inference skips per-call joblib dispatch
+    flat_forest = FlatForest(model)
+    
+    # Calculate training metrics on the rows the forest was fitted on
+    y_fit = y.values[start:]
+    y_pred = flat_forest.predict(X.values[start:])
+    mape, rmse = calculate_metrics(y_fit, y_pred)
     
     # Calculate prediction intervals using quantile regression approach
     # Estimate confidence intervals from residuals
-    residuals = y.values - y_pred
+    residuals = y_fit - y_pred
     residual_std = np.std(residuals)
     
     # Store model and feature info with training metrics
     metrics = {
         "mape": mape,
         "rmse": rmse,
-        "accuracy": max(0, 100 - mape)
+        "accuracy": max(0, 100 - mape),
+        **complexity
     }
     
-    trained_models[model_id] = {
-        'model': model,
-        'type': 'Random Forest',
-        'feature_cols': feature_cols,
-        'residual_std': residual_std,
-        'last_data': df.tail(30).copy(),  # Keep last 30 days for forecasting
-        'training_metrics': metrics  # Store training metrics with the model
-    }
+    # The flat forest replaces the sklearn object: forecasting only needs the flat arrays
+    trained_models[model_id] = ModelRecord(
+        'Random Forest', flat_forest, history=df,
+        feature_cols=feature_cols,
+        residual_std=float(residual_std),
+        training_metrics=metrics,  # Store training metrics with the model
+        flat_forest=flat_forest
+    )
     
     return metrics
 
-def train_linear_regression(df, model_id):
+def train_linear_regression(df, model_id, features=None):
     """Train Linear Regression model"""
-    # Create features (simpler than Random Forest)
-    df_features = create_features(df.copy())
+    # Create features (simpler than Random Forest), unless the caller already built them for this frame
+    df_features = features if features is not None else create_features(df.copy())
     
     # Check if we have enough data after feature engineering
     if len(df_features) < 2:
@@ -570,9 +1362,9 @@ def train_linear_regression(df, model_id):
     X = df_features[feature_cols]
     y = df_features['value']
     
-    # Scale features for better performance
+    # Scale features for better performance; fitted on arrays, as the forecast loop transforms bare rows
     scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    X_scaled = scaler.fit_transform(X.values)
     
     # Train model
     model = LinearRegression()
@@ -593,20 +1385,18 @@ def train_linear_regression(df, model_id):
         "accuracy": max(0, 100 - mape)
     }
     
-    trained_models[model_id] = {
-        'model': model,
-        'scaler': scaler,
-        'type': 'Linear Regression',
-        'feature_cols': feature_cols,
-        'residual_std': residual_std,
-        'last_data': df.tail(30).copy(),  # Keep last 30 days for forecasting
-        'training_metrics': metrics  # Store training metrics with the model
-    }
+    trained_models[model_id] = ModelRecord(
+        'Linear Regression', model, history=df,
+        scaler=scaler,
+        feature_cols=feature_cols,
+        residual_std=float(residual_std),
+        training_metrics=metrics  # Store training metrics with the model
+    )
     
     return metrics
 
-def train_arima(df, model_id, hyperparameter_tuning=False):
-    """Train ARIMA model with optional hyperparameter tuning and seasonal support"""
+def train_arima(df, model_id, hyperparameter_tuning=False, deadline=None):
+    """Train ARIMA model with optional hyperparameter tuning (stopped at deadline) and seasonal support"""
     values = df['value'].values
     
     # ARIMA requires at least 2 data points
@@ -616,12 +1406,13 @@ def train_arima(df, model_id, hyperparameter_tuning=False):
     if hyperparameter_tuning:
         # Enhanced ARIMA with seasonal and trend components + timeout protection
         start_time = time.time()
-        timeout_seconds = 300  # 5 minute timeout
+        timeout_seconds = tuning_timeout(start_time, deadline)
         
         best_aic = np.inf
         best_order = None
         best_seasonal_order = None
         best_model = None
+        search_complete = True
         
         # Expanded search space for ARIMA parameters
         p_values = range(0, 4)
@@ -637,7 +1428,8 @@ def train_arima(df, model_id, hyperparameter_tuning=False):
                 for q in q_values:
                     # Check timeout
                     if time.time() - start_time > timeout_seconds:
-                        print(f"ARIMA grid search timeout after {timeout_seconds}s", flush=True)
+                        print(f"ARIMA grid search timeout after {timeout_seconds:.0f}s", flush=True)
+                        search_complete = False
                         break
                     try:
                         model = ARIMA(values, order=(p, d, q))
@@ -659,7 +1451,8 @@ def train_arima(df, model_id, hyperparameter_tuning=False):
                             for Q in range(0, 3):
                                 # Check timeout
                                 if time.time() - start_time > timeout_seconds:
-                                    print(f"ARIMA seasonal search timeout after {timeout_seconds}s", flush=True)
+                                    print(f"ARIMA seasonal search timeout after {timeout_seconds:.0f}s", flush=True)
+                                    search_complete = False
                                     break
                                 try:
                                     model = ARIMA(values, order=(1, 1, 1), seasonal_order=(P, D, Q, s))
@@ -690,24 +1483,25 @@ def train_arima(df, model_id, hyperparameter_tuning=False):
             values_aligned = values
             
         mape, rmse = calculate_metrics(values_aligned, y_pred)
-        
-        # Store model
-        trained_models[model_id] = {
-            'model': best_model,
-            'type': 'ARIMA',
-            'order': best_order,
-            'seasonal_order': best_seasonal_order,
-            'last_data': df.copy()
-        }
-        
-        return {
+        metrics = {
             "mape": mape,
             "rmse": rmse,
             "accuracy": max(0, 100 - mape),
             "best_order": best_order,
             "seasonal_order": best_seasonal_order,
-            "aic": float(best_aic)
+            "aic": float(best_aic),
+            "search_complete": search_complete
         }
+        
+        # Store model with its training metrics
+        trained_models[model_id] = ModelRecord(
+            'ARIMA', best_model, history=df,
+            order=best_order,
+            seasonal_order=best_seasonal_order,
+            training_metrics=metrics
+        )
+        
+        return metrics
     else:
         # Use default ARIMA(1,1,1) for backward compatibility
         try:
@@ -723,26 +1517,29 @@ def train_arima(df, model_id, hyperparameter_tuning=False):
                 y_pred = y_pred[-len(values):]
                 
             mape, rmse = calculate_metrics(values, y_pred)
-            
-            # Store model
-            trained_models[model_id] = {
-                'model': model_fit,
-                'type': 'ARIMA',
-                'order': (1, 1, 1),
-                'seasonal_order': None,
-                'last_data': df.copy()
-            }
-            
-            return {
+            metrics = {
                 "mape": mape,
                 "rmse": rmse,
                 "accuracy": max(0, 100 - mape)
             }
+            
+            # Store model with its training metrics
+            trained_models[model_id] = ModelRecord(
+                'ARIMA', model_fit, history=df,
+                order=(1, 1, 1),
+                seasonal_order=None,
+                training_metrics=metrics
+            )
+            
+            return metrics
         except Exception as e:
             raise ValueError(f"ARIMA training failed: {str(e)}")
 
-def train_prophet(df, model_id, hyperparameter_tuning=False):
-    """Train Prophet model with optional hyperparameter tuning"""
+def train_prophet(df, model_id, hyperparameter_tuning=False, warm_start=None, deadline=None):
+    """
+    Train Prophet model with optional hyperparameter tuning (stopped at deadline),
+    warm-started from warm_start Stan parameters
+    """
     # Prepare data for Prophet (requires 'ds' and 'y' columns)
     prophet_df = df[['date', 'value']].copy()
     prophet_df.columns = ['ds', 'y']
@@ -769,36 +1566,25 @@ def train_prophet(df, model_id, hyperparameter_tuning=False):
         # Data is essentially flat and near zero - use a simple average forecast
         print(f"Warning: Data has very low variance (std={data_std:.4f}, mean={data_mean:.4f}). Using simple average forecast.", flush=True)
         
-        # Create a simple model that returns the mean
-        class SimpleAverageModel:
-            def __init__(self, mean_value):
-                self.mean = mean_value
-            
-            def predict(self, future):
-                predictions = pd.DataFrame()
-                predictions['ds'] = future['ds']
-                predictions['yhat'] = self.mean
-                predictions['yhat_lower'] = self.mean * 0.9  # Simple confidence interval
-                predictions['yhat_upper'] = self.mean * 1.1
-                return predictions
-        
-        simple_model = SimpleAverageModel(data_mean)
-        
-        # Store the simple model
-        trained_models[model_id] = {
-            'model': simple_model,
-            'type': 'Prophet',
-            'is_simple': True,
-            'last_data': df.copy()
-        }
+        # Flat forecast at the mean with a simple +/-10% interval
+        simple_model = ConstantModel(max(data_mean, 0), max(data_mean * 0.9, 0), max(data_mean * 1.1, 0))
         
         # Return appropriate metrics
-        return {
+        metrics = {
             "mape": 0.0 if data_std == 0 else 10.0,  # Small error for flat data
             "rmse": data_std,
             "accuracy": 90.0 if data_std == 0 else 90.0,
             "warning": "Data has very low variance. Using simple average forecast."
         }
+        
+        # Store the simple model
+        trained_models[model_id] = ModelRecord(
+            'Prophet', simple_model, history=df,
+            is_simple=True,
+            training_metrics=metrics
+        )
+        
+        return metrics
     
     if hyperparameter_tuning:
         # Enhanced Prophet hyperparameter tuning with cross-validation
@@ -812,10 +1598,16 @@ def train_prophet(df, model_id, hyperparameter_tuning=False):
         best_mape = np.inf
         best_params = None
         best_model = None
+        best_candidate = None
+        search_complete = True
+        
+        # Each candidate starts Stan from the previous candidate of the same seasonality mode
+        # (neighbours in the grid), or from the cached model's parameters
+        mode_inits = {}
         
         # Grid search with timeout protection
         start_time = time.time()
-        timeout_seconds = 300  # 5 minute timeout
+        timeout_seconds = tuning_timeout(start_time, deadline)
         
         for changepoint_prior in param_grid['changepoint_prior_scale']:
             for seasonality_prior in param_grid['seasonality_prior_scale']:
@@ -823,7 +1615,8 @@ def train_prophet(df, model_id, hyperparameter_tuning=False):
                     for changepoint_range in param_grid['changepoint_range']:
                         # Check timeout
                         if time.time() - start_time > timeout_seconds:
-                            print(f"Prophet grid search timeout after {timeout_seconds}s", flush=True)
+                            print(f"Prophet grid search timeout after {timeout_seconds:.0f}s", flush=True)
+                            search_complete = False
                             break
                             
                         try:
@@ -837,7 +1630,7 @@ def train_prophet(df, model_id, hyperparameter_tuning=False):
                                 test_subset = prophet_df
                             
                             # Train model on subset
-                            model = Prophet(
+                            model = fit_prophet(lambda: Prophet(
                                 changepoint_prior_scale=changepoint_prior,
                                 seasonality_prior_scale=seasonality_prior,
                                 seasonality_mode=seasonality_mode,
@@ -845,8 +1638,8 @@ def train_prophet(df, model_id, hyperparameter_tuning=False):
                                 daily_seasonality=True,
                                 weekly_seasonality=True,
                                 yearly_seasonality=True
-                            )
-                            model.fit(train_subset)
+                            ), train_subset, mode_inits.get(seasonality_mode, warm_start))
+                            mode_inits[seasonality_mode] = warm_start_params(model)
                             
                             # Validate on test set
                             if len(test_subset) > 0:
@@ -869,29 +1662,31 @@ def train_prophet(df, model_id, hyperparameter_tuning=False):
                                         'seasonality_mode': seasonality_mode,
                                         'changepoint_range': changepoint_range
                                     }
-                                    # Train final model on full data with best params
-                                    best_model = Prophet(
-                                        changepoint_prior_scale=changepoint_prior,
-                                        seasonality_prior_scale=seasonality_prior,
-                                        seasonality_mode=seasonality_mode,
-                                        changepoint_range=changepoint_range,
-                                        daily_seasonality=True,
-                                        weekly_seasonality=True,
-                                        yearly_seasonality=True
-                                    )
-                                    best_model.fit(prophet_df)
+                                    best_candidate = model
                                     
                         except Exception as e:
                             continue
         
+        if best_params is not None:
+            # Train final model on full data with best params, starting from the winning candidate's fit
+            try:
+                best_model = fit_prophet(lambda: Prophet(
+                    **best_params,
+                    daily_seasonality=True,
+                    weekly_seasonality=True,
+                    yearly_seasonality=True
+                ), prophet_df, warm_start_params(best_candidate))
+            except Exception as e:
+                print(f"Prophet refit with best params failed: {e}", flush=True)
+                best_model = None
+        
         if best_model is None:
             # Fallback to default Prophet
-            best_model = Prophet(
+            best_model = fit_prophet(lambda: Prophet(
                 daily_seasonality=True,
                 weekly_seasonality=True,
                 yearly_seasonality=True
-            )
-            best_model.fit(prophet_df)
+            ), prophet_df, warm_start)
             best_params = {"default_params": True}
         
         # Calculate final metrics on full training data
@@ -899,30 +1694,30 @@ def train_prophet(df, model_id, hyperparameter_tuning=False):
         y_pred = forecast['yhat'].values
         y_true = prophet_df['y'].values
         mape, rmse = calculate_metrics(y_true, y_pred)
-        
-        # Store model
-        trained_models[model_id] = {
-            'model': best_model,
-            'type': 'Prophet',
-            'best_params': best_params,
-            'last_data': df.copy()
-        }
-        
-        return {
+        metrics = {
             "mape": mape,
             "rmse": rmse,
             "accuracy": max(0, 100 - mape),
-            "best_params": best_params
+            "best_params": best_params,
+            "search_complete": search_complete
         }
+        
+        # Store model with its training metrics
+        trained_models[model_id] = ModelRecord(
+            'Prophet', best_model, history=df,
+            best_params=best_params,
+            training_metrics=metrics
+        )
+        
+        return metrics
     else:
         # Use default Prophet parameters for backward compatibility
-        model = Prophet(
+        model = fit_prophet(lambda: Prophet(
             daily_seasonality=True,
             weekly_seasonality=True,
             yearly_seasonality=True,
             changepoint_prior_scale=0.05
-        )
-        model.fit(prophet_df)
+        ), prophet_df, warm_start)
         
         # Make predictions on training data
         forecast = model.predict(prophet_df)
@@ -930,19 +1725,16 @@ def train_prophet(df, model_id, hyperparameter_tuning=False):
         y_true = prophet_df['y'].values
         
         mape, rmse = calculate_metrics(y_true, y_pred)
-        
-        # Store model
-        trained_models[model_id] = {
-            'model': model,
-            'type': 'Prophet',
-            'last_data': df.copy()
-        }
-        
-        return {
+        metrics = {
             "mape": mape,
             "rmse": rmse,
             "accuracy": max(0, 100 - mape)
         }
+        
+        # Store model with its training metrics
+        trained_models[model_id] = ModelRecord('Prophet', model, history=df, training_metrics=metrics)
+        
+        return metrics
 
 def calculate_summed_overall_forecast(individual_forecasts):
     """Fallback function to calculate overall forecast by summing individual forecasts"""
@@ -1011,11 +1803,93 @@ def calculate_summed_overall_forecast(individual_forecasts):
     
     return None
 
+def hierarchy_path(entry):
+    """Group labels above an item, top down: scenario then planning area"""
+    if isinstance(entry, (list, tuple)):
+        return [str(label) for label in entry if label]
+    if isinstance(entry, dict):
+        return [str(entry[key]) for key in ('scenario', 'planningArea') if entry.get(key)]
+    return [str(entry)] if entry else []
+
+def build_hierarchical_forecast(individual_forecasts, item_frames, item_hierarchy, method, item_models):
+    """
+    Reconcile item forecasts across the item -> planning area -> total hierarchy.
+    Item forecasts in individual_forecasts are replaced with their reconciled values.
+    Returns (overall forecast, {node: forecast} for every aggregate node).
+    """
+    items = list(individual_forecasts.keys())
+    dates = sorted({p['date'] for item in items for p in individual_forecasts[item]['forecast']})
+    date_index = {d: col for col, d in enumerate(dates)}
+    
+    base = np.zeros((len(items), len(dates)))
+    halfwidth = np.zeros((len(items), len(dates)))
+    variances = np.zeros(len(items))
+    for row, item in enumerate(items):
+        for p in individual_forecasts[item]['forecast']:
+            col = date_index[p['date']]
+            base[row, col] = p['value']
+            halfwidth[row, col] = (p['upper'] - p['lower']) / 2
+        residual_std = item_models[item].get('residual_std')
+        if residual_std is None:
+            residual_std = individual_forecasts[item]['metrics'].get('rmse', np.mean(halfwidth[row]) / 1.96)
+        variances[row] = float(residual_std) ** 2
+    
+    series = {item: (dates_to_epoch_days(item_frames[item]['date']), item_frames[item]['value'].values) for item in items}
+    _, history = align_series(series)
+    history_start = min(int(days.min()) for days, _ in series.values())
+    history_dates = epoch_days_to_dates(np.arange(history.shape[1]) + history_start).strftime('%Y-%m-%d')
+    
+    result = reconcile_hierarchy(
+        {item: hierarchy_path(item_hierarchy.get(item)) for item in items},
+        history, base, halfwidth, variances, method
+    )
+    
+    def node_forecast(row):
+        values, hw = result['values'][row], result['halfwidth'][row]
+        return [
+            {"date": d, "value": float(v), "lower": float(max(0, v - w)), "upper": float(v + w)}
+            for d, v, w in zip(dates, values, hw)
+        ]
+    
+    n_aggregate = result['n_aggregate']
+    for offset, item in enumerate(items):
+        individual_forecasts[item]['forecast'] = node_forecast(n_aggregate + offset)
+        individual_forecasts[item]['reconciled'] = True
+    
+    nodes = {
+        result['labels'][row]: {"level": result['levels'][row], "forecast": node_forecast(row)}
+        for row in range(n_aggregate)
+    }
+    
+    total_history = result['history'][0]
+    all_item_metrics = [individual_forecasts[item]['metrics'] for item in items]
+    overall_metrics = {
+        key: float(np.mean([m[key] for m in all_item_metrics if key in m]))
+        for key in ('mape', 'rmse', 'accuracy') if any(key in m for m in all_item_metrics)
+    }
+    overall_forecast = {
+        "historical": [{"date": d, "value": float(v)} for d, v in zip(history_dates, total_history)],
+        "forecast": nodes[TOTAL_NODE]['forecast'],
+        "metrics": overall_metrics,
+        "modelType": f"Hierarchical ({method})",
+        "usingDedicatedModel": False,
+        "reconciliation": method
+    }
+    return overall_forecast, nodes
+
 @app.route('/forecast', methods=['POST'])
 def forecast():
+    data = request.json or {}
+    # Forecasts depend on the posted history, so the whole payload is the key
+    payload, status, shared = run_single_flight(forecast_flight, flight_key(data), lambda: run_forecast(data))
+    if shared:
+        print("Coalesced duplicate forecast request", flush=True)
+        payload["coalesced"] = True
+    return jsonify(payload), status
+
+def run_forecast(data):
+    """Forecast every item with its trained model, plus the Overall forecast"""
     try:
-        data = request.json
-        
         # Support both single-item (legacy) and multi-item forecasting
         items_data = data.get('itemsData', {})  # New: dict with item names as keys and historical data as values
         if not items_data:
@@ -1031,77 +1905,93 @@ def forecast():
         base_model_id = data.get('baseModelId', data.get('modelId', 'default'))
         forecast_days = data.get('forecastDays', 30)
         
+        # Prophet prediction controls: fewer uncertainty samples trade interval precision for speed
+        uncertainty_samples = data.get('uncertaintySamples', None)
+        try:
+            parallel_workers = request_workers(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Hierarchical reconciliation: item -> {scenario, planningArea} groups, method bottom_up/top_down/mint
+        reconciliation = data.get('reconciliation', None)
+        item_hierarchy = data.get('itemHierarchy', {}) or {}
+        
         if not items_data:
             return jsonify({"error": "No items data provided"}), 400
         
+        if reconciliation and reconciliation not in RECONCILIATION_METHODS:
+            return jsonify({"error": f"Unknown reconciliation method: {reconciliation}"}), 400
+        
         # Results for each item
         individual_forecasts = {}
         successful_forecasts = []
         
-        # Generate forecasts for each item
+        # Build each item's history frame up front so Prophet items can be predicted as one batch
+        item_frames = {}
+        # Records are looked up once, so a concurrent retrain cannot swap a model mid-request
+        item_models = {}
         for item_name, historical_data in items_data.items():
             # Get the model ID for this item
             model_id = f"{base_model_id}_{item_name}"
             
-            if model_id not in trained_models:
+            model_info = resolve_model(model_id)
+            if model_info is None and historical_data:
+                # Zero/constant items are never cached, so another node may have trained them
+                model_info = triage_items({item_name: historical_data}).get(item_name, (None, None))[1]
+            if model_info is None:
                 print(f"No trained model found for item {item_name} with ID: {model_id}", flush=True)
                 continue
             
-            # Get model info
-            model_info = trained_models[model_id]
-            model_type = model_info['type']
-            
             # Convert historical data to DataFrame for context
             if not historical_data:
-                # Use the last_data stored during training
-                df = model_info.get('last_data', pd.DataFrame())
+                # Use the history tail stored during training
+                df = model_info.history_frame()
             else:
-                df = pd.DataFrame(historical_data)
-                df['date'] = pd.to_datetime(df['date'])
-                df = df.sort_values('date')
-                df['value'] = df['value'].astype(float)
+                df = history_to_frame(historical_data)
             
             if df.empty:
                 print(f"No historical data available for item {item_name}", flush=True)
                 continue
             
-            try:
-                # Generate forecast based on model type
-                if model_type == 'Linear Regression':
-                    forecast_data = forecast_linear_regression(model_info, df, forecast_days)
-                elif model_type == 'Random Forest':
-                    forecast_data = forecast_random_forest(model_info, df, forecast_days)
-                elif model_type == 'ARIMA':
-                    forecast_data = forecast_arima(model_info, df, forecast_days)
-                elif model_type == 'Prophet':
-                    forecast_data = forecast_prophet(model_info, df, forecast_days)
-                else:
-                    print(f"Unknown model type for item {item_name}: {model_type}", flush=True)
-                    continue
-                
-                # Format historical data
-                historical = [{"date": row['date'].strftime('%Y-%m-%d'), "value": float(row['value'])} 
-                             for _, row in df.iterrows()]
-                
-                individual_forecasts[item_name] = {
-                    "historical": historical,
-                    "forecast": forecast_data['predictions'],
-                    "metrics": forecast_data['metrics'],
-                    "modelType": model_type
-                }
-                successful_forecasts.append(item_name)
-                
-            except Exception as item_error:
-                print(f"Failed to generate forecast for item {item_name}: {str(item_error)}", flush=True)
-                continue
+            item_frames[item_name] = df
+            item_models[item_name] = model_info
+        
+        item_forecasts = forecast_item_frames(item_frames, item_models, forecast_days, uncertainty_samples,
+                                              parallel_workers)
+        for item_name, forecast_data in item_forecasts.items():
+            df = item_frames[item_name]
+            
+            # Format historical data
+            historical = [{"date": row['date'].strftime('%Y-%m-%d'), "value": float(row['value'])} 
+                         for _, row in df.iterrows()]
+            
+            individual_forecasts[item_name] = {
+                "historical": historical,
+                "forecast": forecast_data['predictions'],
+                "metrics": forecast_data['metrics'],
+                "modelType": item_models[item_name].type
+            }
+            successful_forecasts.append(item_name)
         
         # Calculate overall forecast using the dedicated Overall model
         overall_forecast = None
-        if len(successful_forecasts) > 1:
+        hierarchy_forecast = None
+        if reconciliation and len(successful_forecasts) > 1:
+            try:
+                overall_forecast, hierarchy_forecast = build_hierarchical_forecast(
+                    individual_forecasts, item_frames, item_hierarchy, reconciliation,
+                    {item_name: item_models[item_name] for item_name in successful_forecasts}
+                )
+                print(f"Reconciled {len(successful_forecasts)} item forecasts with {reconciliation}", flush=True)
+            except Exception as hierarchy_error:
+                print(f"Hierarchical reconciliation failed, summing item forecasts: {hierarchy_error}", flush=True)
+                overall_forecast = calculate_summed_overall_forecast(individual_forecasts)
+        elif len(successful_forecasts) > 1:
             # Use the dedicated Overall model
             overall_model_id = f"{base_model_id}_OVERALL"
             
-            if overall_model_id in trained_models:
+            overall_model_info = resolve_model(overall_model_id)
+            if overall_model_info is not None:
                 # Aggregate historical data for Overall
                 all_dates = set()
                 for item_name, historical_data in items_data.items():
@@ -1125,8 +2015,8 @@ def forecast():
                     overall_historical.append({"date": date, "value": total_value})
                 
                 # Get Overall model info
-                model_info = trained_models[overall_model_id]
-                model_type_overall = model_info['type']
+                model_info = overall_model_info
+                model_type_overall = model_info.type
                 
                 # Create DataFrame from aggregated historical data
                 df_overall = pd.DataFrame(overall_historical)
@@ -1136,14 +2026,8 @@ def forecast():
                 
                 try:
                     # Generate forecast using Overall model
-                    if model_type_overall == 'Linear Regression':
-                        forecast_data = forecast_linear_regression(model_info, df_overall, forecast_days)
-                    elif model_type_overall == 'Random Forest':
-                        forecast_data = forecast_random_forest(model_info, df_overall, forecast_days)
-                    elif model_type_overall == 'ARIMA':
-                        forecast_data = forecast_arima(model_info, df_overall, forecast_days)
-                    elif model_type_overall == 'Prophet':
-                        forecast_data = forecast_prophet(model_info, df_overall, forecast_days)
+                    forecast_data = forecast_by_model_type(model_info, df_overall, forecast_days,
+                                                           uncertainty_samples=uncertainty_samples)
                     
                     overall_forecast = {
                         "historical": overall_historical,
@@ -1179,6 +2063,7 @@ def forecast():
         return jsonify({
             "success": True,
             "overall": overall_forecast,
+            "hierarchy": hierarchy_forecast,
             "items": individual_forecasts,
             "totalItems": len(items_data),
             "forecastedItems": len(successful_forecasts),
@@ -1188,11 +2073,68 @@ def forecast():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def forecast_item_frames(item_frames, item_models, forecast_days, uncertainty_samples=None, parallel_workers=1):
+    """
+    Forecast items whose history frame and ModelRecord are already resolved.
+    Prophet items are predicted as one batch and Holt-Winters items in one array operation.
+    Returns item -> forecast_by_model_type output; items that fail are logged and left out.
+    """
+    prophet_jobs = {
+        item_name: (item_models[item_name].model, df['date'].max())
+        for item_name, df in item_frames.items()
+        if item_models[item_name].type == 'Prophet' and not item_models[item_name].is_simple
+    }
+    prophet_predictions = predict_prophet_batch(prophet_jobs, forecast_days, uncertainty_samples, parallel_workers)
+    
+    # All Holt-Winters items are forecast in one array operation
+    smoothing_items = [item_name for item_name in item_frames
+                       if item_models[item_name].type == SMOOTHING_MODEL_TYPE and not item_models[item_name].is_simple]
+    smoothing_forecasts = dict(zip(smoothing_items, zip(*forecast_models(
+        [item_models[item_name].model for item_name in smoothing_items], forecast_days
+    )))) if smoothing_items else {}
+    
+    item_forecasts = {}
+    for item_name, df in item_frames.items():
+        model_info = item_models[item_name]
+        if model_info.type not in SUPPORTED_MODEL_TYPES and not model_info.is_simple:
+            print(f"Unknown model type for item {item_name}: {model_info.type}", flush=True)
+            continue
+        try:
+            # Generate forecast based on model type
+            item_forecasts[item_name] = forecast_by_model_type(
+                model_info, df, forecast_days,
+                prophet_predictions=prophet_predictions.get(item_name),
+                smoothing_forecast=smoothing_forecasts.get(item_name)
+            )
+        except Exception as item_error:
+            print(f"Failed to generate forecast for item {item_name}: {str(item_error)}", flush=True)
+    return item_forecasts
+
+def forecast_by_model_type(model_info, df, forecast_days, uncertainty_samples=None, prophet_predictions=None,
+                           smoothing_forecast=None):
+    """Dispatch forecasting to the forecaster for the model's type"""
+    model_type = model_info.type
+    if model_info.is_simple:
+        return forecast_intermittent(model_info, df, forecast_days)
+    if model_type == 'Linear Regression':
+        return forecast_linear_regression(model_info, df, forecast_days)
+    elif model_type == 'Random Forest':
+        return forecast_random_forest(model_info, df, forecast_days)
+    elif model_type == 'ARIMA':
+        return forecast_arima(model_info, df, forecast_days)
+    elif model_type == 'Prophet':
+        return forecast_prophet(model_info, df, forecast_days, uncertainty_samples, prophet_predictions)
+    elif model_type in INTERMITTENT_MODEL_TYPES:
+        return forecast_intermittent(model_info, df, forecast_days)
+    elif model_type == SMOOTHING_MODEL_TYPE:
+        return forecast_intermittent(model_info, df, forecast_days, smoothing_forecast)
+    raise ValueError(f"Unknown model type: {model_type}")
+
 def forecast_linear_regression(model_info, df, forecast_days):
     """Generate forecast using Linear Regression with intermittent demand handling"""
-    model = model_info['model']
-    scaler = model_info['scaler']
-    feature_cols = model_info['feature_cols']
+    model = model_info.model
+    scaler = model_info.scaler
+    feature_cols = model_info.feature_cols
     residual_std = model_info.get('residual_std', 0.1)
     
     # Analyze historical intermittency pattern
@@ -1231,16 +2173,20 @@ def forecast_linear_regression(model_info, df, forecast_days):
             })
         return {
             "predictions": predictions,
-            "metrics": {"mape": 0.0, "rmse": 0.0}
+            "metrics": model_info.get('training_metrics', {})
         }
     
     print(f"Linear Regression - Intermittency analysis: zero_ratio={zero_ratio:.2f}, mean_non_zero={mean_non_zero:.2f}, threshold={threshold:.2f}", flush=True)
     
-    # Use last data for iterative forecasting
-    forecast_df = df.tail(30).copy()
+    # Use last data for iterative forecasting; predictions are appended to these arrays
+    tail = df.tail(30)
+    window_values = np.concatenate([tail['value'].to_numpy(dtype=float), np.zeros(forecast_days + 1)])
+    window_days = np.concatenate([dates_to_epoch_days(tail['date']), np.zeros(forecast_days + 1, dtype=np.int64)])
+    size = len(tail)
     predictions = []
     
     last_date = df['date'].max()
+    last_day = int(dates_to_epoch_days(df['date'].tail(1))[0])
     
     # Track recent pattern for intermittent demand simulation
     recent_pattern = df.tail(14)['value'].values  # Look at last 2 weeks
@@ -1263,24 +2209,13 @@ def forecast_linear_regression(model_info, df, forecast_days):
         next_date = last_date + pd.Timedelta(days=i+1)
         
         # Add placeholder row for the future date with a temporary value BEFORE creating features
-        # Use the last known/predicted value as a temporary filler to survive dropna()
+        # Use the last known/predicted value as a temporary filler
         # This ensures features align with the intended forecast horizon
-        last_value = forecast_df['value'].iloc[-1]
-        new_row = pd.DataFrame({
-            'date': [next_date],
-            'value': [last_value]  # Temporary filler - model will predict the actual value
-        })
-        temp_df = pd.concat([forecast_df, new_row], ignore_index=True)
-        
-        # Now create features - this will correctly calculate day-of-week, lags, etc. for next_date
-        # The placeholder row will survive dropna() because it has a valid value
-        temp_df = create_features(temp_df)
+        window_values[size] = window_values[size - 1]  # Temporary filler - model will predict the actual value
+        window_days[size] = last_day + i + 1
         
-        if len(temp_df) == 0:
-            break
-            
-        # Get last row features (which now correspond to the future date)
-        X_next = temp_df[feature_cols].tail(1)
+        # Features of the placeholder row - day-of-week, lags, etc. for next_date
+        X_next = last_row_features(window_values[:size + 1], window_days[:size + 1])[None, :]
         X_next_scaled = scaler.transform(X_next)
         
         # Predict the actual value for the future date
@@ -1335,37 +2270,30 @@ def forecast_linear_regression(model_info, df, forecast_days):
             "upper": float(upper)
         })
         
-        # Add predicted value to dataframe for next iteration
-        forecast_df = pd.concat([forecast_df, pd.DataFrame({
-            'date': [next_date],
-            'value': [pred_value]
-        })], ignore_index=True)
+        # Replace the placeholder with the predicted value for the next iteration
+        window_values[size] = pred_value
+        size += 1
     
     # Log intermittency in forecast
     forecast_values = [p['value'] for p in predictions]
     forecast_zero_ratio = sum(1 for v in forecast_values if v == 0) / len(forecast_values) if forecast_values else 0
     print(f"Linear Regression - Forecast intermittency: {forecast_zero_ratio:.2f} (historical: {zero_ratio:.2f})", flush=True)
     
-    # Calculate metrics on training data
-    train_features = create_features(df.copy())
-    if len(train_features) > 0:
-        X_train = train_features[feature_cols]
-        X_train_scaled = scaler.transform(X_train)
-        y_train = train_features['value'].values
-        y_pred_train = model.predict(X_train_scaled)
-        mape, rmse = calculate_metrics(y_train, y_pred_train)
-    else:
-        mape, rmse = 0.0, 0.0
-    
+    # Return the actual training metrics stored with the model
+    training_metrics = model_info.get('training_metrics', {})
     return {
         "predictions": predictions,
-        "metrics": {"mape": mape, "rmse": rmse}
+        "metrics": training_metrics
     }
 
 def forecast_random_forest(model_info, df, forecast_days):
     """Generate forecast using Random Forest with intermittent demand handling"""
-    model = model_info['model']
-    feature_cols = model_info['feature_cols']
+    feature_cols = model_info.feature_cols
+    
+    # Models cached before flattening existed hold the sklearn forest; flatten it on first use
+    if model_info.flat_forest is None:
+        model_info.flat_forest = FlatForest(model_info.model)
+    forest = model_info.flat_forest
     residual_std = model_info.get('residual_std', 0)
     
     # Analyze historical intermittency pattern
@@ -1410,11 +2338,15 @@ def forecast_random_forest(model_info, df, forecast_days):
     
     print(f"Intermittency analysis: zero_ratio={zero_ratio:.2f}, mean_non_zero={mean_non_zero:.2f}, threshold={threshold:.2f}", flush=True)
     
-    # Use last data point to start forecasting
-    forecast_df = df.tail(30).copy()
+    # Use last data point to start forecasting; predictions are appended to these arrays
+    tail = df.tail(30)
+    window_values = np.concatenate([tail['value'].to_numpy(dtype=float), np.zeros(forecast_days)])
+    window_days = np.concatenate([dates_to_epoch_days(tail['date']), np.zeros(forecast_days, dtype=np.int64)])
+    size = len(tail)
     predictions = []
     
     last_date = df['date'].max()
+    last_day = int(window_days[size - 1])
     
     # Track recent pattern for intermittent demand simulation
     recent_pattern = df.tail(14)['value'].values  # Look at last 2 weeks
@@ -1433,18 +2365,11 @@ def forecast_random_forest(model_info, df, forecast_days):
     days_since_last_order = 0
     
     for i in range(forecast_days):
-        # Create features for next prediction
-        temp_df = forecast_df.copy()
-        temp_df = create_features(temp_df)
-        
-        if len(temp_df) == 0:
-            break
-            
         # Get last row features
-        X_next = temp_df[feature_cols].tail(1)
+        X_next = last_row_features(window_values[:size], window_days[:size])
         
         # Predict
-        pred_value = model.predict(X_next)[0]
+        pred_value = forest.predict(X_next)[0]
         pred_value = max(0, pred_value)
         
         # Apply intermittent demand logic
@@ -1496,12 +2421,10 @@ def forecast_random_forest(model_info, df, forecast_days):
             "upper": float(upper)
         })
         
-        # Add predicted value to dataframe for next iteration
-        new_row = pd.DataFrame({
-            'date': [next_date],
-            'value': [pred_value]
-        })
-        forecast_df = pd.concat([forecast_df, new_row], ignore_index=True)
+        # Add predicted value for next iteration
+        window_values[size] = pred_value
+        window_days[size] = last_day + i + 1
+        size += 1
     
     # Log intermittency in forecast
     forecast_values = [p['value'] for p in predictions]
@@ -1517,26 +2440,27 @@ def forecast_random_forest(model_info, df, forecast_days):
 
 def forecast_arima(model_info, df, forecast_days):
     """Generate forecast using ARIMA with proper confidence intervals"""
-    model = model_info['model']
+    model = model_info.model
     
     # Use get_forecast() to get proper confidence intervals from the model
     try:
         forecast_result = model.get_forecast(steps=forecast_days)
-        forecast_values = forecast_result.predicted_mean
+        # Arrays for models fit on plain values, Series/DataFrame otherwise
+        forecast_values = np.asarray(forecast_result.predicted_mean)
         
         # Get confidence intervals from the model (95% confidence)
-        conf_int = forecast_result.conf_int(alpha=0.05)
+        conf_int = np.asarray(forecast_result.conf_int(alpha=0.05))
         
         last_date = df['date'].max()
         predictions = []
         
         for i in range(forecast_days):
             next_date = last_date + pd.Timedelta(days=i+1)
-            pred_value = max(0, float(forecast_values.iloc[i]))
+            pred_value = max(0, float(forecast_values[i]))
             
             # Use model's confidence intervals
-            lower = max(0, float(conf_int.iloc[i, 0]))
-            upper = max(0, float(conf_int.iloc[i, 1]))
+            lower = max(0, float(conf_int[i, 0]))
+            upper = max(0, float(conf_int[i, 1]))
             
             predictions.append({
                 "date": next_date.strftime('%Y-%m-%d'),
@@ -1574,26 +2498,33 @@ def forecast_arima(model_info, df, forecast_days):
         "metrics": training_metrics
     }
 
-def forecast_prophet(model_info, df, forecast_days):
-    """Generate forecast using Prophet"""
-    model = model_info['model']
+def forecast_prophet(model_info, df, forecast_days, uncertainty_samples=None, predictions=None):
+    """Generate forecast using Prophet (predictions may be precomputed by predict_prophet_batch)"""
+    if isinstance(predictions, Exception):
+        raise predictions
     
-    # Create future dataframe
-    last_date = df['date'].max()
-    future_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=forecast_days, freq='D')
-    future_df = pd.DataFrame({'ds': future_dates})
+    if predictions is None:
+        predictions = predict_prophet(model_info.model, df['date'].max(), forecast_days, uncertainty_samples)
     
-    # Generate forecast
-    forecast = model.predict(future_df)
+    # Return the actual training metrics stored with the model
+    training_metrics = model_info.get('training_metrics', {})
+    return {
+        "predictions": predictions,
+        "metrics": training_metrics
+    }
+
+def forecast_intermittent(model_info, df, forecast_days, precomputed=None):
+    """
+    Generate a forecast from a Croston, SBA, TSB or Holt-Winters model or a ConstantModel.
+    precomputed holds (values, lower, upper) already produced for a batch of items.
+    """
+    values, lower, upper = precomputed if precomputed is not None else model_info.model.forecast(forecast_days)
+    dates = pd.date_range(start=df['date'].max() + pd.Timedelta(days=1), periods=forecast_days, freq='D')
     
-    predictions = []
-    for _, row in forecast.iterrows():
-        predictions.append({
-            "date": row['ds'].strftime('%Y-%m-%d'),
-            "value": float(max(0, row['yhat'])),
-            "lower": float(max(0, row['yhat_lower'])),
-            "upper": float(max(0, row['yhat_upper']))
-        })
+    predictions = [
+        {"date": d, "value": v, "lower": lo, "upper": up}
+        for d, v, lo, up in zip(dates.strftime('%Y-%m-%d'), values.tolist(), lower.tolist(), upper.tolist())
+    ]
     
     # Return the actual training metrics stored with the model
     training_metrics = model_info.get('training_metrics', {})
@@ -1602,6 +2533,80 @@ def forecast_prophet(model_info, df, forecast_days):
         "metrics": training_metrics
     }
 
+@app.route('/backtest', methods=['POST'])
+def backtest():
+    """Rolling-origin backtest reporting out-of-sample accuracy per item"""
+    try:
+        data = request.json
+        model_type = data.get('modelType', 'Random Forest')
+        items_data = data.get('itemsData', {})
+        folds = int(data.get('folds', DEFAULT_FOLDS))
+        horizon = int(data.get('horizon', data.get('forecastDays', DEFAULT_HORIZON)))
+        step = data.get('step', None)
+        hyperparameter_tuning = data.get('hyperparameterTuning', False)
+        route_intermittent = data.get('routeIntermittent', True)
+        try:
+            parallel_workers = request_workers(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if not items_data:
+            return jsonify({"error": "No items data provided."}), 400
+        
+        if model_type not in SUPPORTED_MODEL_TYPES and model_type != AUTO_MODEL_TYPE:
+            return jsonify({"error": f"Unknown model type: {model_type}"}), 400
+        
+        if folds < 1 or horizon < 1:
+            return jsonify({"error": "folds and horizon must be positive"}), 400
+        
+        frames = {item_name: history_to_frame(historical_data)
+                  for item_name, historical_data in items_data.items() if historical_data}
+        item_model_types, _ = resolve_item_model_types(frames, model_type, route_intermittent)
+        
+        start_time = time.time()
+        engine = BacktestEngine(train_by_model_type, forecast_by_model_type, calculate_metrics, trained_models)
+        item_results = engine.run(frames, item_model_types, folds, horizon, step,
+                                  hyperparameter_tuning, parallel_workers)
+        elapsed = time.time() - start_time
+        
+        # Average the per-item out-of-sample metrics
+        scored = [r['metrics'] for r in item_results.values() if 'metrics' in r]
+        overall_metrics = {}
+        if scored:
+            for key in ('mape', 'rmse', 'mae', 'bias', 'accuracy'):
+                overall_metrics[key] = float(np.mean([m[key] for m in scored]))
+        
+        print(f"Backtested {len(scored)}/{len(frames)} items over {folds} fold(s) in {elapsed:.2f}s", flush=True)
+        
+        return jsonify({
+            "success": True,
+            "modelType": model_type,
+            "folds": folds,
+            "horizon": horizon,
+            "overallMetrics": overall_metrics,
+            "itemsResults": item_results,
+            "totalItems": len(items_data),
+            "backtestedItems": len(scored),
+            "elapsedSeconds": round(elapsed, 3)
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def connect_sql_server():
+    """Open a pyodbc connection to the planning SQL Server (SQL_* environment variables)"""
+    import pyodbc
+    import os
+    
+    # Build connection string
+    server = os.getenv('SQL_SERVER', '20.199.104.62')
+    database = os.getenv('SQL_DATABASE', 'Planning')
+    username = os.getenv('SQL_USERNAME', 'sa')
+    password = os.getenv('SQL_PASSWORD', 'PlanetTogether123!')
+    
+    conn_str = f'DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username};PWD={password}'
+    return pyodbc.connect(conn_str)
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
     """Analyze data characteristics and recommend models"""
@@ -1628,20 +2633,8 @@ def analyze():
             if not table:
                 return jsonify({"error": "No table specified"}), 400
             
-            # Use existing SQL Server connection logic
-            import pyodbc
-            import os
-            
-            # Build connection string
-            server = os.getenv('SQL_SERVER', '20.199.104.62')
-            database = os.getenv('SQL_DATABASE', 'Planning')
-            username = os.getenv('SQL_USERNAME', 'sa')
-            password = os.getenv('SQL_PASSWORD', 'PlanetTogether123!')
-            
-            conn_str = f'DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username};PWD={password}'
-            
             try:
-                conn = pyodbc.connect(conn_str)
+                conn = connect_sql_server()
                 
                 # Build and execute query
                 query = f"SELECT [{date_col}], [{item_col}], [{qty_col}] FROM [{schema}].[{table}]"
@@ -1701,6 +2694,20 @@ def analyze():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/resources', methods=['GET'])
+def resources():
+    """Report the CPU budget and the per-request thread allocation"""
+    return jsonify({
+        "success": True,
+        "resources": governor.snapshot(),
+        "fitCostCorrections": cost_model.snapshot(),
+        "singleFlight": {
+            "inFlight": train_flight.in_flight() + forecast_flight.in_flight(),
+            "coalescedTrain": train_flight.coalesced_count,
+            "coalescedForecast": forecast_flight.coalesced_count
+        }
+    })
+
 @app.route('/cache/clear', methods=['POST'])
 def clear_cache():
     """Clear all cached models"""
@@ -1752,7 +2759,6 @@ def check_cached_items():
         
         # Extract other parameters
         model_type = data.get('modelType', 'Random Forest')
-        forecast_days = data.get('forecastDays', 30)
         items = data.get('items', [])
         planning_areas = data.get('planningAreas', None)
         scenario_names = data.get('scenarioNames', None)
@@ -1764,7 +2770,7 @@ def check_cached_items():
         cache = get_model_cache()
         cached_items, missing_items = cache.get_cached_items(
             schema, table, date_col, item_col, qty_col,
-            model_type, forecast_days, items,
+            model_type, items,
             planning_areas, scenario_names, hyperparameter_tuning
         )
         
@@ -0,0 +1,69 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from typing import Dict, Tuple
+
+# Tree depth and split size shared by every forest
+MAX_DEPTH = 10
+MIN_SAMPLES_SPLIT = 5
+
+# Trees are added in steps until the out-of-bag error stops improving, up to MAX_TREES
+MIN_TREES = 20
+TREE_STEP = 20
+MAX_TREES = 100
+OOB_TOLERANCE = 0.02  # relative OOB error improvement below which growing stops
+
+# Below this many rows the OOB error is too noisy to steer on; a fixed small forest is used
+MIN_OOB_ROWS = 30
+SMALL_DATA_TREES = 30
+
+# Only the most recent rows are fitted; older history adds fit time, not forecast skill
+RECENT_WINDOW_ROWS = 3 * 365
+
+# Rows drawn per tree for long histories (bootstrap subsampling via max_samples)
+MAX_SAMPLES_ROWS = 512
+
+
+def fit_adaptive_forest(X: np.ndarray, y: np.ndarray, random_state: int = 42,
+                        n_jobs: int = 1) -> Tuple[RandomForestRegressor, int, Dict]:
+    """
+    Fit a Random Forest sized to the data: the last RECENT_WINDOW_ROWS rows only,
+    at most MAX_SAMPLES_ROWS rows per tree, and trees added until the OOB error converges.
+    Returns the forest, the index of the first fitted row and the choices made.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    start = max(len(y) - RECENT_WINDOW_ROWS, 0)
+    X, y = X[start:], y[start:]
+    n_rows = len(y)
+    max_samples = MAX_SAMPLES_ROWS if n_rows > MAX_SAMPLES_ROWS else None
+
+    if n_rows < MIN_OOB_ROWS:
+        model = RandomForestRegressor(
+            n_estimators=SMALL_DATA_TREES, max_depth=MAX_DEPTH, min_samples_split=MIN_SAMPLES_SPLIT,
+            random_state=random_state, n_jobs=n_jobs
+        )
+        model.fit(X, y)
+        return model, start, {"nEstimators": SMALL_DATA_TREES, "maxSamples": None,
+                              "trainingRows": n_rows, "oobConverged": False}
+
+    model = RandomForestRegressor(
+        n_estimators=MIN_TREES, max_depth=MAX_DEPTH, min_samples_split=MIN_SAMPLES_SPLIT,
+        max_samples=max_samples, oob_score=True, warm_start=True,
+        random_state=random_state, n_jobs=n_jobs
+    )
+    previous_error = None
+    converged = False
+    while True:
+        model.fit(X, y)
+        # With MIN_OOB_ROWS rows and MIN_TREES trees nearly every row is out of bag for some tree
+        error = float(np.mean((model.oob_prediction_ - y) ** 2))
+        if previous_error is not None and previous_error - error <= OOB_TOLERANCE * max(previous_error, 1e-12):
+            converged = True
+            break
+        if model.n_estimators >= MAX_TREES:
+            break
+        previous_error = error
+        model.set_params(n_estimators=min(model.n_estimators + TREE_STEP, MAX_TREES))
+
+    return model, start, {"nEstimators": model.n_estimators, "maxSamples": max_samples,
+                          "trainingRows": n_rows, "oobConverged": converged}
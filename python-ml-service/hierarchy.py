@@ -0,0 +1,128 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+from typing import Dict, List, Optional, Tuple
+from intermittent_models import fit_intermittent_models
+
+RECONCILIATION_METHODS = ('bottom_up', 'top_down', 'mint')
+TOTAL_NODE = 'Total'
+
+# Variance floor so MinT weights stay finite for perfectly fitted nodes
+MIN_VARIANCE = 1e-6
+
+
+def build_summing_matrix(item_paths: Dict[str, List[str]]) -> Tuple[List[str], List[int], sparse.csr_matrix]:
+    """
+    Build the hierarchy summing matrix S (nodes x bottom items).
+    item_paths maps each bottom item to its group labels from the top down,
+    e.g. ['ScenarioA', 'PA-North']. Nodes are ordered Total, then every group prefix
+    ('ScenarioA', 'ScenarioA/PA-North', ...), then the bottom items themselves.
+    Returns (node labels, node levels, S).
+    """
+    items = list(item_paths.keys())
+    aggregate_nodes = {TOTAL_NODE: 0}
+    memberships = []  # (node label, bottom column)
+
+    for col, item in enumerate(items):
+        memberships.append((TOTAL_NODE, col))
+        prefix = []
+        for label in item_paths[item]:
+            prefix.append(str(label))
+            node = '/'.join(prefix)
+            aggregate_nodes.setdefault(node, len(prefix))
+            memberships.append((node, col))
+
+    labels = list(aggregate_nodes.keys()) + items
+    levels = list(aggregate_nodes.values()) + [max(aggregate_nodes.values()) + 1] * len(items)
+    row_of = {label: row for row, label in enumerate(labels[:len(aggregate_nodes)])}
+
+    rows = [row_of[node] for node, _ in memberships] + [len(aggregate_nodes) + col for col in range(len(items))]
+    cols = [col for _, col in memberships] + list(range(len(items)))
+    S = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(labels), len(items)))
+    return labels, levels, S
+
+
+def reconcile(S: sparse.csr_matrix, base: np.ndarray, method: str,
+              variances: Optional[np.ndarray] = None,
+              proportions: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Reconcile base forecasts (nodes x horizon) into coherent bottom-level forecasts
+    (bottom items x horizon); S @ result gives every node.
+    bottom_up sums the bottom rows, top_down splits the Total row (row 0) by proportions,
+    and mint applies the MinT projection S (S' W^-1 S)^-1 S' W^-1 with a diagonal W
+    of per-node residual variances.
+    """
+    n_nodes, n_bottom = S.shape
+
+    if method == 'bottom_up':
+        bottom = base[n_nodes - n_bottom:]
+    elif method == 'top_down':
+        if proportions is None:
+            proportions = np.full(n_bottom, 1.0 / n_bottom)
+        bottom = np.outer(proportions, base[0])
+    elif method == 'mint':
+        if variances is None:
+            variances = np.ones(n_nodes)
+        W_inv = sparse.diags(1.0 / np.maximum(variances, MIN_VARIANCE))
+        A = (S.T @ W_inv @ S).tocsc()
+        B = S.T @ (W_inv @ base)
+        bottom = spsolve(A, B)
+        bottom = bottom.reshape(n_bottom, -1)
+    else:
+        raise ValueError(f"Unknown reconciliation method: {method}")
+
+    return bottom
+
+
+def reconcile_hierarchy(item_paths: Dict[str, List[str]], history: np.ndarray, base_bottom: np.ndarray,
+                        bottom_halfwidth: np.ndarray, bottom_variance: np.ndarray,
+                        method: str) -> Dict:
+    """
+    Forecast every aggregate node once and reconcile the whole hierarchy.
+    history is the bottom-level items x days matrix (NaN where an item has no data),
+    base_bottom the bottom forecasts (items x horizon). Aggregate base forecasts come
+    from one vectorized Croston pass over all aggregate series, which reduces to simple
+    exponential smoothing on dense aggregates - no full model per level.
+    Returns labels, levels, reconciled values, interval half-widths and aggregated history.
+    """
+    if method not in RECONCILIATION_METHODS:
+        raise ValueError(f"Unknown reconciliation method: {method}")
+
+    labels, levels, S = build_summing_matrix(item_paths)
+    n_nodes, n_bottom = S.shape
+    n_aggregate = n_nodes - n_bottom
+    horizon = base_bottom.shape[1]
+
+    aggregated_history = S @ np.nan_to_num(history)
+    base = np.zeros((n_nodes, horizon))
+    base[n_aggregate:] = base_bottom
+    variances = np.zeros(n_nodes)
+    variances[n_aggregate:] = bottom_variance
+
+    if method != 'bottom_up':
+        models, _ = fit_intermittent_models(aggregated_history[:n_aggregate], 'Croston')
+        for row, model in enumerate(models):
+            base[row] = model.forecast(horizon)[0]
+            variances[row] = model.residual_std ** 2
+
+    proportions = None
+    if method == 'top_down':
+        bottom_totals = np.nansum(history, axis=1)
+        grand_total = bottom_totals.sum()
+        proportions = bottom_totals / grand_total if grand_total > 0 else None
+
+    # Clip at the bottom level and re-aggregate so demand stays non-negative and coherent
+    bottom = np.maximum(reconcile(S, base, method, variances, proportions), 0)
+    reconciled = S @ bottom
+
+    # Bottom interval widths carry over; aggregates assume independent item errors
+    halfwidth = np.sqrt(S @ (bottom_halfwidth ** 2))
+
+    return {
+        "labels": labels,
+        "levels": levels,
+        "values": reconciled,
+        "halfwidth": halfwidth,
+        "history": aggregated_history,
+        "n_aggregate": n_aggregate
+    }
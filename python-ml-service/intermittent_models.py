@@ -0,0 +1,175 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Model types served by this module (values of modelType in /train)
+INTERMITTENT_MODEL_TYPES = ('Croston', 'SBA', 'TSB')
+
+# Smoothing constants searched per item; intermittent-demand literature favours small values
+ALPHA_GRID = (0.05, 0.1, 0.2, 0.3)
+BETA_GRID = (0.05, 0.1, 0.2, 0.3)
+
+
+class IntermittentDemandModel:
+    """Fitted Croston/SBA/TSB state for one series; forecasts are flat over the horizon"""
+
+    __slots__ = ('method', 'alpha', 'beta', 'size', 'interval', 'probability', 'residual_std')
+
+    def __init__(self, method: str, alpha: float, beta: Optional[float], size: float,
+                 interval: Optional[float], probability: Optional[float], residual_std: float):
+        self.method = method
+        self.alpha = alpha
+        self.beta = beta
+        self.size = size
+        self.interval = interval
+        self.probability = probability
+        self.residual_std = residual_std
+
+    def __getstate__(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state: Dict):
+        for slot in self.__slots__:
+            setattr(self, slot, state.get(slot))
+
+    @property
+    def demand_rate(self) -> float:
+        """Expected demand per period"""
+        if self.method == 'TSB':
+            return float(self.probability * self.size)
+        if not self.interval:
+            return 0.0
+        rate = self.size / self.interval
+        if self.method == 'SBA':
+            rate *= 1 - self.alpha / 2
+        return float(rate)
+
+    def forecast(self, steps: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Point forecast with 95% bounds from in-sample one-step residuals"""
+        values = np.full(steps, max(0.0, self.demand_rate))
+        margin = 1.96 * self.residual_std
+        return values, np.maximum(values - margin, 0), values + margin
+
+
+def _initial_state(Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Initial demand size, inter-demand interval and demand probability per row"""
+    valid = ~np.isnan(Y)
+    demand = np.where(valid, Y, 0) > 0
+    n_valid = valid.sum(axis=1)
+    n_demand = demand.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        size = np.where(n_demand > 0, np.nansum(np.where(demand, Y, 0), axis=1) / n_demand, 0.0)
+        interval = np.where(n_demand > 0, n_valid / n_demand, 1.0)
+        probability = np.where(n_valid > 0, n_demand / n_valid, 0.0)
+    return size, interval, probability
+
+
+def _run_recursion(Y: np.ndarray, method: str, alpha: np.ndarray,
+                   beta: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Run the smoothing recursion for every row at once.
+    Returns one-step-ahead fitted values (n_items x n_days) and the final size, interval
+    and probability states. NaN cells (padding before a series starts) are skipped.
+    """
+    n_items, n_days = Y.shape
+    size, interval, probability = _initial_state(Y)
+    periods_since_demand = np.ones(n_items)
+    fitted = np.empty((n_items, n_days))
+
+    for t in range(n_days):
+        y = Y[:, t]
+        valid = ~np.isnan(y)
+        demand = valid & (np.nan_to_num(y) > 0)
+
+        if method == 'TSB':
+            fitted[:, t] = probability * size
+            probability = np.where(valid, probability + beta * (demand - probability), probability)
+            size = np.where(demand, size + alpha * (y - size), size)
+        else:
+            rate = np.divide(size, interval, out=np.zeros(n_items), where=interval > 0)
+            fitted[:, t] = rate * (1 - alpha / 2) if method == 'SBA' else rate
+            size = np.where(demand, size + alpha * (y - size), size)
+            interval = np.where(demand, interval + alpha * (periods_since_demand - interval), interval)
+            periods_since_demand = np.where(demand, 1, np.where(valid, periods_since_demand + 1, periods_since_demand))
+
+    return fitted, size, interval, probability
+
+
+def fit_intermittent_models(Y: np.ndarray, method: str) -> Tuple[List[IntermittentDemandModel], np.ndarray]:
+    """
+    Fit one Croston/SBA/TSB model per row of an items x days matrix.
+    Smoothing constants are chosen per row by minimising in-sample one-step MSE over
+    ALPHA_GRID (and BETA_GRID for TSB). Returns the models and the fitted values.
+    """
+    if method not in INTERMITTENT_MODEL_TYPES:
+        raise ValueError(f"Unknown intermittent model type: {method}")
+
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    n_items = Y.shape[0]
+    valid = ~np.isnan(Y)
+    beta_grid = BETA_GRID if method == 'TSB' else (None,)
+
+    best_mse = np.full(n_items, np.inf)
+    best_alpha = np.zeros(n_items)
+    best_beta = np.zeros(n_items)
+    best = (np.zeros_like(Y), np.zeros(n_items), np.ones(n_items), np.zeros(n_items))
+
+    for alpha in ALPHA_GRID:
+        for beta in beta_grid:
+            alphas = np.full(n_items, alpha)
+            betas = np.full(n_items, beta) if beta is not None else None
+            fitted, size, interval, probability = _run_recursion(Y, method, alphas, betas)
+            sq_err = np.where(valid, (np.nan_to_num(Y) - fitted) ** 2, 0.0)
+            mse = sq_err.sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+
+            better = mse < best_mse
+            best_mse = np.where(better, mse, best_mse)
+            best_alpha = np.where(better, alpha, best_alpha)
+            best_beta = np.where(better, beta if beta is not None else 0.0, best_beta)
+            best = (
+                np.where(better[:, None], fitted, best[0]),
+                np.where(better, size, best[1]),
+                np.where(better, interval, best[2]),
+                np.where(better, probability, best[3])
+            )
+
+    fitted, size, interval, probability = best
+    residuals = np.where(valid, np.nan_to_num(Y) - fitted, np.nan)
+    residual_std = np.nan_to_num(np.nanstd(residuals, axis=1)) if Y.shape[1] > 0 else np.zeros(n_items)
+
+    models = [
+        IntermittentDemandModel(
+            method=method,
+            alpha=float(best_alpha[i]),
+            beta=float(best_beta[i]) if method == 'TSB' else None,
+            size=float(size[i]),
+            interval=float(interval[i]) if method != 'TSB' else None,
+            probability=float(probability[i]) if method == 'TSB' else None,
+            residual_std=float(residual_std[i])
+        )
+        for i in range(n_items)
+    ]
+    return models, fitted
+
+
+def align_series(series: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> Tuple[List[str], np.ndarray]:
+    """
+    Stack per-item (epoch_days, values) pairs into a NaN-padded items x days matrix
+    aligned on a shared daily calendar. Days without a row inside an item's own date
+    range count as zero demand; days outside it stay NaN.
+    """
+    items = list(series.keys())
+    if not items:
+        return items, np.empty((0, 0))
+
+    start = min(int(days.min()) for days, _ in series.values() if len(days))
+    end = max(int(days.max()) for days, _ in series.values() if len(days))
+    Y = np.full((len(items), end - start + 1), np.nan)
+
+    for row, item in enumerate(items):
+        days, values = series[item]
+        if len(days) == 0:
+            continue
+        first, last = int(days.min()) - start, int(days.max()) - start
+        Y[row, first:last + 1] = 0.0
+        np.add.at(Y[row], days.astype(np.int64) - start, values)
+    return items, Y
@@ -1,30 +1,92 @@
+import io
 import os
 import hashlib
+import threading
 import json
 import joblib
-from pathlib import Path
-from datetime import datetime
+import pickle
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
+from model_store import StorageBackend, LocalStorageBackend, create_storage_backend
+from model_registry import KeyedLocks
+from model_slimming import slim_for_storage
+
+# Metadata fields needed to recompute an entry's cache key
+KEY_FIELDS = ('schema', 'table', 'date_col', 'item_col', 'qty_col', 'model_type', 'item')
+
+# Startup snapshot of all entry metadata; writers merge their changes into it, and operations
+# that must see every node's entries (clear, stats) list the entry metadata in the store instead
+INDEX_KEY = "cache_index.json"
+
+META_SUFFIX = ".meta.json"
+
+# Deserialized models kept in process; blobs are immutable, so entries never go stale
+DEFAULT_MEMORY_CACHE_SIZE = 128
+
+# New blobs are plain pickles behind this header (the C unpickler is several times faster than
+# joblib.load); blobs without it are older joblib files and still load
+PICKLE_BLOB_HEADER = b"PKL5\n"
+
+# Concurrent store reads when loading many cached models at once (I/O bound, so above core count)
+DEFAULT_LOAD_WORKERS = 8
+
+# Items whose fit failed are not retried on unchanged data for this long, doubling per repeated failure
+FAILURE_BACKOFF_SECONDS = 3600
+FAILURE_BACKOFF_MAX_SECONDS = 7 * 24 * 3600
+
+FAILURE_SUFFIX = ".failure.json"
+
+def _blob_key(digest: str) -> str:
+    return f"blobs/{digest}.joblib"
+
+def _meta_key(cache_key: str) -> str:
+    return f"{cache_key}{META_SUFFIX}"
+
+def _legacy_model_key(cache_key: str) -> str:
+    return f"{cache_key}.joblib"
+
+def _ref_key(model_id: str) -> str:
+    return f"refs/{hashlib.md5(model_id.encode()).hexdigest()}.json"
+
+def _failure_key(cache_key: str) -> str:
+    return f"failures/{cache_key}{FAILURE_SUFFIX}"
 
 class ModelCache:
-    """Persistent disk-based model caching system"""
+    """
+    Model cache over a pluggable byte store (local directory, Redis or S3).
+    Models are stored once as content-addressed blobs; each cache key has a small
+    metadata document pointing at its blob, so every node sharing the store sees the
+    same models. Deserialized blobs are kept in an in-process LRU (read-through).
+    Safe for concurrent request threads: writes to one cache key are serialised by a
+    per-key lock, and the in-memory index and LRU are guarded by a shared lock.
+    """
     
-    def __init__(self, cache_dir: str = "models/cache"):
-        self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    def __init__(self, cache_dir: str = "models/cache", backend: Optional[StorageBackend] = None,
+                 memory_cache_size: Optional[int] = None):
+        self.backend = backend or LocalStorageBackend(cache_dir)
+        self.memory_cache_size = int(memory_cache_size or os.getenv('MODEL_MEMORY_CACHE_SIZE', DEFAULT_MEMORY_CACHE_SIZE))
+        self.load_workers = int(os.getenv('MODEL_CACHE_LOAD_WORKERS', DEFAULT_LOAD_WORKERS))
+        self._blob_cache = OrderedDict()
+        self._lock = threading.RLock()
+        self._index_lock = threading.Lock()
+        self._key_locks = KeyedLocks()
         self.metadata_cache = {}
         self._load_metadata_index()
+        self.migrate_horizon_independent_keys()
     
     def _generate_cache_key(self, schema: str, table: str, date_col: str, 
                            item_col: str, qty_col: str, model_type: str, 
-                           forecast_days: int, item: str, 
+                           item: str, 
                            planning_areas: Optional[List[str]] = None,
                            scenario_names: Optional[List[str]] = None,
                            hyperparameter_tuning: bool = False) -> str:
-        """Generate stable hash key for caching based on database config and filters"""
+        """Generate stable hash key for caching based on database config and filters.
+        The forecast horizon is deliberately excluded: one trained model serves every horizon."""
         key_components = [
             schema, table, date_col, item_col, qty_col, 
-            model_type, str(forecast_days), str(item)
+            model_type, str(item)
         ]
         
         # Add hyperparameter tuning flag to ensure tuned vs untuned models don't collide
@@ -44,28 +106,157 @@ class ModelCache:
         key_string = "_".join(key_components)
         return hashlib.md5(key_string.encode()).hexdigest()[:16]
     
+    def migrate_horizon_independent_keys(self) -> Dict:
+        """Re-key entries cached under the old horizon-dependent keys, keeping one model per configuration"""
+        stats = {'migrated': 0, 'duplicates_removed': 0, 'skipped': 0}
+        legacy = {k: m for k, m in self.metadata_cache.items() if 'forecast_days' in m}
+        if not legacy:
+            return stats
+        
+        groups = {}
+        for old_key, meta in legacy.items():
+            if not all(field in meta for field in KEY_FIELDS):
+                # Too old to re-key; left in place untouched
+                stats['skipped'] += 1
+                continue
+            new_key = self._generate_cache_key(
+                meta['schema'], meta['table'], meta['date_col'], meta['item_col'], meta['qty_col'],
+                meta['model_type'], meta['item'], meta.get('planning_areas'),
+                meta.get('scenario_names'), meta.get('hyperparameter_tuning', False)
+            )
+            groups.setdefault(new_key, []).append(old_key)
+        
+        for new_key, old_keys in groups.items():
+            # Models differing only by horizon are identical; keep the most recently trained one
+            candidates = sorted(old_keys, key=lambda k: self.metadata_cache[k].get('cached_at', ''), reverse=True)
+            keep = None
+            if new_key not in self.metadata_cache:
+                keep = next((k for k in candidates if self.backend.exists(_legacy_model_key(k))), None)
+            
+            if keep is not None:
+                try:
+                    meta = {k: v for k, v in self.metadata_cache[keep].items() if k != 'forecast_days'}
+                    meta['cache_key'] = new_key
+                    meta['blob'] = self._put_blob(self.backend.get(_legacy_model_key(keep)))
+                    self._write_json(_meta_key(new_key), meta)
+                    self.metadata_cache[new_key] = meta
+                    stats['migrated'] += 1
+                except Exception as e:
+                    print(f"Failed to migrate cache entry {keep}: {e}")
+                    keep = None
+            
+            for old_key in old_keys:
+                if old_key == new_key:
+                    continue
+                self._remove_entry_files(old_key)
+                self.metadata_cache.pop(old_key, None)
+                if old_key != keep:
+                    stats['duplicates_removed'] += 1
+        
+        if stats['migrated'] or stats['duplicates_removed']:
+            self._save_metadata_index()
+            print(f"Cache key migration: {stats}")
+        return stats
+    
+    def _remove_entry_files(self, cache_key: str):
+        """Delete an entry's metadata and legacy model file if present"""
+        for key in (_legacy_model_key(cache_key), _meta_key(cache_key)):
+            if self.backend.exists(key):
+                self.backend.delete(key)
+    
+    def _read_json(self, key: str) -> Optional[Dict]:
+        data = self.backend.get(key)
+        return json.loads(data) if data is not None else None
+    
+    def _write_json(self, key: str, value: Dict):
+        self.backend.put(key, json.dumps(value, indent=2).encode())
+    
+    def _put_blob(self, data: bytes) -> str:
+        """Store serialized model bytes under their SHA-256 digest; identical models are stored once"""
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.backend.exists(_blob_key(digest)):
+            self.backend.put(_blob_key(digest), data)
+        return digest
+    
+    def _release_blob(self, digest: str):
+        """Blobs are shared by identical models; delete one only when no entry references it"""
+        with self._key_locks.hold(('blob', digest)):
+            with self._lock:
+                in_use = any(m.get('blob') == digest for m in self.metadata_cache.values())
+                if not in_use:
+                    self._blob_cache.pop(_blob_key(digest), None)
+            if not in_use:
+                self.backend.delete(_blob_key(digest))
+    
+    def _load_blob(self, key: str, immutable: bool) -> Optional[Any]:
+        """Deserialize a model, serving content-addressed blobs from the in-process LRU"""
+        if immutable:
+            with self._lock:
+                if key in self._blob_cache:
+                    self._blob_cache.move_to_end(key)
+                    return self._blob_cache[key]
+        data = self.backend.get(key)
+        if data is None:
+            return None
+        if data.startswith(PICKLE_BLOB_HEADER):
+            model = pickle.loads(memoryview(data)[len(PICKLE_BLOB_HEADER):])
+        else:
+            model = joblib.load(io.BytesIO(data))
+        if immutable and self.memory_cache_size > 0:
+            with self._lock:
+                self._blob_cache[key] = model
+                while len(self._blob_cache) > self.memory_cache_size:
+                    self._blob_cache.popitem(last=False)
+        return model
+    
+    def _store_entries(self) -> Dict[str, Dict]:
+        """Metadata of every entry in the store, including entries written by other nodes and processes"""
+        keys = self.backend.list_keys(META_SUFFIX)
+        if not keys:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.load_workers, len(keys)))) as executor:
+            metas = list(executor.map(self._read_json, keys))
+        return {meta['cache_key']: meta for meta in metas if meta and 'cache_key' in meta}
+    
+    def refresh_index(self) -> Dict[str, Dict]:
+        """Replace the in-memory and stored index with the entries actually in the store"""
+        entries = self._store_entries()
+        with self._lock:
+            self.metadata_cache = dict(entries)
+        self._save_metadata_index()
+        return entries
+    
     def _load_metadata_index(self):
-        """Load metadata index for fast lookups"""
+        """Load metadata index for fast lookups, rebuilding it from entry metadata if missing"""
         try:
-            index_file = self.cache_dir / "cache_index.json"
-            if index_file.exists():
-                with open(index_file, 'r') as f:
-                    self.metadata_cache = json.load(f)
+            index = self._read_json(INDEX_KEY)
+            self.metadata_cache = index if index is not None else self._store_entries()
         except Exception:
             self.metadata_cache = {}
     
-    def _save_metadata_index(self):
-        """Save metadata index to disk"""
+    def _save_metadata_index(self, updates: Optional[Dict[str, Dict]] = None, removed: Tuple[str, ...] = ()):
+        """
+        Save the metadata index to the store. With updates/removed, only those entries change in
+        the stored index, so entries other writers added since this node loaded it are kept;
+        without them the whole in-memory index is written.
+        """
         try:
-            index_file = self.cache_dir / "cache_index.json"
-            with open(index_file, 'w') as f:
-                json.dump(self.metadata_cache, f, indent=2)
+            with self._index_lock:
+                if updates is None and not removed:
+                    with self._lock:
+                        index = dict(self.metadata_cache)
+                else:
+                    index = self._read_json(INDEX_KEY) or {}
+                    index.update(updates or {})
+                    for cache_key in removed:
+                        index.pop(cache_key, None)
+                self._write_json(INDEX_KEY, index)
         except Exception:
             pass
     
     def save_model(self, schema: str, table: str, date_col: str, 
                    item_col: str, qty_col: str, model_type: str,
-                   forecast_days: int, item: str, model: Any, 
+                   item: str, model: Any, 
                    metadata: Dict, planning_areas: Optional[List[str]] = None,
                    scenario_names: Optional[List[str]] = None,
                    hyperparameter_tuning: bool = False) -> Optional[str]:
@@ -73,14 +264,15 @@ class ModelCache:
         
         cache_key = self._generate_cache_key(
             schema, table, date_col, item_col, qty_col, 
-            model_type, forecast_days, item, 
+            model_type, item, 
             planning_areas, scenario_names, hyperparameter_tuning
         )
         
         try:
-            # Save model to disk using joblib
-            model_file = self.cache_dir / f"{cache_key}.joblib"
-            joblib.dump(model, model_file)
+            # Serialize outside any lock; only the store writes are serialised.
+            # Only what forecasting needs is stored (no statsmodels data, Prophet history)
+            data = PICKLE_BLOB_HEADER + pickle.dumps(slim_for_storage(model), protocol=5)
+            digest = hashlib.sha256(data).hexdigest()
             
             # Save metadata (metrics, timestamps, config)
             full_metadata = {
@@ -90,24 +282,35 @@ class ModelCache:
                 'item_col': item_col,
                 'qty_col': qty_col,
                 'model_type': model_type,
-                'forecast_days': forecast_days,
                 'item': str(item),
                 'cache_key': cache_key,
                 'cached_at': datetime.now().isoformat(),
                 'planning_areas': planning_areas,
                 'scenario_names': scenario_names,
                 'hyperparameter_tuning': hyperparameter_tuning,
-                **metadata  # Includes MAE, MAPE, RMSE, data_points
+                **metadata,  # Includes MAE, MAPE, RMSE, data_points
+                'blob': digest
             }
             
-            # Save metadata
-            meta_file = self.cache_dir / f"{cache_key}.meta.json"
-            with open(meta_file, 'w') as f:
-                json.dump(full_metadata, f, indent=2)
-            
-            # Update in-memory index
-            self.metadata_cache[cache_key] = full_metadata
-            self._save_metadata_index()
+            # Entry lock, then blob lock (same order as delete_model) so a concurrent
+            # delete cannot remove the blob between storing it and referencing it
+            with self._key_locks.hold(cache_key):
+                previous = self.metadata_cache.get(cache_key) or {}
+                with self._key_locks.hold(('blob', digest)):
+                    self._put_blob(data)
+                    self._write_json(_meta_key(cache_key), full_metadata)
+                    
+                    # The entry now points at a blob; drop any pre-content-addressing model file
+                    if self.backend.exists(_legacy_model_key(cache_key)):
+                        self.backend.delete(_legacy_model_key(cache_key))
+                    
+                    # Update in-memory index
+                    with self._lock:
+                        self.metadata_cache[cache_key] = full_metadata
+                
+                if previous.get('blob') and previous['blob'] != digest:
+                    self._release_blob(previous['blob'])
+            self._save_metadata_index({cache_key: full_metadata})
             
             print(f"Cached model for {item} with key {cache_key}")
             return cache_key
@@ -119,28 +322,47 @@ class ModelCache:
     def load_model(self, cache_key: str) -> Tuple[Optional[Any], Optional[Dict]]:
         """Load model and metadata from cache"""
         try:
-            model_file = self.cache_dir / f"{cache_key}.joblib"
-            meta_file = self.cache_dir / f"{cache_key}.meta.json"
-            
-            if not (model_file.exists() and meta_file.exists()):
+            # Metadata is always read from the store so models retrained on other nodes are picked up
+            metadata = self._read_json(_meta_key(cache_key))
+            if metadata is None:
                 return None, None
             
-            # Load model
-            model = joblib.load(model_file)
-            
-            # Load metadata
-            with open(meta_file, 'r') as f:
-                metadata = json.load(f)
+            # Entries written before content addressing keep their per-key model file
+            if metadata.get('blob'):
+                model = self._load_blob(_blob_key(metadata['blob']), immutable=True)
+            else:
+                model = self._load_blob(_legacy_model_key(cache_key), immutable=False)
+            if model is None:
+                return None, None
             
+            with self._lock:
+                self.metadata_cache[cache_key] = metadata
             return model, metadata
             
         except Exception as e:
             print(f"Failed to load model from cache: {e}")
             return None, None
     
+    def load_models(self, cache_keys: List[str], max_workers: Optional[int] = None) -> Dict[str, Tuple[Any, Dict]]:
+        """
+        Load many entries concurrently on a bounded thread pool.
+        Returns cache_key -> (model, metadata) for the keys that were found.
+        """
+        unique_keys = list(dict.fromkeys(cache_keys))
+        if not unique_keys:
+            return {}
+        workers = max(1, min(int(max_workers or self.load_workers), len(unique_keys)))
+        if workers == 1:
+            loaded = [self.load_model(key) for key in unique_keys]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                loaded = list(executor.map(self.load_model, unique_keys))
+        return {key: (model, metadata) for key, (model, metadata) in zip(unique_keys, loaded)
+                if model is not None and metadata is not None}
+    
     def exists(self, schema: str, table: str, date_col: str, 
                item_col: str, qty_col: str, model_type: str,
-               forecast_days: int, item: str,
+               item: str,
                planning_areas: Optional[List[str]] = None,
                scenario_names: Optional[List[str]] = None,
                hyperparameter_tuning: bool = False) -> bool:
@@ -148,46 +370,40 @@ class ModelCache:
         
         cache_key = self._generate_cache_key(
             schema, table, date_col, item_col, qty_col, 
-            model_type, forecast_days, item, 
+            model_type, item, 
             planning_areas, scenario_names, hyperparameter_tuning
         )
         
-        # Check both in-memory index and actual file existence
-        model_file = self.cache_dir / f"{cache_key}.joblib"
-        meta_file = self.cache_dir / f"{cache_key}.meta.json"
-        
-        return (cache_key in self.metadata_cache or 
-                (model_file.exists() and meta_file.exists()))
+        # Check the in-memory index first, then the shared store (entries written by other nodes)
+        return cache_key in self.metadata_cache or self.backend.exists(_meta_key(cache_key))
     
     def get_cache_key(self, schema: str, table: str, date_col: str,
                       item_col: str, qty_col: str, model_type: str,
-                      forecast_days: int, item: str,
+                      item: str,
                       planning_areas: Optional[List[str]] = None,
                       scenario_names: Optional[List[str]] = None,
                       hyperparameter_tuning: bool = False) -> str:
         """Get cache key for configuration"""
         return self._generate_cache_key(
             schema, table, date_col, item_col, qty_col, 
-            model_type, forecast_days, item, 
+            model_type, item, 
             planning_areas, scenario_names, hyperparameter_tuning
         )
     
     def delete_model(self, cache_key: str) -> bool:
         """Delete model and metadata from cache"""
         try:
-            model_file = self.cache_dir / f"{cache_key}.joblib"
-            meta_file = self.cache_dir / f"{cache_key}.meta.json"
-            
-            # Remove files if they exist
-            if model_file.exists():
-                model_file.unlink()
-            if meta_file.exists():
-                meta_file.unlink()
-            
-            # Remove from index
-            if cache_key in self.metadata_cache:
-                del self.metadata_cache[cache_key]
-                self._save_metadata_index()
+            with self._key_locks.hold(cache_key):
+                metadata = self.metadata_cache.get(cache_key) or self._read_json(_meta_key(cache_key)) or {}
+                self._remove_entry_files(cache_key)
+                
+                # Remove from index
+                with self._lock:
+                    self.metadata_cache.pop(cache_key, None)
+                self._save_metadata_index(removed=(cache_key,))
+                
+                if metadata.get('blob'):
+                    self._release_blob(metadata['blob'])
             
             return True
             
@@ -197,7 +413,7 @@ class ModelCache:
     
     def get_cached_items(self, schema: str, table: str, date_col: str,
                          item_col: str, qty_col: str, model_type: str,
-                         forecast_days: int, items: List[str],
+                         items: List[str],
                          planning_areas: Optional[List[str]] = None,
                          scenario_names: Optional[List[str]] = None,
                          hyperparameter_tuning: bool = False) -> Tuple[List[str], List[str]]:
@@ -207,7 +423,7 @@ class ModelCache:
         
         for item in items:
             if self.exists(schema, table, date_col, item_col, qty_col, 
-                          model_type, forecast_days, item, 
+                          model_type, item, 
                           planning_areas, scenario_names, hyperparameter_tuning):
                 cached_items.append(item)
             else:
@@ -216,35 +432,112 @@ class ModelCache:
         return cached_items, missing_items
     
     def clear_all(self) -> int:
-        """Clear all cached models"""
+        """Clear all cached models (including those other nodes wrote) and failure records"""
         deleted_count = 0
-        for cache_key in list(self.metadata_cache.keys()):
+        for cache_key in list(self.refresh_index()):
             if self.delete_model(cache_key):
                 deleted_count += 1
+        for key in self.backend.list_keys(FAILURE_SUFFIX):
+            self.backend.delete(key)
         return deleted_count
     
+    def record_failure(self, cache_key: str, fingerprint: str, error: str) -> Dict:
+        """
+        Remember that training this cache key failed on data with this fingerprint.
+        Repeated failures on the same data double the backoff; new data starts over.
+        """
+        with self._key_locks.hold(('failure', cache_key)):
+            previous = self._read_json(_failure_key(cache_key)) or {}
+            failures = previous.get('failures', 0) + 1 if previous.get('fingerprint') == fingerprint else 1
+            backoff = min(FAILURE_BACKOFF_SECONDS * 2 ** (failures - 1), FAILURE_BACKOFF_MAX_SECONDS)
+            now = datetime.now()
+            record = {
+                'cache_key': cache_key,
+                'fingerprint': fingerprint,
+                'error': error,
+                'failures': failures,
+                'failed_at': now.isoformat(),
+                'retry_after': (now + timedelta(seconds=backoff)).isoformat()
+            }
+            self._write_json(_failure_key(cache_key), record)
+        return record
+    
+    def get_failure(self, cache_key: str, fingerprint: str) -> Optional[Dict]:
+        """
+        Failure record that should stop this cache key from being retrained: same data
+        and still within its backoff. A record for different data is dropped.
+        """
+        try:
+            record = self._read_json(_failure_key(cache_key))
+        except Exception as e:
+            print(f"Failed to read failure record for {cache_key}: {e}")
+            return None
+        if not record:
+            return None
+        if record.get('fingerprint') != fingerprint:
+            # The data changed since the failure, so the item gets a fresh attempt
+            self.clear_failure(cache_key)
+            return None
+        if record.get('retry_after', '') <= datetime.now().isoformat():
+            # Backoff over: retry, and keep the record so another failure backs off longer
+            return None
+        return record
+    
+    def clear_failure(self, cache_key: str):
+        """Forget a failure record, e.g. after the item trained successfully"""
+        with self._key_locks.hold(('failure', cache_key)):
+            if self.backend.exists(_failure_key(cache_key)):
+                self.backend.delete(_failure_key(cache_key))
+    
+    def save_ref(self, model_id: str, cache_key: str):
+        """Publish which cache entry backs a served model id, so any node can load it"""
+        self._write_json(_ref_key(model_id), {'model_id': model_id, 'cache_key': cache_key})
+    
+    def load_ref(self, model_id: str) -> Tuple[Optional[Any], Optional[Dict]]:
+        """Load the model published for a model id by save_ref on any node"""
+        try:
+            ref = self._read_json(_ref_key(model_id))
+        except Exception as e:
+            print(f"Failed to read model reference for {model_id}: {e}")
+            return None, None
+        if not ref or ref.get('model_id') != model_id:
+            return None, None
+        return self.load_model(ref['cache_key'])
+    
     def get_cache_stats(self) -> Dict:
-        """Get cache statistics"""
-        total_models = len(self.metadata_cache)
+        """Get cache statistics over every entry in the store"""
+        entries = list(self._store_entries().items())
+        with self._lock:
+            memory_cached_models = len(self._blob_cache)
+        total_models = len(entries)
         total_size = 0
         
-        for cache_key in self.metadata_cache:
-            model_file = self.cache_dir / f"{cache_key}.joblib"
-            if model_file.exists():
-                total_size += model_file.stat().st_size
+        # Models sharing a blob are only counted once
+        model_keys = {
+            _blob_key(meta['blob']) if meta.get('blob') else _legacy_model_key(cache_key)
+            for cache_key, meta in entries
+        }
+        for key in model_keys:
+            total_size += self.backend.size(key)
         
         return {
             'total_models': total_models,
+            'unique_blobs': len(model_keys),
             'total_size_mb': round(total_size / (1024 * 1024), 2),
-            'cache_dir': str(self.cache_dir)
+            'backend': self.backend.name,
+            'cache_dir': self.backend.describe(),
+            'memory_cached_models': memory_cached_models
         }
 
 # Global cache instance
 _model_cache = None
+_model_cache_lock = threading.Lock()
 
 def get_model_cache() -> ModelCache:
     """Get global model cache instance"""
     global _model_cache
     if _model_cache is None:
-        _model_cache = ModelCache()
+        with _model_cache_lock:
+            if _model_cache is None:
+                _model_cache = ModelCache(backend=create_storage_backend())
     return _model_cache
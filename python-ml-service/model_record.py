@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional
+
+# Number of trailing history days kept with each model for forecast context
+HISTORY_TAIL_DAYS = 30
+
+
+def dates_to_epoch_days(dates) -> np.ndarray:
+    """Convert a date-like sequence to int64 days since 1970-01-01"""
+    return np.asarray(pd.to_datetime(dates).values.astype('datetime64[D]').astype(np.int64), dtype=np.int64)
+
+
+def epoch_days_to_dates(days: np.ndarray) -> pd.DatetimeIndex:
+    """Convert int64 epoch days back to a DatetimeIndex"""
+    return pd.DatetimeIndex(np.asarray(days, dtype=np.int64).astype('datetime64[D]').astype('datetime64[ns]'))
+
+
+class ModelRecord:
+    """Compact representation of a trained model and the state needed to forecast with it"""
+
+    __slots__ = (
+        'type', 'model', 'scaler', 'feature_cols', 'residual_std',
+        'order', 'seasonal_order', 'best_params', 'is_simple',
+        'training_metrics', 'history_days', 'history_values', 'flat_forest'
+    )
+
+    def __init__(self, model_type: str, model: Any, history: Optional[pd.DataFrame] = None,
+                 tail_days: int = HISTORY_TAIL_DAYS, **attrs):
+        for slot in self.__slots__:
+            setattr(self, slot, None)
+        self.type = model_type
+        self.model = model
+        self.is_simple = False
+        for name, value in attrs.items():
+            setattr(self, name, value)
+        self.set_history(history, tail_days)
+
+    def set_history(self, history: Optional[pd.DataFrame], tail_days: int = HISTORY_TAIL_DAYS):
+        """Keep only the trailing history as typed arrays (epoch days + float32 values)"""
+        if history is None or len(history) == 0:
+            self.history_days = np.empty(0, dtype=np.int64)
+            self.history_values = np.empty(0, dtype=np.float32)
+            return
+        tail = history.tail(tail_days)
+        self.history_days = dates_to_epoch_days(tail['date'])
+        self.history_values = np.asarray(tail['value'].values, dtype=np.float32)
+
+    def history_frame(self) -> pd.DataFrame:
+        """Rebuild the stored history tail as a date/value DataFrame"""
+        if self.history_days is None or len(self.history_days) == 0:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            'date': epoch_days_to_dates(self.history_days),
+            'value': self.history_values.astype(float)
+        })
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Dict-style attribute lookup returning default when unset"""
+        value = getattr(self, name, None) if name in self.__slots__ else None
+        return default if value is None else value
+
+    def __getstate__(self) -> Dict:
+        return {slot: getattr(self, slot, None) for slot in self.__slots__}
+
+    def __setstate__(self, state: Dict):
+        for slot in self.__slots__:
+            setattr(self, slot, state.get(slot))
+        if self.is_simple is None:
+            self.is_simple = False
+
+    @classmethod
+    def from_legacy(cls, entry: Any) -> 'ModelRecord':
+        """Convert a legacy dict entry (with a DataFrame last_data) into a ModelRecord"""
+        if isinstance(entry, cls):
+            return entry
+        if not isinstance(entry, dict):
+            raise TypeError(f"Unsupported model entry type: {type(entry).__name__}")
+        attrs = {k: v for k, v in entry.items() if k in cls.__slots__ and k not in ('type', 'model')}
+        return cls(entry.get('type'), entry.get('model'), history=entry.get('last_data'), **attrs)
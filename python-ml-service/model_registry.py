@@ -0,0 +1,99 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+
+class KeyedLocks:
+    """Per-key re-entrant locks, created on first use and dropped once nobody holds or waits on them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks: Dict[Hashable, list] = {}  # key -> [RLock, holders + waiters]
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.RLock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._locks)
+
+
+class ModelRegistry:
+    """
+    Thread-safe model id -> ModelRecord map shared by request threads.
+    Single reads and writes are atomic; check-then-act sequences on one model id
+    (load-if-missing, train-then-persist) run under that id's lock, so requests for
+    different ids never block each other.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._key_locks = KeyedLocks()
+
+    def __getitem__(self, model_id: str) -> Any:
+        with self._lock:
+            return self._models[model_id]
+
+    def __setitem__(self, model_id: str, model_info: Any):
+        with self._lock:
+            self._models[model_id] = model_info
+
+    def __delitem__(self, model_id: str):
+        with self._lock:
+            del self._models[model_id]
+
+    def __contains__(self, model_id: str) -> bool:
+        with self._lock:
+            return model_id in self._models
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._models)
+
+    def get(self, model_id: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._models.get(model_id, default)
+
+    def pop(self, model_id: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._models.pop(model_id, default)
+
+    def keys(self) -> List[str]:
+        """Snapshot of the registered model ids"""
+        with self._lock:
+            return list(self._models)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def lock(self, model_id: str):
+        """Context manager serialising work on one model id"""
+        return self._key_locks.hold(model_id)
+
+    def get_or_load(self, model_id: str, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """Return the registered model, running loader at most once across concurrent callers"""
+        model_info = self.get(model_id)
+        if model_info is not None:
+            return model_info
+        with self.lock(model_id):
+            model_info = self.get(model_id)
+            if model_info is None:
+                model_info = loader()
+                if model_info is not None:
+                    self[model_id] = model_info
+        return model_info
@@ -0,0 +1,61 @@
+import copy
+from typing import Any
+from model_record import ModelRecord
+
+# Prophet history rows kept: a one-day horizon with uncertainty reads the spacing of the last two
+PROPHET_HISTORY_ROWS = 2
+
+# Trailing observations re-filtered into a slim statsmodels state-space result
+STATESPACE_TAIL_OBS = 1
+
+
+def slim_statespace_results(results: Any) -> Any:
+    """
+    Forecast-only copy of fitted statsmodels state-space results (ARIMA/SARIMAX).
+    The last observations are re-filtered from the predicted state the full filter
+    reached before them, so get_forecast gives the same output while the copy holds a
+    few rows instead of the full endog, filter and smoother arrays. remove_data() alone
+    is not enough: get_forecast needs endog to build its prediction index.
+    """
+    model = results.model
+    start = max(model.nobs - STATESPACE_TAIL_OBS, 0)
+    slim_model = model.clone(model.data.orig_endog[start:])
+    slim_model.initialize_known(results.predicted_state[:, start], results.predicted_state_cov[:, :, start])
+    return slim_model.filter(results.params)
+
+
+def slim_prophet(model: Any) -> Any:
+    """Predict-only shallow copy of a fitted Prophet model without its history and Stan fit output"""
+    slim = copy.copy(model)
+    slim.history = model.history.tail(PROPHET_HISTORY_ROWS).copy()
+    if getattr(model, 'history_dates', None) is not None:
+        slim.history_dates = model.history_dates.tail(PROPHET_HISTORY_ROWS).copy()
+    slim.stan_fit = None
+    if getattr(model, 'stan_backend', None) is not None:
+        slim.stan_backend = copy.copy(model.stan_backend)
+        slim.stan_backend.stan_fit = None
+    return slim
+
+
+def slim_for_storage(entry: Any) -> Any:
+    """
+    Copy of a ModelRecord reduced to what forecasting needs, for persistence.
+    The original record is left untouched (backtests still append to full ARIMA results);
+    anything that cannot be slimmed is returned as is.
+    """
+    if not isinstance(entry, ModelRecord) or entry.is_simple:
+        return entry
+    model = entry.model
+    try:
+        if hasattr(model, 'predicted_state') and hasattr(getattr(model, 'model', None), 'clone'):
+            slim_model = slim_statespace_results(model)
+        elif getattr(model, 'history', None) is not None and hasattr(model, 'stan_backend'):
+            slim_model = slim_prophet(model)
+        else:
+            return entry
+    except Exception as e:
+        print(f"Model slimming failed, storing full model: {e}", flush=True)
+        return entry
+    slim = copy.copy(entry)
+    slim.model = slim_model
+    return slim
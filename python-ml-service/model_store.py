@@ -0,0 +1,243 @@
+import os
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+    class ClientError(Exception):
+        """botocore's ClientError shape, so an injected S3 client can report missing keys without boto3"""
+
+        def __init__(self, error_response: dict, operation_name: str):
+            super().__init__(f"{operation_name}: {error_response.get('Error', {})}")
+            self.response = error_response
+            self.operation_name = operation_name
+
+STORE_BACKENDS = ('local', 'redis', 's3')
+DEFAULT_KEY_PREFIX = 'ml-models/'
+
+
+class StorageBackend(ABC):
+    """Byte store behind ModelCache; keys are relative paths such as 'blobs/<hash>.joblib'"""
+
+    name = 'base'
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Value of key, or None when it does not exist"""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes):
+        """Store data under key, replacing any previous value"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove key; missing keys are ignored"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether key exists"""
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """Size of key's value in bytes (0 when missing)"""
+
+    @abstractmethod
+    def list_keys(self, suffix: str = '') -> List[str]:
+        """All keys ending in suffix, sorted"""
+
+    def describe(self) -> str:
+        return self.name
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Files under a local directory (the original models/cache layout).
+    Writes go to a temporary file that is renamed into place, so readers see either
+    the previous or the new content, never a partial file.
+    """
+
+    name = 'local'
+
+    def __init__(self, root: str = "models/cache"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    def delete(self, key: str):
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def size(self, key: str) -> int:
+        try:
+            return self._path(key).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def list_keys(self, suffix: str = '') -> List[str]:
+        # Dot-prefixed names are in-progress temporary writes
+        return sorted(str(p.relative_to(self.root)) for p in self.root.rglob(f"*{suffix}")
+                      if p.is_file() and not p.name.startswith('.'))
+
+    def describe(self) -> str:
+        return str(self.root)
+
+
+class RedisStorageBackend(StorageBackend):
+    """Any Redis-protocol server; one string value per key"""
+
+    name = 'redis'
+
+    def __init__(self, url: Optional[str] = None, prefix: str = DEFAULT_KEY_PREFIX, client=None):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise ImportError("redis package is required for the redis model store")
+            client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.client = client
+        self.prefix = prefix
+        self.url = url
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def put(self, key: str, data: bytes):
+        self.client.set(self.prefix + key, data)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def exists(self, key: str) -> bool:
+        return bool(self.client.exists(self.prefix + key))
+
+    def size(self, key: str) -> int:
+        return int(self.client.strlen(self.prefix + key))
+
+    def list_keys(self, suffix: str = '') -> List[str]:
+        keys = []
+        for raw in self.client.scan_iter(match=f"{self.prefix}*{suffix}"):
+            key = raw.decode() if isinstance(raw, bytes) else raw
+            keys.append(key[len(self.prefix):])
+        return sorted(keys)
+
+    def describe(self) -> str:
+        return f"redis:{self.prefix}"
+
+
+class S3StorageBackend(StorageBackend):
+    """S3 or an S3-compatible server such as MinIO (set endpoint_url)"""
+
+    name = 's3'
+
+    def __init__(self, bucket: str, prefix: str = DEFAULT_KEY_PREFIX,
+                 endpoint_url: Optional[str] = None, client=None):
+        if client is None:
+            if not BOTO3_AVAILABLE:
+                raise ImportError("boto3 package is required for the s3 model store")
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    @staticmethod
+    def _is_missing(error) -> bool:
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body'].read()
+        except ClientError as e:
+            if self._is_missing(e):
+                return None
+            raise
+
+    def put(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except ClientError as e:
+            if self._is_missing(e):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str) -> int:
+        head = self._head(key)
+        return int(head['ContentLength']) if head else 0
+
+    def list_keys(self, suffix: str = '') -> List[str]:
+        keys = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get('Contents', []):
+                if obj['Key'].endswith(suffix):
+                    keys.append(obj['Key'][len(self.prefix):])
+        return sorted(keys)
+
+    def describe(self) -> str:
+        return f"s3://{self.bucket}/{self.prefix}"
+
+
+def create_storage_backend(cache_dir: str = "models/cache") -> StorageBackend:
+    """
+    Backend selected by MODEL_STORE_BACKEND (local, redis or s3).
+    redis uses REDIS_URL; s3 uses MODEL_STORE_BUCKET and, for MinIO and similar,
+    MODEL_STORE_ENDPOINT. MODEL_STORE_PREFIX namespaces keys on shared servers.
+    """
+    backend = os.getenv('MODEL_STORE_BACKEND', 'local').lower()
+    prefix = os.getenv('MODEL_STORE_PREFIX', DEFAULT_KEY_PREFIX)
+    if backend == 'redis':
+        return RedisStorageBackend(os.getenv('REDIS_URL'), prefix)
+    if backend == 's3':
+        bucket = os.getenv('MODEL_STORE_BUCKET')
+        if not bucket:
+            raise ValueError("MODEL_STORE_BUCKET is required for the s3 model store")
+        return S3StorageBackend(bucket, prefix, os.getenv('MODEL_STORE_ENDPOINT'))
+    if backend != 'local':
+        raise ValueError(f"Unknown model store backend: {backend} (expected one of {', '.join(STORE_BACKENDS)})")
+    return LocalStorageBackend(cache_dir)
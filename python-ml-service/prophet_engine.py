@@ -0,0 +1,155 @@
+import copy
+import os
+import multiprocessing
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from resource_governor import limit_worker_threads
+
+# Below this many Prophet items a process pool costs more than it saves
+PARALLEL_MIN_ITEMS = 4
+
+# Stan parameters carried from a fitted model into the next fit's init
+WARM_START_SCALARS = ('k', 'm', 'sigma_obs')
+WARM_START_VECTORS = ('delta', 'beta')
+
+# One process pool of fixed size shared by all requests; each request uses at most its thread lease
+POOL_WORKERS = max(1, int(os.environ.get('PROPHET_POOL_WORKERS', os.cpu_count() or 1)))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def future_dates(last_date: pd.Timestamp, forecast_days: int) -> pd.DatetimeIndex:
+    """Daily dates following the last observed date"""
+    return pd.date_range(start=last_date + pd.Timedelta(days=1), periods=forecast_days, freq='D')
+
+
+def predictions_from_frame(forecast: pd.DataFrame) -> List[Dict]:
+    """Convert a Prophet forecast frame to prediction dicts without iterating rows"""
+    yhat = np.maximum(forecast['yhat'].to_numpy(dtype=float), 0)
+    lower = np.maximum(forecast['yhat_lower'].to_numpy(dtype=float), 0) if 'yhat_lower' in forecast else yhat
+    upper = np.maximum(forecast['yhat_upper'].to_numpy(dtype=float), 0) if 'yhat_upper' in forecast else yhat
+    dates = pd.DatetimeIndex(forecast['ds']).strftime('%Y-%m-%d')
+    return [
+        {"date": d, "value": v, "lower": lo, "upper": up}
+        for d, v, lo, up in zip(dates, yhat.tolist(), lower.tolist(), upper.tolist())
+    ]
+
+
+def predict_prophet(model: Any, last_date: pd.Timestamp, forecast_days: int,
+                    uncertainty_samples: Optional[int] = None) -> List[Dict]:
+    """Predict one Prophet model, optionally overriding its uncertainty sampling"""
+    future_df = pd.DataFrame({'ds': future_dates(last_date, forecast_days)})
+
+    # SimpleAverageModel and other stand-ins have no uncertainty sampling
+    if uncertainty_samples is None or not hasattr(model, 'uncertainty_samples'):
+        return predictions_from_frame(model.predict(future_df))
+
+    # The model is shared by concurrent forecasts: override the sample count on a shallow copy
+    override = copy.copy(model)
+    override.uncertainty_samples = int(uncertainty_samples)
+    return predictions_from_frame(override.predict(future_df))
+
+
+def warm_start_params(model: Any) -> Optional[Dict]:
+    """Fitted MAP parameters of a Prophet model in the form Prophet.fit accepts as init"""
+    params = getattr(model, 'params', None)
+    if not params or any(name not in params for name in WARM_START_SCALARS + WARM_START_VECTORS):
+        return None
+    try:
+        init = {name: float(params[name][0][0]) for name in WARM_START_SCALARS}
+        init.update({name: np.asarray(params[name][0], dtype=float) for name in WARM_START_VECTORS})
+    except (IndexError, TypeError, ValueError):
+        return None
+    return init
+
+
+def fit_prophet(make_model: Callable[[], Any], df: pd.DataFrame, init: Optional[Dict] = None) -> Any:
+    """
+    Fit a new Prophet model from make_model, starting Stan at init when given.
+    Prophet replaces init vectors whose shape does not match the new model (a different
+    number of changepoints or seasonality terms) with its defaults. A Prophet object can
+    only be fit once, so if the warm-started fit fails a fresh model is fit from the default start.
+    """
+    if init is not None:
+        try:
+            return make_model().fit(df, init=init)
+        except Exception as e:
+            print(f"Prophet warm start failed, fitting from default start: {e}", flush=True)
+    return make_model().fit(df)
+
+
+def _predict_job(job: Tuple[Any, pd.Timestamp, int, Optional[int]]) -> Any:
+    """Process pool entry point; returns the exception instead of raising it"""
+    model, last_date, forecast_days, uncertainty_samples = job
+    try:
+        return predict_prophet(model, last_date, forecast_days, uncertainty_samples)
+    except Exception as e:
+        return e
+
+
+def _predict_jobs(jobs: List[Tuple[Any, pd.Timestamp, int, Optional[int]]]) -> List[Any]:
+    """Process pool entry point for one request's share of jobs"""
+    return [_predict_job(job) for job in jobs]
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Reuse one spawned process pool so workers import Prophet only once"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawn rather than fork: the Flask process is multi-threaded.
+            # Each worker is one unit of a caller's thread budget, so pin its BLAS to one thread.
+            _executor = ProcessPoolExecutor(max_workers=POOL_WORKERS,
+                                            mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=limit_worker_threads, initargs=(1,))
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    """Drop a broken pool so the next batch starts a fresh one (unless another caller already did)"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def predict_prophet_batch(jobs: Dict[str, Tuple[Any, pd.Timestamp]], forecast_days: int,
+                          uncertainty_samples: Optional[int] = None,
+                          max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Predict many Prophet models at once.
+    jobs maps item -> (model, last_date). Returns item -> predictions list, or the
+    Exception raised for that item so callers can handle failures per item.
+    """
+    if not jobs:
+        return {}
+
+    items = list(jobs.keys())
+    payload = [(jobs[item][0], jobs[item][1], forecast_days, uncertainty_samples) for item in items]
+
+    # The pool is shared and fixed-size; this batch is cut into max_workers parts so it
+    # never occupies more pool processes at once than the caller's thread lease
+    if max_workers is None:
+        max_workers = POOL_WORKERS
+    max_workers = max(1, min(int(max_workers), POOL_WORKERS))
+
+    if max_workers > 1 and len(items) >= PARALLEL_MIN_ITEMS:
+        executor = _get_executor()
+        try:
+            parts = [payload[start::max_workers] for start in range(max_workers)]
+            part_results = [future.result() for future in [executor.submit(_predict_jobs, part) for part in parts]]
+            print(f"Predicted {len(items)} Prophet items across {max_workers} processes", flush=True)
+            return {item: part_results[index % max_workers][index // max_workers] for index, item in enumerate(items)}
+        except Exception as e:
+            # Unpicklable models or a broken pool - fall back to in-process prediction
+            if isinstance(e, BrokenProcessPool):
+                _discard_executor(executor)
+            print(f"Parallel Prophet prediction failed, predicting serially: {e}", flush=True)
+
+    return {item: _predict_job(job) for item, job in zip(items, payload)}
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    THREADPOOLCTL_AVAILABLE = False
+
+
+class ThreadLease:
+    """Thread budget granted to one request"""
+
+    __slots__ = ('lease_id', 'label', 'threads', 'acquired_at')
+
+    def __init__(self, lease_id: int, label: str, threads: int):
+        self.lease_id = lease_id
+        self.label = label
+        self.threads = threads
+        self.acquired_at = time.time()
+
+
+class ResourceGovernor:
+    """
+    Splits this worker's CPU budget between concurrent requests.
+    Each request holds a ThreadLease; code that fans out (RF n_jobs, backtest folds,
+    Prophet prediction processes) asks current_threads() instead of using every core.
+    BLAS/OpenMP pools are process-wide, so they are capped at the per-request share.
+    """
+
+    def __init__(self, total_threads: Optional[int] = None):
+        # ML_CPU_BUDGET lets several workers on one node split its cores explicitly
+        self.total_threads = int(total_threads or os.getenv('ML_CPU_BUDGET', 0) or os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._leases = {}
+        self._next_id = 0
+        self._blas_limit = None
+        self._blas_limiter = None
+
+    def _fair_share(self, active: int) -> int:
+        return max(1, self.total_threads // max(1, active))
+
+    def _apply_blas_limit(self):
+        """Cap BLAS/OpenMP threads at the current per-request share (call with lock held)"""
+        limit = self._fair_share(len(self._leases))
+        if not THREADPOOLCTL_AVAILABLE or limit == self._blas_limit:
+            return
+        try:
+            self._blas_limiter = threadpool_limits(limits=limit)
+            self._blas_limit = limit
+        except Exception as e:
+            print(f"Failed to apply BLAS thread limit: {e}", flush=True)
+
+    def acquire(self, label: str, max_threads: Optional[int] = None) -> ThreadLease:
+        """Grant the calling thread a share of the budget until release()"""
+        with self._lock:
+            self._next_id += 1
+            threads = self._fair_share(len(self._leases) + 1)
+            if max_threads:
+                threads = min(threads, int(max_threads))
+            lease = ThreadLease(self._next_id, label, threads)
+            self._leases[lease.lease_id] = lease
+            self._apply_blas_limit()
+        self._local.lease = lease
+        return lease
+
+    def release(self, lease: ThreadLease):
+        """Return a lease's threads to the pool"""
+        with self._lock:
+            self._leases.pop(lease.lease_id, None)
+            self._apply_blas_limit()
+        if getattr(self._local, 'lease', None) is lease:
+            self._local.lease = None
+
+    def current_threads(self) -> int:
+        """
+        Threads the calling thread may use right now.
+        Shrinks as more requests arrive; threads without a lease (e.g. pool workers
+        already parallelised by their caller) get 1.
+        """
+        lease = getattr(self._local, 'lease', None)
+        if lease is None:
+            return 1
+        with self._lock:
+            return max(1, min(lease.threads, self._fair_share(len(self._leases))))
+
+    def snapshot(self) -> Dict:
+        """Current allocation for monitoring"""
+        now = time.time()
+        with self._lock:
+            leases = [
+                {
+                    "leaseId": lease.lease_id,
+                    "label": lease.label,
+                    "threads": min(lease.threads, self._fair_share(len(self._leases))),
+                    "ageSeconds": round(now - lease.acquired_at, 3)
+                }
+                for lease in self._leases.values()
+            ]
+            return {
+                "totalThreads": self.total_threads,
+                "activeRequests": len(leases),
+                "blasThreadLimit": self._blas_limit,
+                "leases": leases
+            }
+
+
+def limit_worker_threads(threads: int = 1):
+    """Pin BLAS/OpenMP threads inside a pool worker process"""
+    if THREADPOOLCTL_AVAILABLE:
+        threadpool_limits(limits=threads)
+
+
+# Global governor instance
+_governor = None
+
+def get_resource_governor() -> ResourceGovernor:
+    """Get global resource governor instance"""
+    global _governor
+    if _governor is None:
+        _governor = ResourceGovernor()
+    return _governor
@@ -0,0 +1,66 @@
+import numpy as np
+from typing import Any, Dict
+
+
+class FlatForest:
+    """
+    Random Forest regressor flattened into contiguous node arrays.
+    All trees are evaluated together with vectorized traversal, avoiding the per-call
+    joblib dispatch of RandomForestRegressor.predict for single rows.
+    """
+
+    __slots__ = ('left', 'right', 'feature', 'threshold', 'value', 'roots', 'max_depth', 'n_features')
+
+    def __init__(self, forest: Any):
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            left = tree.children_left.astype(np.int32)
+            right = tree.children_right.astype(np.int32)
+            is_leaf = left == -1
+            # Leaves point at themselves so traversal can run a fixed number of steps
+            own_index = np.arange(tree.node_count, dtype=np.int32) + offset
+            lefts.append(np.where(is_leaf, own_index, left + offset))
+            rights.append(np.where(is_leaf, own_index, right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        self.left = np.concatenate(lefts)
+        self.right = np.concatenate(rights)
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        self.value = np.concatenate(values)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.n_features = int(forest.n_features_in_)
+
+    def __getstate__(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state: Dict):
+        for slot in self.__slots__:
+            setattr(self, slot, state.get(slot))
+
+    def predict_trees(self, X: Any) -> np.ndarray:
+        """Per-tree predictions, shape (n_trees, n_rows)"""
+        # sklearn compares float32 feature values against the split thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        n_rows = X.shape[0]
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+        rows = np.arange(n_rows)[None, :]
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes]
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Forest prediction (mean over trees), shape (n_rows,)"""
+        return self.predict_trees(X).mean(axis=0)
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    """One in-flight computation that duplicate callers wait on"""
+
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key: the first caller runs the work and
+    every duplicate that arrives while it is running waits for and shares its result.
+    Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.coalesced_count = 0
+
+    def do(self, key: str, fn: Callable[[], Any], on_wait: Optional[Callable[[], None]] = None) -> Tuple[Any, bool]:
+        """
+        Run fn once per concurrent key. Returns (result, shared) where shared is True for duplicates.
+        on_wait runs in a duplicate before it blocks, e.g. to hand resources back to the leader.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced_count += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            if on_wait is not None:
+                on_wait()
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently being computed"""
+        with self._lock:
+            return len(self._calls)
+
+
+def flight_key(*parts: Any) -> str:
+    """Stable hash of JSON-serializable request inputs"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.md5(payload.encode()).hexdigest()
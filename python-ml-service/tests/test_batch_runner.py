@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch_runner
+import forecasting_service as service
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def gapped_input():
+    """Sales rows with no-sale days left out: one sparse item, one dense item"""
+    rng = np.random.default_rng(7)
+    dates = pd.date_range('2024-01-01', periods=180, freq='D')
+    sparse = pd.DataFrame({'item': 'SPARSE', 'date': dates[::9], 'value': rng.integers(1, 20, len(dates[::9]))})
+    dense_dates = dates.delete([10, 50, 51, 120])
+    dense = pd.DataFrame({'item': 'DENSE', 'date': dense_dates,
+                          'value': rng.normal(40, 5, len(dense_dates)).round(2)})
+    return pd.concat([sparse, dense], ignore_index=True).astype({'value': float})
+
+
+def proxy_items_data(rows):
+    """itemsData as the Node proxy sends it: every day from first to last date, 0 where there were no rows"""
+    items_data = {}
+    for item_name, group in rows.groupby('item'):
+        values = group.set_index('date')['value']
+        days = pd.date_range(values.index.min(), values.index.max(), freq='D')
+        items_data[item_name] = [{'date': d.strftime('%Y-%m-%d'), 'value': float(values.get(d, 0.0))} for d in days]
+    return items_data
+
+
+def test_daily_series_fills_missing_days_with_zero():
+    rows = pd.DataFrame({'item': ['A', 'A', 'A'],
+                         'date': pd.to_datetime(['2024-01-01 00:00', '2024-01-04 00:00', '2024-01-04 12:00']),
+                         'value': [1.0, 2.0, 3.0]})
+    series = batch_runner.daily_series(rows)
+    assert series['date'].dt.strftime('%Y-%m-%d').tolist() == ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04']
+    assert series['value'].tolist() == [1.0, 0.0, 0.0, 5.0]
+
+
+def test_gapped_input_matches_train_endpoint_with_filled_gaps():
+    rows = gapped_input()
+    options = {
+        'model_type': 'Linear Regression', 'model_id': 'batch_test', 'schema': 'file', 'table': 'gaps',
+        'date_col': 'date', 'item_col': 'item', 'qty_col': 'value', 'forecast_days': 14,
+        'hyperparameter_tuning': False, 'force_retrain': True, 'uncertainty_samples': None, 'threads': 1
+    }
+    batch_forecasts, summary = batch_runner.run_chunk(batch_runner.daily_series(rows), options)
+    assert summary['failed'] == {}
+
+    items_data = proxy_items_data(rows)
+    request = {'itemsData': items_data, 'modelType': 'Linear Regression', 'modelId': 'http_test',
+               'schema': 'file', 'table': 'gaps', 'dateCol': 'date', 'itemCol': 'item', 'qtyCol': 'value',
+               'forceRetrain': True}
+    shared_data = service.SharedTrainingData(items_data)
+    with service.app.app_context():
+        payload, status = service.response_payload(service.run_training(request, shared_data))
+    assert status == 200
+    item_models = {item_name: service.trained_models.get(result['modelId'])
+                   for item_name, result in payload['itemsResults'].items()}
+    item_forecasts = service.forecast_item_frames(
+        {item_name: shared_data.frame(item_name) for item_name in item_models}, item_models, 14)
+
+    for item_name, forecast_data in item_forecasts.items():
+        batch_item = batch_forecasts[batch_forecasts['item'] == item_name]
+        assert batch_item['modelType'].iloc[0] == item_models[item_name].type
+        assert batch_item['date'].tolist() == [p['date'] for p in forecast_data['predictions']]
+        np.testing.assert_allclose(batch_item['forecast'], [p['value'] for p in forecast_data['predictions']])
+    # The sparse item is routed to an intermittent-demand model on both paths
+    assert item_models['SPARSE'].type != 'Linear Regression'
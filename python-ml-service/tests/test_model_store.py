@@ -0,0 +1,154 @@
+import fnmatch
+import io
+
+import pytest
+
+from model_cache import ModelCache
+from model_record import ModelRecord
+from model_store import ClientError, RedisStorageBackend, S3StorageBackend, StorageBackend
+
+
+class FakeRedis:
+    """In-memory stand-in for a redis.Redis client (bytes keys and values, SCAN in small pages)"""
+
+    def __init__(self, page_size=2):
+        self.data = {}
+        self.page_size = page_size
+
+    def get(self, key):
+        return self.data.get(key.encode())
+
+    def set(self, key, value):
+        self.data[key.encode()] = bytes(value)
+
+    def delete(self, key):
+        return int(self.data.pop(key.encode(), None) is not None)
+
+    def exists(self, key):
+        return int(key.encode() in self.data)
+
+    def strlen(self, key):
+        return len(self.data.get(key.encode(), b''))
+
+    def scan(self, cursor=0, match=None, count=None):
+        keys = sorted(self.data)
+        page = keys[cursor:cursor + self.page_size]
+        next_cursor = cursor + self.page_size if cursor + self.page_size < len(keys) else 0
+        return next_cursor, [k for k in page if match is None or fnmatch.fnmatchcase(k.decode(), match)]
+
+    def scan_iter(self, match=None, count=None):
+        cursor = 0
+        while True:
+            cursor, keys = self.scan(cursor, match, count)
+            yield from keys
+            if cursor == 0:
+                break
+
+
+class FakeS3:
+    """In-memory stand-in for a boto3 S3 client (one bucket, list_objects_v2 pages of page_size keys)"""
+
+    def __init__(self, page_size=2):
+        self.objects = {}
+        self.page_size = page_size
+
+    @staticmethod
+    def _missing(operation):
+        return ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, operation)
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self._missing('GetObject')
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = bytes(Body)
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self._missing('HeadObject')
+        return {'ContentLength': len(self.objects[Key])}
+
+    def get_paginator(self, operation):
+        assert operation == 'list_objects_v2'
+        return self
+
+    def paginate(self, Bucket, Prefix=''):
+        keys = sorted(k for k in self.objects if k.startswith(Prefix))
+        for start in range(0, len(keys), self.page_size):
+            yield {'Contents': [{'Key': k} for k in keys[start:start + self.page_size]]}
+
+
+def redis_backend(client, prefix='test/'):
+    return RedisStorageBackend(prefix=prefix, client=client)
+
+
+def s3_backend(client, prefix='test/'):
+    return S3StorageBackend('models', prefix=prefix, client=client)
+
+
+BACKENDS = [(FakeRedis, redis_backend), (FakeS3, s3_backend)]
+
+
+@pytest.mark.parametrize('make_client, make_backend', BACKENDS)
+def test_backend_round_trip(make_client, make_backend):
+    backend = make_backend(make_client())
+    assert backend.get('a.meta.json') is None
+    assert not backend.exists('a.meta.json')
+    assert backend.size('a.meta.json') == 0
+
+    backend.put('a.meta.json', b'{}')
+    backend.put('blobs/x.joblib', b'12345')
+    assert backend.get('a.meta.json') == b'{}'
+    assert backend.exists('blobs/x.joblib')
+    assert backend.size('blobs/x.joblib') == 5
+
+    backend.delete('a.meta.json')
+    backend.delete('a.meta.json')
+    assert not backend.exists('a.meta.json')
+
+
+@pytest.mark.parametrize('make_client, make_backend', BACKENDS)
+def test_list_keys_spans_pages_and_strips_prefix(make_client, make_backend):
+    client = make_client()
+    backend = make_backend(client)
+    names = [f"item{i}.meta.json" for i in range(5)] + ['blobs/b.joblib', 'failures/k.failure.json']
+    for name in names:
+        backend.put(name, b'x')
+    # Keys under another prefix on the same server are not listed
+    make_backend(client, prefix='other/').put('item9.meta.json', b'x')
+
+    assert backend.list_keys('.meta.json') == sorted(n for n in names if n.endswith('.meta.json'))
+    assert backend.list_keys() == sorted(names)
+
+
+@pytest.mark.parametrize('make_client, make_backend', BACKENDS)
+def test_model_saved_by_one_cache_loads_in_another(make_client, make_backend):
+    client = make_client()
+    writer = ModelCache(backend=make_backend(client))
+    reader = ModelCache(backend=make_backend(client))
+
+    record = ModelRecord('ARIMA', {'coefficients': [0.5, 0.25]})
+    cache_key = writer.save_model('dbo', 'sales', 'date', 'item', 'qty', 'ARIMA', 'A', record,
+                                  {'metrics': {'mape': 4.0}})
+    assert cache_key
+
+    model, metadata = reader.load_model(cache_key)
+    assert model.type == 'ARIMA' and model.model == {'coefficients': [0.5, 0.25]}
+    assert metadata['metrics'] == {'mape': 4.0}
+    assert reader.get_cache_stats()['total_models'] == 1
+
+    assert reader.clear_all() == 1
+    assert writer.load_model(cache_key) == (None, None)
+
+
+def test_partial_backend_fails_on_creation():
+    class GetOnlyBackend(StorageBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()
@@ -0,0 +1,49 @@
+import numpy as np
+
+import forecasting_service as service
+from trivial_models import TRIVIAL_MODEL_TYPE, triage_series
+
+
+def test_triage_finds_zero_and_constant_series():
+    trivial = triage_series({
+        'zero': np.zeros(10),
+        'constant': np.full(10, 4.0),
+        'varying': np.arange(10, dtype=float)
+    })
+    assert trivial == {'zero': ('zero', 0.0), 'constant': ('constant', 4.0)}
+
+
+def test_triage_leaves_single_observation_to_trainers():
+    assert triage_series({'one': np.array([5.0]), 'one_observed': np.array([5.0, np.nan])}) == {}
+
+
+def test_single_point_item_fails_training(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    request = {'itemsData': {'ONE': [{'date': '2024-01-01', 'value': 5.0}]},
+               'modelType': 'ARIMA', 'modelId': 'single_point', 'forceRetrain': True}
+    with service.app.app_context():
+        payload, status = service.response_payload(service.run_training(request))
+    result = payload['itemsResults']['ONE']
+    assert not result['success']
+    assert 'requires at least 2 data points' in result['error']
+
+
+def test_single_point_item_gets_last_value_fallback_after_failure(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    request = {'itemsData': {'ONE': [{'date': '2024-01-01', 'value': 5.0}]},
+               'modelType': 'ARIMA', 'modelId': 'single_point_fallback'}
+    with service.app.app_context():
+        first, _ = service.response_payload(service.run_training(request))
+        second, status = service.response_payload(service.run_training(request))
+    assert not first['itemsResults']['ONE']['success']
+
+    result = second['itemsResults']['ONE']
+    assert status == 200 and result['success']
+    assert result['modelType'] == TRIVIAL_MODEL_TYPE
+    assert result['fallback']['requestedModelType'] == 'ARIMA'
+    assert 'requires at least 2 data points' in result['fallback']['error']
+    assert result['fallback']['retryAfter']
+
+    record = service.trained_models.get(result['modelId'])
+    forecast = service.forecast_by_model_type(record, service.SharedTrainingData(request['itemsData']).frame('ONE'), 3)
+    assert [point['value'] for point in forecast['predictions']] == [5.0, 5.0, 5.0]
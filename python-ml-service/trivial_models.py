@@ -0,0 +1,64 @@
+import numpy as np
+from typing import Dict, Tuple
+
+# Model type reported for items triaged as zero or constant
+TRIVIAL_MODEL_TYPE = 'Constant'
+
+# Spread (relative to the level) below which a series counts as constant
+CONSTANT_TOLERANCE = 1e-9
+
+# Fewer observations than this say nothing about a series being flat; the trainers reject them
+MIN_TRIAGE_POINTS = 2
+
+# An exact flat fit has no error
+TRIVIAL_METRICS = {"mape": 0.0, "rmse": 0.0, "accuracy": 100.0}
+
+
+class ConstantModel:
+    """Flat forecast at a fixed level with a fixed interval; a few bytes when pickled"""
+
+    __slots__ = ('level', 'lower', 'upper')
+
+    def __init__(self, level: float, lower: float = None, upper: float = None):
+        self.level = float(level)
+        self.lower = self.level if lower is None else float(lower)
+        self.upper = self.level if upper is None else float(upper)
+
+    def __getstate__(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state: Dict):
+        for slot in self.__slots__:
+            setattr(self, slot, state.get(slot))
+
+    def forecast(self, steps: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Point forecast and interval bounds for the next steps periods"""
+        return np.full(steps, self.level), np.full(steps, self.lower), np.full(steps, self.upper)
+
+
+def triage_series(values: Dict[str, np.ndarray]) -> Dict[str, Tuple[str, float]]:
+    """
+    Find series with no signal in one vectorized pass over all items.
+    Returns item -> ('zero' | 'constant', level) for trivial items only; series with fewer
+    than MIN_TRIAGE_POINTS observations are left for the regular trainers to reject.
+    """
+    items = [item for item, v in values.items()
+             if np.count_nonzero(~np.isnan(np.asarray(v, dtype=float))) >= MIN_TRIAGE_POINTS]
+    if not items:
+        return {}
+    lengths = np.array([len(values[item]) for item in items])
+    flat = np.concatenate([np.asarray(values[item], dtype=float) for item in items])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    # fmin/fmax skip missing values
+    low = np.fmin.reduceat(flat, starts)
+    high = np.fmax.reduceat(flat, starts)
+    level = (low + high) / 2
+    constant = (high - low) <= CONSTANT_TOLERANCE * np.maximum(1.0, np.abs(level))
+
+    trivial = {}
+    for item, is_constant, lo, hi, lv in zip(items, constant, low, high, level):
+        if not is_constant:
+            continue
+        trivial[item] = ('zero', 0.0) if lo == 0 and hi == 0 else ('constant', float(lv))
+    return trivial